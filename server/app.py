@@ -5,7 +5,13 @@ from flask import Flask, send_from_directory
 from flask_cors import CORS
 from dotenv import load_dotenv
 
+from cli import register_commands
 from db import db
+from lib.compression import init_compression
+from lib.db_engine import engine_options, install_engine_hooks
+from lib.db_routing import init_read_replicas
+from lib.json_provider import FastJSONProvider
+from lib.request_timing import init_request_timing
 
 load_dotenv()
 
@@ -14,12 +20,7 @@ STATIC_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'client', 'dist')
 
 
 def setup_logging(app):
-    """Configure logging to output to both console and file."""
-    # Create logs directory if it doesn't exist
-    log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs')
-    if not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-    
+    """Configure logging to the console, and to a file unless LOG_FILE is empty."""
     # Configure root logger
     log_level = logging.DEBUG if app.debug else logging.INFO
     
@@ -34,51 +35,35 @@ def setup_logging(app):
     console_handler.setLevel(log_level)
     console_handler.setFormatter(formatter)
     
+    handlers = [console_handler]
+
     # File handler - rotating log file (max 10MB, keep 5 backups)
-    # Only log errors to file to keep logs concise
-    file_handler = RotatingFileHandler(
-        os.path.join(log_dir, 'app.log'),
-        maxBytes=10 * 1024 * 1024,  # 10MB
-        backupCount=5
+    # Only log errors to file to keep logs concise. Off on Heroku by default,
+    # where the filesystem is discarded on restart and the console is the log.
+    default_log_file = "" if "DYNO" in os.environ else os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'logs', 'app.log'
     )
-    file_handler.setLevel(logging.ERROR)
-    file_handler.setFormatter(formatter)
+    log_file = os.getenv("LOG_FILE", default_log_file)
+    if log_file:
+        os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+        file_handler = RotatingFileHandler(
+            log_file,
+            maxBytes=10 * 1024 * 1024,  # 10MB
+            backupCount=5
+        )
+        file_handler.setLevel(logging.ERROR)
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
     
-    # Get the root logger and add handlers
+    # Get the root logger and replace its handlers to avoid duplicates
     root_logger = logging.getLogger()
     root_logger.setLevel(log_level)
-    
-    # Remove any existing handlers to avoid duplicates
-    root_logger.handlers = []
-    
-    root_logger.addHandler(console_handler)
-    root_logger.addHandler(file_handler)
+    root_logger.handlers = list(handlers)
     
     # Also configure Flask's logger
-    app.logger.handlers = []
-    app.logger.addHandler(console_handler)
-    app.logger.addHandler(file_handler)
+    app.logger.handlers = list(handlers)
     app.logger.setLevel(log_level)
 
-from constants import REPAIRS_DEPARTMENT_ID
-
-
-def seed_repairs_department():
-    """Create the Repairs department if it doesn't exist."""
-    from models import Department
-    
-    repairs_dept = Department.query.filter_by(id=REPAIRS_DEPARTMENT_ID).first()
-    if not repairs_dept:
-        repairs_dept = Department(
-            id=REPAIRS_DEPARTMENT_ID,
-            name="Repairs",
-            description="Department for repair request approvals",
-            is_active=True,
-        )
-        db.session.add(repairs_dept)
-        db.session.commit()
-        print("Repairs department created: ", REPAIRS_DEPARTMENT_ID)
-
 
 def create_app():
     # Disable Flask's built-in static handler; the catch-all route serves React build files
@@ -86,6 +71,7 @@ def create_app():
         __name__,
         static_folder=None,
     )
+    app.json = FastJSONProvider(app)
 
     # Fix Heroku's postgres:// URL scheme (SQLAlchemy 1.4+ requires postgresql://)
     database_url = os.getenv("DATABASE_URL")
@@ -93,9 +79,17 @@ def create_app():
         database_url = database_url.replace("postgres://", "postgresql://", 1)
     app.config["SQLALCHEMY_DATABASE_URI"] = database_url
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    # Pool sizing, PgBouncer mode and statement timeouts (see lib/db_engine.py)
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(database_url)
     app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY", "dev-secret-key")
     app.config["JWT_ALGORITHM"] = os.getenv("JWT_ALGORITHM", "HS256")
 
+    # Response compression (see lib/compression.py)
+    app.config["COMPRESS_MIN_SIZE"] = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+    app.config["COMPRESS_GZIP_LEVEL"] = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+    app.config["COMPRESS_BROTLI_QUALITY"] = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+    app.config["COMPRESS_CACHE_BYTES"] = int(os.getenv("COMPRESS_CACHE_BYTES", str(8 * 1024 * 1024)))
+
     # Set up logging before anything else
     setup_logging(app)
 
@@ -112,9 +106,16 @@ def create_app():
         app,
         supports_credentials=True,
         origins=allowed_origins,
+        expose_headers=["X-Sync-Cursor"],
     )
 
+    # Registered first so its after_request hook runs last (see lib/request_timing.py)
+    init_request_timing(app)
     db.init_app(app)
+    with app.app_context():
+        install_engine_hooks(db.engine)
+    init_read_replicas(app, db)
+    init_compression(app)
 
     from routes.auth_routes import auth_bp
     from routes.admin_routes import admin_bp
@@ -122,6 +123,8 @@ def create_app():
     from routes.po_group_routes import po_group_bp
     from routes.lookup_routes import lookup_bp
     from routes.repair_routes import repair_bp
+    from routes.event_routes import event_bp
+    from routes.health_routes import health_bp
 
     app.register_blueprint(auth_bp, url_prefix="/api/auth")
     app.register_blueprint(admin_bp, url_prefix="/api/admin")
@@ -129,6 +132,8 @@ def create_app():
     app.register_blueprint(po_group_bp, url_prefix="/api/po-group")
     app.register_blueprint(lookup_bp, url_prefix="/api/lookup")
     app.register_blueprint(repair_bp, url_prefix="/api/repair")
+    app.register_blueprint(event_bp, url_prefix="/api/events")
+    app.register_blueprint(health_bp, url_prefix="/api/health")
 
     # Serve React app for all non-API routes (client-side routing support)
     @app.route('/')
@@ -140,9 +145,9 @@ def create_app():
         # Otherwise, serve index.html for client-side routing
         return send_from_directory(STATIC_FOLDER, 'index.html')
 
-    with app.app_context():
-        db.create_all()
-        seed_repairs_department()
+    # Schema and seed data are managed by `flask db upgrade` and `flask seed`
+    # in the release phase, not on every boot
+    register_commands(app)
 
     return app
 
@@ -0,0 +1,8 @@
+"""
+Registered backfills, one module per backfill (see lib/backfill.py).
+
+Every module in this package is imported by ``flask backfill`` commands and
+registers itself with ``lib.backfill.register``. Remove a module once its
+backfill has completed everywhere and the migration that needed it no longer
+has to run against old data.
+"""
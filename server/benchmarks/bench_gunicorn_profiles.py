@@ -0,0 +1,230 @@
+"""
+Throughput of the gunicorn worker profiles (gunicorn.conf.py) on mixed traffic.
+
+For each profile a gunicorn server is started against the given database and
+driven by --clients concurrent clients for --duration seconds. Each client
+does a mix of reads (order list, department list) and writes (create and
+update a draft order). Reports requests/s, p50/p95/p99 latency and errors.
+
+Use a PostgreSQL database for meaningful numbers; the benchmark creates its
+own department, admin user, vendor and --orders seed orders, and deletes the
+draft orders it created when it is done.
+
+Usage (from the server directory):
+    python benchmarks/bench_gunicorn_profiles.py --database-url postgresql://localhost/po_bench
+    python benchmarks/bench_gunicorn_profiles.py --profiles gthread gevent --clients 64 --duration 30
+"""
+
+import argparse
+import os
+import random
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import requests
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DEFAULT_PROFILES = ["sync", "gthread", "gevent"]
+BENCH_EMAIL = "bench-admin@example.com"
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def seed(order_count):
+    """Create the benchmark user, vendor and orders. Returns (user_id, vendor_id)."""
+    from app import app
+    from db import db
+    from models import Department, Order, OrderItem, User, Vendor
+    from models.order import OrderStatus
+
+    with app.app_context():
+        user = User.query.filter_by(email=BENCH_EMAIL).first()
+        if not user:
+            department = Department(name=f"Bench {uuid.uuid4().hex[:6]}")
+            db.session.add(department)
+            db.session.flush()
+            user = User(
+                email=BENCH_EMAIL, first_name="Bench", last_name="Admin",
+                is_admin=True, department_id=department.id,
+            )
+            user.set_password(uuid.uuid4().hex)
+            db.session.add(user)
+        vendor = Vendor.query.filter_by(name="Bench Vendor").first()
+        if not vendor:
+            vendor = Vendor(name="Bench Vendor")
+            db.session.add(vendor)
+        db.session.flush()
+
+        existing = Order.query.filter_by(ordered_by_id=user.id).count()
+        for i in range(existing, order_count):
+            order = Order(
+                order_number=f"BENCH-{uuid.uuid4().hex[:10]}",
+                vendor_id=vendor.id,
+                description=f"Bench order {i}",
+                status=random.choice([OrderStatus.PENDING, OrderStatus.APPROVED, OrderStatus.PAID]),
+                ordered_by_id=user.id,
+            )
+            db.session.add(order)
+            db.session.flush()
+            db.session.add(OrderItem(
+                order_id=order.id, line_number=1, description="Part", quantity=2, unit_cost=10,
+            ))
+        db.session.commit()
+        return user.id, vendor.id
+
+
+def cleanup(user_id):
+    from app import app
+    from db import db
+    from models import Order, OrderItem
+    from models.order import OrderStatus
+
+    with app.app_context():
+        drafts = [o.id for o in Order.query.filter_by(ordered_by_id=user_id, status=OrderStatus.DRAFT)]
+        if drafts:
+            OrderItem.query.filter(OrderItem.order_id.in_(drafts)).delete(synchronize_session=False)
+            Order.query.filter(Order.id.in_(drafts)).delete(synchronize_session=False)
+            db.session.commit()
+
+
+def start_gunicorn(profile, port, env):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--config", os.path.join(SERVER_DIR, "gunicorn.conf.py"), "app:app"],
+        env={**env, "GUNICORN_PROFILE": profile, "PORT": str(port)},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"{base_url}/api/auth/check-login", timeout=1)
+            return process, base_url
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"gunicorn ({profile}) did not start")
+
+
+def stop_gunicorn(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def run_client(base_url, token, vendor_id, write_ratio, stop_at, samples, errors, lock):
+    session = requests.Session()
+    session.cookies.set("token", token)
+    draft_id = None
+    local_samples = []
+    local_errors = 0
+    while time.monotonic() < stop_at:
+        roll = random.random()
+        start = time.perf_counter()
+        try:
+            if roll < write_ratio and draft_id:
+                response = session.put(f"{base_url}/api/order/{draft_id}", json={
+                    "description": f"Updated {time.time()}",
+                    "items": [{"description": "Part", "quantity": 3, "unit_cost": 12}],
+                })
+            elif roll < write_ratio:
+                response = session.post(f"{base_url}/api/order/", json={
+                    "vendor_id": vendor_id,
+                    "description": "Bench draft",
+                    "items": [{"description": "Part", "quantity": 1, "unit_cost": 5}],
+                })
+                if response.status_code == 201:
+                    draft_id = response.json()["id"]
+            elif roll < write_ratio + (1 - write_ratio) * 0.2:
+                response = session.get(f"{base_url}/api/lookup/departments")
+            else:
+                response = session.get(f"{base_url}/api/order/all")
+            if response.status_code >= 400:
+                local_errors += 1
+        except requests.RequestException:
+            local_errors += 1
+        local_samples.append((time.perf_counter() - start) * 1000)
+    with lock:
+        samples.extend(local_samples)
+        errors[0] += local_errors
+
+
+def bench_profile(profile, args, env, token, vendor_id):
+    process, base_url = start_gunicorn(profile, args.port, env)
+    try:
+        samples, errors, lock = [], [0], threading.Lock()
+        start = time.monotonic()
+        stop_at = start + args.duration
+        clients = [
+            threading.Thread(
+                target=run_client,
+                args=(base_url, token, vendor_id, args.write_ratio, stop_at, samples, errors, lock),
+            )
+            for _ in range(args.clients)
+        ]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.monotonic() - start
+    finally:
+        stop_gunicorn(process)
+
+    print(
+        f"  {profile:<8} {len(samples) / elapsed:8.1f} req/s   "
+        f"p50 {percentile(samples, 50):7.1f} ms   "
+        f"p95 {percentile(samples, 95):7.1f} ms   "
+        f"p99 {percentile(samples, 99):7.1f} ms   "
+        f"errors {errors[0]}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gunicorn worker profile benchmark")
+    parser.add_argument("--profiles", nargs="+", default=DEFAULT_PROFILES, choices=DEFAULT_PROFILES)
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per profile")
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--orders", type=int, default=500, help="Seed orders in the list endpoint")
+    parser.add_argument("--workers", type=int, help="WEB_CONCURRENCY for every profile")
+    parser.add_argument("--port", type=int, default=8055)
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error("--database-url (or DATABASE_URL) is required")
+    os.environ["DATABASE_URL"] = args.database_url
+    env = dict(os.environ)
+    if args.workers:
+        env["WEB_CONCURRENCY"] = str(args.workers)
+
+    from lib.authenticate import generate_token
+
+    user_id, vendor_id = seed(args.orders)
+    token = generate_token(user_id)
+
+    print(
+        f"{args.clients} clients, {args.duration:.0f}s per profile, "
+        f"{args.write_ratio:.0%} writes, {args.orders} orders"
+    )
+    try:
+        for profile in args.profiles:
+            bench_profile(profile, args, env, token, vendor_id)
+    finally:
+        cleanup(user_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Micro-benchmark: serialization time of a 1,000-order list.
+
+Compares the previous path (to_dict values pre-formatted with isoformat()/float()
+and encoded by Flask's default provider) against FastJSONProvider encoding the
+raw to_dict output. Models are built as transient objects, so no database is
+needed.
+
+Usage (from the server directory):
+    python benchmarks/bench_json.py [--orders 1000] [--items 5] [--repeat 20]
+"""
+
+import argparse
+import datetime
+import decimal
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from lib.json_provider import FastJSONProvider, orjson
+from models import Order, OrderItem, Unit, User, Vendor
+
+
+def build_orders(count, items_per_order):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    vendors = [Vendor(id=str(uuid.uuid4()), name=f"Vendor {i}", is_active=True,
+                      created_at=now, updated_at=now) for i in range(20)]
+    units = [Unit(id=str(uuid.uuid4()), unit_number=f"U-{i}", unit_type="vehicle",
+                  is_active=True, created_at=now, updated_at=now) for i in range(50)]
+    users = [User(id=str(uuid.uuid4()), email=f"user{i}@example.com", first_name="First",
+                  last_name=f"Last{i}", phone="5551234567", is_admin=False, is_active=True,
+                  created_at=now, updated_at=now) for i in range(30)]
+
+    orders = []
+    for i in range(count):
+        order = Order(
+            id=str(uuid.uuid4()),
+            order_number=f"ORD-20260101-{i:04d}",
+            description="Parts and supplies",
+            status="approved",
+            notes="Deliver to yard",
+            created_at=now,
+            updated_at=now,
+            approved_at=now,
+        )
+        order.vendor = vendors[i % len(vendors)]
+        order.unit = units[i % len(units)]
+        order.ordered_by = users[i % len(users)]
+        order.approved_by = users[(i + 1) % len(users)]
+        order.items = [
+            OrderItem(
+                id=str(uuid.uuid4()),
+                line_number=n + 1,
+                description=f"Item {n}",
+                quantity=decimal.Decimal("2.00"),
+                unit_cost=decimal.Decimal("19.99"),
+                created_at=now,
+                updated_at=now,
+            )
+            for n in range(items_per_order)
+        ]
+        orders.append(order)
+    return orders
+
+
+def preformat(value):
+    """Reproduce the old to_dict output (isoformat strings, float numbers)."""
+    if isinstance(value, dict):
+        return {k: preformat(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [preformat(v) for v in value]
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    return value
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), min(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    default_provider = DefaultJSONProvider(app)
+    fast_provider = FastJSONProvider(app)
+    orders = build_orders(args.orders, args.items)
+
+    def before():
+        data = [preformat(o.to_dict(include_relations=True)) for o in orders]
+        return default_provider.dumps(data)
+
+    def after():
+        data = [o.to_dict(include_relations=True) for o in orders]
+        return fast_provider.dumps_bytes(data)
+
+    def encode_only_before(data=[preformat(o.to_dict(include_relations=True)) for o in orders]):
+        return default_provider.dumps(data)
+
+    def encode_only_after(data=[o.to_dict(include_relations=True) for o in orders]):
+        return fast_provider.dumps_bytes(data)
+
+    print(f"{args.orders} orders x {args.items} items, {args.repeat} runs "
+          f"(orjson {'available' if orjson else 'NOT installed, stdlib fallback'})")
+    for label, fn in (
+        ("to_dict + encode, before", before),
+        ("to_dict + encode, after", after),
+        ("encode only, before", encode_only_before),
+        ("encode only, after", encode_only_after),
+    ):
+        median, best = timed(fn, args.repeat)
+        print(f"  {label:<28} median {median:8.2f} ms   best {best:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Notification throughput and tail-latency benchmark.
+
+Runs send_sms, send_bulk_sms and the notify_* helpers against the local mock
+ClickSend server (benchmarks/mock_clicksend.py) for fan-outs of 10 to 5,000
+recipients, and reports throughput and p50/p95/p99 latency for each.
+
+- send_sms: N individual messages over a thread pool (--concurrency)
+- send_bulk_sms: one call for N recipients, repeated --repeat times
+- notify_*: enqueue time on the request path, then time for the dispatcher to
+  drain the outbox. Uses an in-memory SQLite database unless --database-url is
+  given. Coalescing windows are disabled so every message is delivered.
+
+Usage (from the server directory):
+    python benchmarks/bench_notifications.py
+    python benchmarks/bench_notifications.py --fanouts 10 100 1000 --latency-ms 120 --failure-rate 0.01
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.mock_clicksend import server_state, server_url, start_server
+
+DEFAULT_FANOUTS = [10, 100, 500, 1000, 5000]
+NOTIFY_EVENT_TYPES = [
+    "order_pending", "repair_pending", "order_approved",
+    "repair_approved", "order_paid", "repair_completed",
+]
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(label, fanout, elapsed, messages, samples):
+    throughput = messages / elapsed if elapsed else float("inf")
+    print(
+        f"  {label:<24} n={fanout:<5} {throughput:9.1f} msg/s   "
+        f"p50 {percentile(samples, 50):8.2f} ms   "
+        f"p95 {percentile(samples, 95):8.2f} ms   "
+        f"p99 {percentile(samples, 99):8.2f} ms"
+    )
+
+
+def phone(i):
+    return f"555{i:07d}"[-10:]
+
+
+def bench_send_sms(fanout, concurrency):
+    from lib.sms_service import send_sms
+
+    def one(i):
+        start = time.perf_counter()
+        send_sms(phone(i), f"Benchmark message {i}")
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(one, range(fanout)))
+    report("send_sms", fanout, time.perf_counter() - start, fanout, samples)
+
+
+def bench_send_bulk_sms(fanout, repeat):
+    from lib.sms_service import send_bulk_sms
+
+    recipients = [{"to": phone(i), "message": f"Benchmark {i}"} for i in range(fanout)]
+    samples = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        call_start = time.perf_counter()
+        send_bulk_sms(recipients)
+        samples.append((time.perf_counter() - call_start) * 1000)
+    report("send_bulk_sms", fanout, time.perf_counter() - start, fanout * repeat, samples)
+
+
+def fake_people(fanout):
+    """Stand-ins with the attributes the notify_* helpers read."""
+    users = [SimpleNamespace(phone=phone(i)) for i in range(fanout)]
+    holders = [SimpleNamespace(user=user) for user in users]
+    return users, holders
+
+
+def bench_notify(app, fanout, batch_size):
+    from db import db
+    from lib import sms_service
+    from lib.outbox import dispatch_batch
+    from models.notification_log import NotificationLog
+    from models.notification_outbox import NotificationOutbox
+
+    users, holders = fake_people(fanout)
+    order = SimpleNamespace(
+        id="bench-order", order_number="ORD-BENCH-0001",
+        vendor=SimpleNamespace(name="Bench Vendor"), po_group=None,
+    )
+    repair = SimpleNamespace(id="bench-repair", repair_number="REP-BENCH-0001")
+
+    calls = {
+        "order_pending": lambda: sms_service.notify_order_pending(order, holders, "Bench User"),
+        "repair_pending": lambda: sms_service.notify_repair_pending(repair, holders, "Bench User"),
+        "order_approved": lambda: sms_service.notify_order_approved(order, users),
+        "repair_approved": lambda: sms_service.notify_repair_approved(repair, holders),
+        # Single-recipient helpers: called once per recipient
+        "order_paid": lambda: [sms_service.notify_order_paid(order, u) for u in users],
+        "repair_completed": lambda: [sms_service.notify_repair_completed(repair, u) for u in users],
+    }
+
+    with app.app_context():
+        for event_type in NOTIFY_EVENT_TYPES:
+            NotificationLog.query.delete()
+            NotificationOutbox.query.delete()
+            db.session.commit()
+
+            start = time.perf_counter()
+            calls[event_type]()
+            db.session.commit()
+            enqueue_ms = (time.perf_counter() - start) * 1000
+
+            batch_samples = []
+            drain_start = time.perf_counter()
+            while True:
+                batch_start = time.perf_counter()
+                processed = dispatch_batch(batch_size)
+                if not processed:
+                    break
+                batch_samples.append((time.perf_counter() - batch_start) * 1000)
+            drain = time.perf_counter() - drain_start
+
+            print(f"  notify {event_type:<17} n={fanout:<5} enqueue {enqueue_ms:8.2f} ms")
+            if batch_samples:
+                report(f"  dispatch ({len(batch_samples)} batches)", fanout, drain, fanout, batch_samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Notification throughput benchmark")
+    parser.add_argument("--fanouts", type=int, nargs="+", default=DEFAULT_FANOUTS)
+    parser.add_argument("--latency-ms", type=float, default=80.0, help="Mock provider latency")
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, default=8, help="Threads for send_sms")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeats for send_bulk_sms")
+    parser.add_argument("--batch-size", type=int, default=500, help="Outbox dispatch batch size")
+    parser.add_argument("--database-url", default="sqlite://")
+    parser.add_argument("--skip-notify", action="store_true")
+    args = parser.parse_args()
+
+    server = start_server(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        failure_rate=args.failure_rate,
+        error_rate=args.error_rate,
+    )
+    os.environ["CLICKSEND_API_URL"] = server_url(server)
+    os.environ.setdefault("CLICKSEND_USERNAME", "bench")
+    os.environ.setdefault("CLICKSEND_API_KEY", "bench-key")
+    os.environ["DATABASE_URL"] = args.database_url
+    for event_type in NOTIFY_EVENT_TYPES:
+        os.environ[f"NOTIFY_{event_type.upper()}_WINDOW"] = "0"
+
+    app = None
+    if not args.skip_notify:
+        from app import app
+        from db import db
+
+        # The app no longer creates tables on startup (see `flask db upgrade`);
+        # the default in-memory database starts empty
+        with app.app_context():
+            db.create_all()
+
+    print(
+        f"Mock provider: latency {args.latency_ms}±{args.jitter_ms} ms, "
+        f"failure rate {args.failure_rate}, error rate {args.error_rate}"
+    )
+    for fanout in args.fanouts:
+        print(f"\nFan-out {fanout}")
+        bench_send_sms(fanout, args.concurrency)
+        bench_send_bulk_sms(fanout, args.repeat)
+        if app is not None:
+            bench_notify(app, fanout, args.batch_size)
+
+    print(f"\nProvider counters: {server_state(server).stats}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
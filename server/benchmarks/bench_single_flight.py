@@ -0,0 +1,113 @@
+"""
+Thundering-herd latency of /api/order/all with and without single-flight.
+
+Starts gunicorn twice against the given database, with SINGLE_FLIGHT_ENABLED
+true and false. For each, it releases --clients identical requests at the
+same instant, --bursts times, like a room of approvers opening the list at
+8 AM. Reports burst wall time and per-request p50/p99.
+
+Use a PostgreSQL database with a realistic number of orders; the benchmark
+seeds --orders orders through bench_gunicorn_profiles.seed.
+
+Usage (from the server directory):
+    python benchmarks/bench_single_flight.py --database-url postgresql://localhost/po_bench
+    python benchmarks/bench_single_flight.py --clients 64 --bursts 20
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import requests
+
+from bench_gunicorn_profiles import cleanup, percentile, seed, start_gunicorn, stop_gunicorn
+
+
+def burst(base_url, token, clients) -> tuple[float, list[float], int]:
+    """Fire clients identical requests at once. Returns (wall ms, latencies, errors)."""
+    barrier = threading.Barrier(clients)
+    latencies, errors, lock = [], [0], threading.Lock()
+
+    def client():
+        session = requests.Session()
+        session.cookies.set("token", token)
+        barrier.wait()
+        start = time.perf_counter()
+        try:
+            ok = session.get(f"{base_url}/api/order/all").status_code == 200
+        except requests.RequestException:
+            ok = False
+        with lock:
+            latencies.append((time.perf_counter() - start) * 1000)
+            errors[0] += not ok
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return (time.perf_counter() - start) * 1000, latencies, errors[0]
+
+
+def bench(enabled, args, env, token):
+    env = {**env, "SINGLE_FLIGHT_ENABLED": "true" if enabled else "false"}
+    process, base_url = start_gunicorn("gthread", args.port, env)
+    try:
+        walls, latencies, errors = [], [], 0
+        for _ in range(args.bursts):
+            wall, burst_latencies, burst_errors = burst(base_url, token, args.clients)
+            walls.append(wall)
+            latencies.extend(burst_latencies)
+            errors += burst_errors
+            time.sleep(args.pause)
+    finally:
+        stop_gunicorn(process)
+
+    label = "single-flight" if enabled else "disabled"
+    print(
+        f"  {label:<14} burst median {percentile(walls, 50):7.1f} ms   "
+        f"request p50 {percentile(latencies, 50):7.1f} ms   p99 {percentile(latencies, 99):7.1f} ms   "
+        f"errors {errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-flight benchmark for /api/order/all")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--clients", type=int, default=32, help="Identical requests per burst")
+    parser.add_argument("--bursts", type=int, default=10)
+    parser.add_argument("--pause", type=float, default=0.5, help="Seconds between bursts")
+    parser.add_argument("--orders", type=int, default=2000, help="Seed orders in the list")
+    parser.add_argument("--workers", type=int, default=2, help="WEB_CONCURRENCY")
+    parser.add_argument("--port", type=int, default=8057)
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error("--database-url (or DATABASE_URL) is required")
+    os.environ["DATABASE_URL"] = args.database_url
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(args.workers),
+        "GUNICORN_THREADS": str(max(8, args.clients // args.workers)),
+    }
+
+    from lib.authenticate import generate_token
+
+    user_id, _ = seed(args.orders)
+    token = generate_token(user_id)
+
+    print(f"{args.bursts} bursts of {args.clients} identical requests, {args.workers} workers, {args.orders} orders")
+    try:
+        for enabled in (False, True):
+            bench(enabled, args, env, token)
+    finally:
+        cleanup(user_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: per-message latency of send_sms, before and after connection pooling.
+
+"Before" reproduces the old client: a fresh requests.post per message with the
+auth header rebuilt each time. "After" goes through lib/sms_service.send_sms and
+its pooled keep-alive session. Both talk to the local mock ClickSend server.
+
+Usage (from the server directory):
+    python benchmarks/bench_sms_client.py [--messages 500]
+    python benchmarks/bench_sms_client.py --url https://mock.example/v3/sms/send
+"""
+
+import argparse
+import base64
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import requests
+
+from benchmarks.mock_clicksend import server_url, start_server
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(label, samples):
+    print(
+        f"  {label:<8} mean {statistics.mean(samples):7.2f} ms   "
+        f"p50 {percentile(samples, 50):7.2f} ms   "
+        f"p99 {percentile(samples, 99):7.2f} ms"
+    )
+
+
+def send_unpooled(url, to, message):
+    credentials = f"{os.environ['CLICKSEND_USERNAME']}:{os.environ['CLICKSEND_API_KEY']}"
+    headers = {
+        "Authorization": f"Basic {base64.b64encode(credentials.encode()).decode()}",
+        "Content-Type": "application/json",
+    }
+    payload = {"messages": [{"to": to, "body": message, "source": "spyco-po", "country": "US"}]}
+    response = requests.post(url, json=payload, headers=headers, timeout=30)
+    return response.status_code == 200
+
+
+def main():
+    parser = argparse.ArgumentParser(description="send_sms latency benchmark")
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--url", help="Provider URL (defaults to an in-process mock server)")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if not url:
+        server = start_server()
+        url = server_url(server)
+
+    os.environ["CLICKSEND_API_URL"] = url
+    os.environ.setdefault("CLICKSEND_USERNAME", "bench")
+    os.environ.setdefault("CLICKSEND_API_KEY", "bench-key")
+
+    from lib.sms_service import send_sms
+
+    before, after = [], []
+    for i in range(args.messages):
+        start = time.perf_counter()
+        send_unpooled(url, "5551234567", f"Benchmark message {i}")
+        before.append((time.perf_counter() - start) * 1000)
+
+    for i in range(args.messages):
+        start = time.perf_counter()
+        send_sms("5551234567", f"Benchmark message {i}")
+        after.append((time.perf_counter() - start) * 1000)
+
+    print(f"{args.messages} messages against {url}")
+    report("before", before)
+    report("after", after)
+
+    if server:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
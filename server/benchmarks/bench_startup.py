@@ -0,0 +1,104 @@
+"""
+Cold-start cost of a web process.
+
+Each run starts a fresh interpreter and measures:
+    import      importing app, which builds the app through create_app()
+    connect     first database round trip (pool connect plus SELECT 1)
+    first req   first request through the test client
+    second req  the same request again, for comparison
+
+The slowest imports (from ``python -X importtime``) are listed at the end, so
+a new module-level dependency shows up here before it slows dyno boot.
+
+Usage (from the server directory):
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 20 --database-url postgresql://localhost/spyco
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+from app import app
+imported = time.perf_counter()
+from sqlalchemy import text
+from db import db
+with app.app_context():
+    db.session.execute(text("SELECT 1"))
+    db.session.remove()
+connected = time.perf_counter()
+client = app.test_client()
+client.get("/api/auth/check-login")
+first = time.perf_counter()
+client.get("/api/auth/check-login")
+second = time.perf_counter()
+print(json.dumps({
+    "import": (imported - start) * 1000,
+    "connect": (connected - imported) * 1000,
+    "first req": (first - connected) * 1000,
+    "second req": (second - first) * 1000,
+}))
+"""
+
+
+def run_probe(env) -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=SERVER_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(env, count):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"], cwd=SERVER_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        # Only app and the modules it imports directly; deeper ones are included in those
+        if len(name) - len(name.lstrip()) <= 3:
+            rows.append((int(cumulative_us) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Web process startup benchmark")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.database_url:
+        env["DATABASE_URL"] = args.database_url
+    # Keep the probe's console quiet and off the log file
+    env.setdefault("LOG_FILE", "")
+
+    samples = [run_probe(env) for _ in range(args.runs)]
+    print(f"{args.runs} cold starts")
+    for phase in samples[0]:
+        values = sorted(s[phase] for s in samples)
+        print(
+            f"  {phase:<11} median {statistics.median(values):7.1f} ms   "
+            f"min {values[0]:7.1f} ms   max {values[-1]:7.1f} ms"
+        )
+
+    print("\nSlowest imports (cumulative)")
+    for ms, name in slowest_imports(env, args.top):
+        print(f"  {ms:7.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+Local stand-in for the ClickSend /v3/sms/send and delivery receipt endpoints.
+
+Accepts the same request body as ClickSend and answers with the same response
+shapes, so lib/sms_service.py can be exercised without the real API. Point the
+service at it with CLICKSEND_API_URL=http://127.0.0.1:<port>/v3/sms/send.
+
+Faults can be injected to reproduce a degraded provider:
+    --latency-ms / --jitter-ms   response delay per request
+    --failure-rate               fraction of messages rejected individually
+                                 (status INVALID_RECIPIENT inside a 200 response)
+    --error-rate / --error-status  fraction of requests answered with an HTTP error
+    --max-messages               per-request message limit (400 above it)
+
+Delivery receipts for accepted messages are served from GET /v3/sms/receipts
+(status_code 201, or 301 "Undelivered" for --undelivered-rate of them) until
+they are marked read with PUT /v3/sms/receipts-read.
+
+The same settings can be changed at runtime with POST /_mock/config, and
+request/message counters are available at GET /_mock/stats (POST
+/_mock/reset clears them).
+
+Usage (from the server directory):
+    python benchmarks/mock_clicksend.py [--port 8089] [--latency-ms 80] [--failure-rate 0.02]
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SEND_PATH = "/v3/sms/send"
+RECEIPTS_PATH = "/v3/sms/receipts"
+RECEIPTS_READ_PATH = "/v3/sms/receipts-read"
+CONFIG_PATH = "/_mock/config"
+STATS_PATH = "/_mock/stats"
+RESET_PATH = "/_mock/reset"
+
+DEFAULT_CONFIG = {
+    "latency_ms": 0.0,
+    "jitter_ms": 0.0,
+    "failure_rate": 0.0,
+    "failure_status": "INVALID_RECIPIENT",
+    "error_rate": 0.0,
+    "error_status": 503,
+    "max_messages": 1000,
+    "undelivered_rate": 0.0,
+}
+
+ERROR_BODIES = {
+    400: {"http_code": 400, "response_code": "BAD_REQUEST", "response_msg": "Bad request.", "data": None},
+    401: {"http_code": 401, "response_code": "UNAUTHORIZED", "response_msg": "Unauthorized.", "data": None},
+    429: {"http_code": 429, "response_code": "TOO_MANY_REQUESTS", "response_msg": "Slow down.", "data": None},
+    500: {"http_code": 500, "response_code": "INTERNAL_SERVER_ERROR", "response_msg": "Server error.", "data": None},
+    503: {"http_code": 503, "response_code": "SERVICE_UNAVAILABLE", "response_msg": "Unavailable.", "data": None},
+}
+
+
+class MockState:
+    """Fault-injection settings and counters shared by all handler threads."""
+
+    def __init__(self, **overrides):
+        self.lock = threading.Lock()
+        self.config = {**DEFAULT_CONFIG, **overrides}
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.receipts = []
+            self.stats = {
+                "requests": 0,
+                "messages": 0,
+                "message_failures": 0,
+                "http_errors": 0,
+            }
+
+    def update(self, **changes):
+        with self.lock:
+            self.config.update({k: v for k, v in changes.items() if k in DEFAULT_CONFIG})
+
+    def add_receipts(self, data_messages):
+        with self.lock:
+            rate = self.config["undelivered_rate"]
+            for message in data_messages:
+                if message["status"] != "SUCCESS":
+                    continue
+                undelivered = rate and random.random() < rate
+                self.receipts.append({
+                    "timestamp": message["date"],
+                    "message_id": message["message_id"],
+                    "status_code": "301" if undelivered else "201",
+                    "status_text": "Undelivered" if undelivered else "Delivered",
+                    "error_code": None,
+                    "error_text": None,
+                    "custom_string": message["custom_string"],
+                    "read": False,
+                })
+
+    def count(self, **increments):
+        with self.lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+
+
+def _e164(number):
+    number = str(number)
+    return number if number.startswith("+") else f"+1{number}"
+
+
+def build_send_response(messages, failure_rate=0.0, failure_status="INVALID_RECIPIENT"):
+    """Build a ClickSend-shaped response, rejecting a fraction of messages."""
+    now = int(time.time())
+    data_messages = []
+    queued = 0
+    for message in messages:
+        failed = failure_rate and random.random() < failure_rate
+        if not failed:
+            queued += 1
+        data_messages.append({
+            "direction": "out",
+            "date": now,
+            "to": _e164(message.get("to", "")),
+            "body": message.get("body"),
+            "from": message.get("from", ""),
+            "schedule": 0,
+            "message_id": str(uuid.uuid4()).upper(),
+            "message_parts": 1,
+            "message_price": "0.0000" if failed else "0.0264",
+            "custom_string": message.get("custom_string", ""),
+            "country": message.get("country", "US"),
+            "status": failure_status if failed else "SUCCESS",
+        })
+    return {
+        "http_code": 200,
+        "response_code": "SUCCESS",
+        "response_msg": "Messages queued for delivery.",
+        "data": {
+            "total_price": round(0.0264 * queued, 4),
+            "total_count": len(data_messages),
+            "queued_count": queued,
+            "messages": data_messages,
+            "_currency": {"currency_name_short": "USD"},
+        },
+    }
+
+
+class MockClickSendHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    # Buffer the response so headers and body leave in one send (flushed after
+    # each request). Two small sends on a kept-alive connection stall for the
+    # client's delayed ACK (~40 ms) under Nagle's algorithm.
+    wbufsize = -1
+    state = MockState()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length)
+        return json.loads(raw or b"{}")
+
+    def _send_receipts(self):
+        query = parse_qs(urlparse(self.path).query)
+        page = int(query.get("page", ["1"])[0])
+        limit = int(query.get("limit", ["15"])[0])
+        with self.state.lock:
+            unread = [r for r in self.state.receipts if not r["read"]]
+        last_page = max(1, (len(unread) + limit - 1) // limit)
+        page_items = unread[(page - 1) * limit:page * limit]
+        self._send_json(200, {
+            "http_code": 200,
+            "response_code": "SUCCESS",
+            "response_msg": "Here are your delivery receipts.",
+            "data": {
+                "total": len(unread),
+                "per_page": limit,
+                "current_page": page,
+                "last_page": last_page,
+                "data": [{k: v for k, v in r.items() if k != "read"} for r in page_items],
+            },
+        })
+
+    def do_PUT(self):
+        body = self._read_json()
+        if urlparse(self.path).path != RECEIPTS_READ_PATH:
+            self._send_json(404, {"http_code": 404, "response_code": "NOT_FOUND"})
+            return
+        date_before = body.get("date_before") or int(time.time())
+        with self.state.lock:
+            for receipt in self.state.receipts:
+                if receipt["timestamp"] <= date_before:
+                    receipt["read"] = True
+        self._send_json(200, {"http_code": 200, "response_code": "SUCCESS", "data": None})
+
+    def do_GET(self):
+        if urlparse(self.path).path == RECEIPTS_PATH:
+            self._send_receipts()
+            return
+        if self.path == STATS_PATH:
+            with self.state.lock:
+                self._send_json(200, {"config": self.state.config, "stats": self.state.stats})
+            return
+        self._send_json(404, {"http_code": 404, "response_code": "NOT_FOUND"})
+
+    def do_POST(self):
+        body = self._read_json()
+
+        if self.path == CONFIG_PATH:
+            self.state.update(**body)
+            self._send_json(200, {"config": self.state.config})
+            return
+        if self.path == RESET_PATH:
+            self.state.reset()
+            self._send_json(200, {"stats": self.state.stats})
+            return
+        if self.path != SEND_PATH:
+            self._send_json(404, {"http_code": 404, "response_code": "NOT_FOUND"})
+            return
+
+        config = dict(self.state.config)
+        messages = body.get("messages", [])
+        self.state.count(requests=1)
+
+        delay = config["latency_ms"] + random.uniform(-config["jitter_ms"], config["jitter_ms"])
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        if not self.headers.get("Authorization", "").startswith("Basic "):
+            self.state.count(http_errors=1)
+            self._send_json(401, ERROR_BODIES[401])
+            return
+        if config["error_rate"] and random.random() < config["error_rate"]:
+            status = int(config["error_status"])
+            self.state.count(http_errors=1)
+            self._send_json(status, ERROR_BODIES.get(status, ERROR_BODIES[500]))
+            return
+        if not messages or len(messages) > config["max_messages"]:
+            self.state.count(http_errors=1)
+            self._send_json(400, ERROR_BODIES[400])
+            return
+
+        response = build_send_response(messages, config["failure_rate"], config["failure_status"])
+        self.state.count(
+            messages=len(messages),
+            message_failures=len(messages) - response["data"]["queued_count"],
+        )
+        self.state.add_receipts(response["data"]["messages"])
+        self._send_json(200, response)
+
+
+def start_server(port=0, **config):
+    """Start a mock server on a background thread and return it."""
+    handler_class = type(
+        "ConfiguredMockClickSendHandler", (MockClickSendHandler,), {"state": MockState(**config)}
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler_class)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def server_state(server):
+    """Return the MockState of a server started with start_server."""
+    return server.RequestHandlerClass.state
+
+
+def server_url(server):
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}{SEND_PATH}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock ClickSend SMS API")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_CONFIG["latency_ms"])
+    parser.add_argument("--jitter-ms", type=float, default=DEFAULT_CONFIG["jitter_ms"])
+    parser.add_argument("--failure-rate", type=float, default=DEFAULT_CONFIG["failure_rate"])
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_CONFIG["error_rate"])
+    parser.add_argument("--error-status", type=int, default=DEFAULT_CONFIG["error_status"])
+    parser.add_argument("--max-messages", type=int, default=DEFAULT_CONFIG["max_messages"])
+    parser.add_argument("--undelivered-rate", type=float, default=DEFAULT_CONFIG["undelivered_rate"])
+    args = parser.parse_args()
+
+    handler_class = type("ConfiguredMockClickSendHandler", (MockClickSendHandler,), {
+        "state": MockState(
+            latency_ms=args.latency_ms,
+            jitter_ms=args.jitter_ms,
+            failure_rate=args.failure_rate,
+            error_rate=args.error_rate,
+            error_status=args.error_status,
+            max_messages=args.max_messages,
+            undelivered_rate=args.undelivered_rate,
+        ),
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), handler_class)
+    print(f"Mock ClickSend listening on {server_url(server)}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
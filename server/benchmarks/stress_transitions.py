@@ -0,0 +1,189 @@
+"""
+Concurrency check for order approvals (lib/transitions.py).
+
+Creates --orders pending orders and, for each one, releases --threads
+requests at the same instant: half of them approve it, half reject it. Exactly
+one request per order may succeed; every other one must get a 409. The script
+then checks in the database that each order was changed exactly once, and
+exits with status 1 if anything raced.
+
+Use PostgreSQL and several workers, so requests really run in parallel; the
+script starts its own gunicorn unless --base-url points at a running server.
+It creates its own global approver, and deletes the orders it created when
+it is done.
+
+Usage (from the server directory):
+    python benchmarks/stress_transitions.py --database-url postgresql://localhost/po_bench
+    python benchmarks/stress_transitions.py --orders 100 --threads 32 --workers 4
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import requests
+
+from bench_gunicorn_profiles import start_gunicorn, stop_gunicorn
+
+STRESS_EMAIL = "stress-approver@example.com"
+
+
+def seed(order_count):
+    """Create the approver, a vendor and pending orders. Returns (user_id, order_ids)."""
+    from app import app
+    from db import db
+    from models import Department, Order, OrderItem, User, Vendor
+    from models.approver import Approver
+    from models.order import OrderStatus
+
+    with app.app_context():
+        user = User.query.filter_by(email=STRESS_EMAIL).first()
+        if not user:
+            department = Department(name=f"Stress {uuid.uuid4().hex[:6]}")
+            db.session.add(department)
+            db.session.flush()
+            user = User(
+                email=STRESS_EMAIL, first_name="Stress", last_name="Approver", department_id=department.id,
+            )
+            user.set_password(uuid.uuid4().hex)
+            db.session.add(user)
+            db.session.flush()
+            # No departments assigned: a global approver
+            db.session.add(Approver(user_id=user.id))
+        vendor = Vendor.query.filter_by(name="Bench Vendor").first()
+        if not vendor:
+            vendor = Vendor(name="Bench Vendor")
+            db.session.add(vendor)
+        db.session.flush()
+
+        order_ids = []
+        for i in range(order_count):
+            order = Order(
+                order_number=f"STRESS-{uuid.uuid4().hex[:10]}",
+                vendor_id=vendor.id,
+                description=f"Stress order {i}",
+                status=OrderStatus.PENDING,
+                ordered_by_id=user.id,
+            )
+            db.session.add(order)
+            db.session.flush()
+            db.session.add(OrderItem(order_id=order.id, line_number=1, description="Part", quantity=1, unit_cost=5))
+            order_ids.append(order.id)
+        db.session.commit()
+        return user.id, order_ids
+
+
+def final_states(order_ids) -> dict:
+    from app import app
+    from models import Order
+
+    with app.app_context():
+        orders = Order.query.filter(Order.id.in_(order_ids)).all()
+        return {o.id: (o.status, o.approved_by_id, o.rejected_by_id) for o in orders}
+
+
+def cleanup(order_ids):
+    from app import app
+    from db import db
+    from models import Order, OrderItem
+
+    with app.app_context():
+        OrderItem.query.filter(OrderItem.order_id.in_(order_ids)).delete(synchronize_session=False)
+        Order.query.filter(Order.id.in_(order_ids)).delete(synchronize_session=False)
+        db.session.commit()
+
+
+def hammer(base_url, token, order_id, threads) -> tuple[Counter, list[float]]:
+    """Fire threads approve/reject requests at one order at once. Returns (status codes, latencies)."""
+    barrier = threading.Barrier(threads)
+    codes, latencies, lock = Counter(), [], threading.Lock()
+
+    def client(action):
+        session = requests.Session()
+        session.cookies.set("token", token)
+        barrier.wait()
+        start = time.perf_counter()
+        try:
+            status = session.post(f"{base_url}/api/order/{order_id}/{action}", json={"comment": "stress"}).status_code
+        except requests.RequestException:
+            status = "error"
+        with lock:
+            codes[status] += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    workers = [
+        threading.Thread(target=client, args=("approve" if i % 2 == 0 else "reject",))
+        for i in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return codes, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent approval stress test")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--base-url", help="Use a running server instead of starting gunicorn")
+    parser.add_argument("--orders", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=16, help="Concurrent requests per order")
+    parser.add_argument("--workers", type=int, default=4, help="WEB_CONCURRENCY for the started server")
+    parser.add_argument("--port", type=int, default=8056)
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error("--database-url (or DATABASE_URL) is required")
+    os.environ["DATABASE_URL"] = args.database_url
+
+    from lib.authenticate import generate_token
+
+    user_id, order_ids = seed(args.orders)
+    token = generate_token(user_id)
+
+    process = None
+    base_url = args.base_url
+    if not base_url:
+        env = {**os.environ, "WEB_CONCURRENCY": str(args.workers), "GUNICORN_THREADS": str(args.threads)}
+        process, base_url = start_gunicorn("gthread", args.port, env)
+
+    failures = 0
+    totals, latencies = Counter(), []
+    try:
+        for order_id in order_ids:
+            codes, order_latencies = hammer(base_url, token, order_id, args.threads)
+            totals.update(codes)
+            latencies.extend(order_latencies)
+            if codes[200] != 1 or codes[409] != args.threads - 1:
+                failures += 1
+                print(f"  order {order_id}: {dict(codes)}")
+
+        for order_id, (status, approved_by, rejected_by) in final_states(order_ids).items():
+            changed_once = (status == "approved") != (status == "rejected") and bool(approved_by) != bool(rejected_by)
+            if not changed_once:
+                failures += 1
+                print(f"  order {order_id}: status {status}, approved_by {approved_by}, rejected_by {rejected_by}")
+    finally:
+        if process:
+            stop_gunicorn(process)
+        cleanup(order_ids)
+
+    latencies.sort()
+    print(
+        f"{args.orders} orders x {args.threads} concurrent requests: {dict(totals)}; "
+        f"p50 {latencies[len(latencies) // 2]:.1f} ms, max {latencies[-1]:.1f} ms"
+    )
+    if failures:
+        print(f"FAILED: {failures} orders were not transitioned exactly once")
+        sys.exit(1)
+    print("OK: every order was transitioned exactly once")
+
+
+if __name__ == "__main__":
+    main()
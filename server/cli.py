@@ -0,0 +1,105 @@
+"""
+Flask CLI commands, run from the server directory:
+
+    flask --app app db upgrade      # apply migrations (migrations/)
+    flask --app app seed            # create required rows; safe to re-run
+    flask --app app backfill list   # registered backfills and their progress
+    flask --app app backfill run <name> [--batch-size N] [--sleep S] [--max-rate R]
+
+`db upgrade` and `seed` run in the Heroku release phase (see Procfile), so web and worker
+processes start without touching the schema.
+"""
+
+import os
+
+import click
+
+from constants import REPAIRS_DEPARTMENT_ID
+from db import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+
+def seed_repairs_department() -> bool:
+    """Create the Repairs department if it doesn't exist. Returns True if created."""
+    from models import Department
+
+    if db.session.get(Department, REPAIRS_DEPARTMENT_ID):
+        return False
+    db.session.add(Department(
+        id=REPAIRS_DEPARTMENT_ID,
+        name="Repairs",
+        description="Department for repair request approvals",
+        is_active=True,
+    ))
+    db.session.commit()
+    return True
+
+
+@click.command("seed")
+def seed_command():
+    """Create rows the application expects to exist."""
+    if seed_repairs_department():
+        click.echo(f"Repairs department created: {REPAIRS_DEPARTMENT_ID}")
+    else:
+        click.echo("Repairs department already exists")
+
+
+@click.group("backfill")
+def backfill_group():
+    """Batched, resumable data backfills (see lib/backfill.py)."""
+
+
+@backfill_group.command("list")
+def backfill_list_command():
+    """List registered backfills with their checkpoints."""
+    from lib.backfill import get_checkpoints, load_backfills
+
+    checkpoints = {c["name"]: c for c in get_checkpoints()}
+    backfills = load_backfills()
+    if not backfills:
+        click.echo("No backfills registered")
+    for name, backfill in sorted(backfills.items()):
+        checkpoint = checkpoints.get(name)
+        progress = (
+            f"{checkpoint['status']}, {checkpoint['rows_processed']:,} rows in {checkpoint['batches']:,} batches"
+            if checkpoint else "not started"
+        )
+        click.echo(f"{name:<30} {backfill.model.__tablename__:<20} {progress}  {backfill.description}")
+
+
+@backfill_group.command("run")
+@click.argument("name")
+@click.option("--batch-size", type=int, help="Rows per batch (default: the backfill's own)")
+@click.option("--sleep", "sleep_seconds", type=float, default=None, help="Seconds to pause after every batch")
+@click.option("--max-rate", type=float, help="Maximum rows per second")
+@click.option("--max-batches", type=int, help="Stop after this many batches; resume later")
+@click.option("--restart", is_flag=True, help="Ignore the checkpoint and start from the first row")
+def backfill_run_command(name, batch_size, sleep_seconds, max_rate, max_batches, restart):
+    """Run or resume a backfill."""
+    from lib.backfill import DEFAULT_SLEEP_SECONDS, run_backfill
+
+    try:
+        checkpoint = run_backfill(
+            name,
+            batch_size=batch_size,
+            sleep_seconds=DEFAULT_SLEEP_SECONDS if sleep_seconds is None else sleep_seconds,
+            max_rows_per_second=max_rate,
+            max_batches=max_batches,
+            restart=restart,
+            report=click.echo,
+        )
+    except KeyError:
+        raise click.ClickException(f"Unknown backfill {name!r}; see `flask backfill list`")
+    if checkpoint.status != "completed":
+        click.echo(f"Stopped after --max-batches; run again to resume after key {checkpoint.last_key}")
+
+
+def register_commands(app):
+    app.cli.add_command(seed_command)
+    app.cli.add_command(backfill_group)
+    # Alembic is slow to import; web and worker processes never need it
+    if os.environ.get("FLASK_RUN_FROM_CLI") == "true":
+        from flask_migrate import Migrate
+
+        Migrate(app, db, directory=MIGRATIONS_DIR, compare_type=True)
@@ -1,4 +1,4 @@
-from flask import request, jsonify
+from flask import current_app, request, jsonify
 from sqlalchemy import or_
 from db import db
 from models.department import Department
@@ -9,6 +9,8 @@ from models.approver import Approver
 from models.approver_department import ApproverDepartment
 from models.technician import Technician
 from lib.phone_utils import format_us_phone
+from lib import reference_data
+from lib.db_engine import pool_stats
 
 
 # Default pagination settings
@@ -19,8 +21,7 @@ DEFAULT_PER_PAGE = 10
 
 def get_departments():
     """Get all departments."""
-    departments = Department.query.order_by(Department.name).all()
-    return jsonify([d.to_dict() for d in departments])
+    return jsonify(reference_data.get_departments(False))
 
 
 def get_department(department_id):
@@ -707,3 +708,14 @@ def delete_technician(technician_id, current_user):
     db.session.commit()
 
     return jsonify({"message": "Technician removed"})
+
+
+# ============== DATABASE ==============
+
+def get_pool_stats():
+    """Connection pool counters of the worker that serves this request, per engine."""
+    data = pool_stats(db.engine)
+    data["replicas"] = [
+        pool_stats(engine) for engine in current_app.extensions.get("read_replicas", [])
+    ]
+    return jsonify(data)
@@ -0,0 +1,28 @@
+from flask import Response, current_app, jsonify, request
+from lib.events import (
+    MAX_STREAM_SECONDS,
+    acquire_stream,
+    release_stream,
+    start_listener,
+    stream,
+    user_scope,
+)
+
+
+def stream_events(current_user):
+    """Stream order and repair status changes visible to the current user (SSE)."""
+    start_listener(current_app._get_current_object())
+    scope = user_scope(current_user)
+
+    if not acquire_stream():
+        response = jsonify({"error": "Too many open event streams, try again later"})
+        response.headers["Retry-After"] = str(int(MAX_STREAM_SECONDS // 10))
+        return response, 503
+
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    response = Response(stream(scope, last_event_id), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    # Stop reverse proxies from buffering the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    response.call_on_close(release_stream)
+    return response
@@ -0,0 +1,30 @@
+import os
+
+from flask import jsonify
+from sqlalchemy import text
+
+from db import db
+from lib.events import is_listening
+from lib.warmup import get_status
+
+
+def liveness():
+    """The process is up and serving requests."""
+    return jsonify({"status": "ok", "pid": os.getpid()})
+
+
+def readiness():
+    """Whether this worker is warmed up and can reach the database (503 if not)."""
+    warmup = get_status()
+    checks = {"warmed_up": warmup["state"] == "ready", "listening": is_listening()}
+    try:
+        db.session.execute(text("SELECT 1"))
+        checks["database"] = True
+    except Exception:
+        db.session.rollback()
+        checks["database"] = False
+
+    # The dev server never warms up and starts its listener lazily
+    required = ("database",) if warmup["state"] == "cold" else ("database", "warmed_up", "listening")
+    ready = all(checks[name] for name in required)
+    return jsonify({"ready": ready, "checks": checks, "warmup": warmup}), 200 if ready else 503
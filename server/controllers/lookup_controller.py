@@ -2,7 +2,7 @@ from flask import request, jsonify
 from db import db
 from models.vendor import Vendor
 from models.unit import Unit
-from models.department import Department
+from lib.reference_data import UNIT_OPTIONS_LIMIT, get_departments, get_unit_options
 
 
 def search_vendors(current_user):
@@ -24,31 +24,25 @@ def search_vendors(current_user):
 def search_units(current_user):
     """Search units by number or description."""
     query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify(get_unit_options())
     
     units = Unit.query.filter(
-        Unit.is_active == True
+        Unit.is_active == True,
+        db.or_(
+            Unit.unit_number.ilike(f"%{query}%"),
+            Unit.description.ilike(f"%{query}%"),
+        ),
     )
     
-    if query:
-        units = units.filter(
-            db.or_(
-                Unit.unit_number.ilike(f"%{query}%"),
-                Unit.description.ilike(f"%{query}%"),
-            )
-        )
-    
-    units = units.order_by(Unit.unit_number).limit(50).all()
+    units = units.order_by(Unit.unit_number).limit(UNIT_OPTIONS_LIMIT).all()
     
     return jsonify([u.to_dict(include_department=True) for u in units])
 
 
 def get_departments_list(current_user):
     """Get all active departments for dropdowns."""
-    departments = Department.query.filter(
-        Department.is_active == True
-    ).order_by(Department.name).all()
-    
-    return jsonify([d.to_dict() for d in departments])
+    return jsonify(get_departments(True))
 
 
 def create_vendor_quick(current_user):
@@ -1,45 +1,98 @@
 from datetime import datetime, timezone
 from flask import request, jsonify
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from db import db
 from models.order import Order, OrderStatus
 from models.order_item import OrderItem
 from models.approver import Approver
 from models.vendor import Vendor
 from models.unit import Unit
+from models.user import User
+from lib.delta_sync import deleted_since, get_sync_params, record_tombstone
+from lib.serializers import serialize_orders
+from lib.events import publish_status_change
+from lib.reference_data import can_approve_for_department, get_approver_routing
+from lib.request_timing import phase
+from lib.transitions import transition, transition_failed
+from lib.write_response import commit_keep_loaded, wants_minimal, write_many_response, write_response
 from lib.sms_service import notify_order_pending, notify_order_approved, notify_order_paid
 
+MAX_BULK_ORDERS = 100
+
+# Everything order.to_dict(include_relations=True) reads, loaded with a transition's RETURNING row
+ORDER_RESPONSE_OPTIONS = (
+    selectinload(Order.items),
+    selectinload(Order.vendor),
+    selectinload(Order.unit),
+    selectinload(Order.po_group),
+    selectinload(Order.ordered_by),
+    selectinload(Order.approved_by),
+    selectinload(Order.rejected_by),
+)
+
 
 def get_orders(current_user):
     """Get orders for current user (their own or ones they can approve)."""
+    try:
+        sync = get_sync_params()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    since = sync["since"]
+
     # Get orders created by the user
-    user_orders = Order.query.filter_by(ordered_by_id=current_user.id).all()
+    user_query = Order.query.filter_by(ordered_by_id=current_user.id)
+    if since:
+        user_query = user_query.filter(Order.updated_at >= since)
+    user_orders = user_query.all()
 
     # If user is an approver, also get pending orders they can approve
     approver_orders = []
+    left_view = []
     if current_user.is_approver:
-        approver = Approver.query.filter_by(user_id=current_user.id).first()
-        if approver:
-            pending_orders = Order.query.filter_by(status=OrderStatus.PENDING).all()
-            for order in pending_orders:
+        routing = get_approver_routing(current_user.id)
+        if routing:
+            if since:
+                # Any status: orders that stopped being pending must leave the client's view
+                candidates = Order.query.filter(
+                    Order.updated_at >= since, Order.ordered_by_id != current_user.id
+                ).all()
+            else:
+                candidates = Order.query.filter_by(status=OrderStatus.PENDING).all()
+            for order in candidates:
                 # Check if approver can approve based on department
-                if order.ordered_by and approver.can_approve_for_department(order.ordered_by.department_id):
-                    if order not in user_orders:
+                if order.ordered_by and can_approve_for_department(routing, order.ordered_by.department_id):
+                    if order.status != OrderStatus.PENDING:
+                        left_view.append(order.id)
+                    elif order not in user_orders:
                         approver_orders.append(order)
 
     all_orders = user_orders + approver_orders
-    return jsonify([order.to_dict(include_relations=True) for order in all_orders])
+    deleted = None
+    if since:
+        deleted = left_view + deleted_since("order", since, owner_id=current_user.id)
+    return serialize_orders(all_orders, sync=sync, deleted=deleted)
 
 
 def get_all_orders(current_user):
     """Get all orders (admin sees all, approvers see their departments)."""
-    from models.user import User
+    try:
+        sync = get_sync_params()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    since = sync["since"]
 
     # Build base query
     query = Order.query
 
-    # Apply filters from query params
+    # Apply filters from query params. In a delta sync the status filter is
+    # applied after loading, so orders that changed status out of it are
+    # reported as deleted.
     status = request.args.get("status")
-    if status and status in OrderStatus.all():
+    if status not in OrderStatus.all():
+        status = None
+    if status and not since:
         query = query.filter_by(status=status)
 
     owner_id = request.args.get("owner_id")
@@ -50,31 +103,30 @@ def get_all_orders(current_user):
     if vendor_id:
         query = query.filter_by(vendor_id=vendor_id)
 
-    # If admin, return all matching orders
-    if current_user.is_admin:
+    # Admins and global approvers see all orders
+    department_ids = None
+    if not current_user.is_admin:
+        routing = get_approver_routing(current_user.id) if current_user.is_approver else None
+        if not routing:
+            # Not authorized
+            return jsonify({"error": "Access denied"}), 403
+
+        # Department-scoped approvers see only their departments
+        if not routing["is_global"]:
+            department_ids = list(routing["department_ids"])
+            # Join with User to filter by department
+            query = query.join(User, Order.ordered_by_id == User.id)
+            query = query.filter(User.department_id.in_(department_ids))
+
+    if not since:
         orders = query.order_by(Order.created_at.desc()).all()
-        return jsonify([order.to_dict(include_relations=True) for order in orders])
+        return serialize_orders(orders, sync=sync)
 
-    # If approver, filter by departments they can approve
-    if current_user.is_approver:
-        approver = Approver.query.filter_by(user_id=current_user.id).first()
-        if approver:
-            # Global approvers see all
-            if approver.is_global_approver:
-                orders = query.order_by(Order.created_at.desc()).all()
-                return jsonify([order.to_dict(include_relations=True) for order in orders])
-
-            # Department-scoped approvers see only their departments
-            department_ids = approver.department_ids
-            if department_ids:
-                # Join with User to filter by department
-                query = query.join(User, Order.ordered_by_id == User.id)
-                query = query.filter(User.department_id.in_(department_ids))
-                orders = query.order_by(Order.created_at.desc()).all()
-                return jsonify([order.to_dict(include_relations=True) for order in orders])
-
-    # Not authorized
-    return jsonify({"error": "Access denied"}), 403
+    changed = query.filter(Order.updated_at >= since).order_by(Order.created_at.desc()).all()
+    orders = [order for order in changed if not status or order.status == status]
+    deleted = [order.id for order in changed if status and order.status != status]
+    deleted += deleted_since("order", since, owner_id=owner_id, department_ids=department_ids)
+    return serialize_orders(orders, sync=sync, deleted=deleted)
 
 
 def get_order(order_id, current_user):
@@ -90,72 +142,129 @@ def get_order(order_id, current_user):
     )
 
     if not can_access and current_user.is_approver:
-        approver = Approver.query.filter_by(user_id=current_user.id).first()
-        if approver and approver.can_approve_for_department(order.ordered_by.department_id):
+        routing = get_approver_routing(current_user.id)
+        if can_approve_for_department(routing, order.ordered_by.department_id):
             can_access = True
 
     if not can_access:
         return jsonify({"error": "Access denied"}), 403
 
-    return jsonify(order.to_dict(include_relations=True))
-
-
-def create_order(current_user):
-    """Create a new order."""
-    data = request.get_json()
+    with phase("serialize"):
+        payload = order.to_dict(include_relations=True)
+    return jsonify(payload)
 
-    if not data:
-        return jsonify({"error": "No data provided"}), 400
 
-    # Validate required fields
+def _missing_fields(data) -> str | None:
+    """Error for a create payload that lacks required fields, else None."""
+    if not isinstance(data, dict):
+        return "No data provided"
     if not data.get("vendor_id"):
-        return jsonify({"error": "Vendor is required"}), 400
+        return "Vendor is required"
     if not data.get("description"):
-        return jsonify({"error": "Description is required"}), 400
-
-    # Validate vendor exists
-    vendor = Vendor.query.get(data["vendor_id"])
-    if not vendor:
-        return jsonify({"error": "Vendor not found"}), 404
-
-    # Validate unit if provided
-    if data.get("unit_id"):
-        unit = Unit.query.get(data["unit_id"])
-        if not unit:
-            return jsonify({"error": "Unit not found"}), 404
-
-    # Create order
-    order = Order(
-        order_number=Order.generate_order_number(),
-        vendor_id=data["vendor_id"],
-        unit_id=data.get("unit_id"),
+        return "Description is required"
+    return None
+
+
+def _load_references(orders_data) -> tuple[dict, dict]:
+    """
+    Load the vendors and units referenced by create payloads, one query per table.
+
+    Returns:
+        ({vendor_id: Vendor}, {unit_id: Unit}) for the ones that exist
+    """
+    vendor_ids = {data["vendor_id"] for data in orders_data}
+    unit_ids = {data["unit_id"] for data in orders_data if data.get("unit_id")}
+    vendors = {vendor.id: vendor for vendor in Vendor.query.filter(Vendor.id.in_(vendor_ids))}
+    units = {unit.id: unit for unit in Unit.query.filter(Unit.id.in_(unit_ids))} if unit_ids else {}
+    return vendors, units
+
+
+def _reference_error(data, vendors, units) -> str | None:
+    if data["vendor_id"] not in vendors:
+        return "Vendor not found"
+    if data.get("unit_id") and data["unit_id"] not in units:
+        return "Unit not found"
+    return None
+
+
+def _new_order(data, order_number, vendors, units, current_user):
+    # Relationships are set from the rows already loaded, and the order and its
+    # items are inserted in one batched statement per table at commit, so the
+    # response needs no further queries
+    return Order(
+        order_number=order_number,
+        vendor=vendors[data["vendor_id"]],
+        unit=units.get(data.get("unit_id")),
         description=data["description"],
         status=OrderStatus.DRAFT,
-        ordered_by_id=current_user.id,
+        ordered_by=current_user,
         notes=data.get("notes"),
+        items=_build_items(data.get("items", [])),
     )
 
-    db.session.add(order)
-    db.session.flush()
 
-    # Add line items
-    items = data.get("items", [])
-    for idx, item_data in enumerate(items):
-        if not item_data.get("description"):
-            continue
+def create_order(current_user):
+    """Create a new order."""
+    data = request.get_json()
 
-        item = OrderItem(
-            order_id=order.id,
-            line_number=idx + 1,
-            description=item_data["description"],
-            quantity=item_data.get("quantity"),
-            unit_cost=item_data.get("unit_cost"),
-        )
-        db.session.add(item)
+    if not data:
+        return jsonify({"error": "No data provided"}), 400
 
-    db.session.commit()
+    # Validate required fields
+    error = _missing_fields(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    # Validate the vendor and unit exist
+    vendors, units = _load_references([data])
+    error = _reference_error(data, vendors, units)
+    if error:
+        return jsonify({"error": error}), 404
 
-    return jsonify(order.to_dict(include_relations=True)), 201
+    order = _new_order(data, Order.generate_order_number(), vendors, units, current_user)
+    db.session.add(order)
+    commit_keep_loaded()
+
+    return write_response(order, status=201)
+
+
+def create_orders_bulk(current_user):
+    """Create several draft orders in one request; either all are created or none."""
+    data = request.get_json(silent=True) or {}
+    orders_data = data.get("orders") if isinstance(data, dict) else None
+
+    if not orders_data or not isinstance(orders_data, list):
+        return jsonify({"error": "Orders are required"}), 400
+    if len(orders_data) > MAX_BULK_ORDERS:
+        return jsonify({"error": f"At most {MAX_BULK_ORDERS} orders per request"}), 400
+
+    errors = {}
+    for index, order_data in enumerate(orders_data):
+        error = _missing_fields(order_data)
+        if error:
+            errors[index] = error
+    complete = [order_data for index, order_data in enumerate(orders_data) if index not in errors]
+    vendors, units = _load_references(complete) if complete else ({}, {})
+    for index, order_data in enumerate(orders_data):
+        if index not in errors:
+            error = _reference_error(order_data, vendors, units)
+            if error:
+                errors[index] = error
+    if errors:
+        return jsonify({
+            "error": "Some orders are invalid; none were created",
+            "errors": [{"index": index, "error": error} for index, error in sorted(errors.items())],
+        }), 400
+
+    order_numbers = Order.generate_order_numbers(len(orders_data))
+    orders = [
+        _new_order(order_data, order_number, vendors, units, current_user)
+        for order_data, order_number in zip(orders_data, order_numbers)
+    ]
+    db.session.add_all(orders)
+    commit_keep_loaded()
+
+    return write_many_response(orders, status=201)
 
 
 def update_order(order_id, current_user):
@@ -179,14 +288,15 @@ def update_order(order_id, current_user):
         vendor = Vendor.query.get(data["vendor_id"])
         if not vendor:
             return jsonify({"error": "Vendor not found"}), 404
-        order.vendor_id = data["vendor_id"]
+        order.vendor = vendor
 
     if "unit_id" in data:
+        unit = None
         if data["unit_id"]:
             unit = Unit.query.get(data["unit_id"])
             if not unit:
                 return jsonify({"error": "Unit not found"}), 404
-        order.unit_id = data["unit_id"]
+        order.unit = unit
 
     if "description" in data:
         order.description = data["description"]
@@ -195,26 +305,11 @@ def update_order(order_id, current_user):
 
     # Update items if provided
     if "items" in data:
-        # Remove existing items
-        OrderItem.query.filter_by(order_id=order.id).delete()
-
-        # Add new items
-        for idx, item_data in enumerate(data["items"]):
-            if not item_data.get("description"):
-                continue
-
-            item = OrderItem(
-                order_id=order.id,
-                line_number=idx + 1,
-                description=item_data["description"],
-                quantity=item_data.get("quantity"),
-                unit_cost=item_data.get("unit_cost"),
-            )
-            db.session.add(item)
+        _replace_items(order, data["items"])
 
-    db.session.commit()
+    commit_keep_loaded()
 
-    return jsonify(order.to_dict(include_relations=True))
+    return write_response(order)
 
 
 def delete_order(order_id, current_user):
@@ -229,6 +324,7 @@ def delete_order(order_id, current_user):
     if order.status != OrderStatus.DRAFT:
         return jsonify({"error": "Only draft orders can be deleted"}), 400
 
+    record_tombstone("order", order.id, order.ordered_by_id, order.ordered_by.department_id)
     db.session.delete(order)
     db.session.commit()
 
@@ -256,46 +352,91 @@ def submit_order(order_id, current_user):
         return jsonify({"error": "No approvers configured for your department"}), 400
 
     order.status = OrderStatus.PENDING
-    db.session.commit()
 
-    # Notify approvers via SMS
+    # Queue SMS to approvers in the same transaction as the status change
     notify_order_pending(order, approvers, current_user.full_name)
+    publish_status_change("order", order, order.ordered_by_id, order.ordered_by.department_id)
+    commit_keep_loaded()
 
-    return jsonify({
+    return write_response(order, lambda: {
         "message": "Order submitted for approval",
         "order": order.to_dict(include_relations=True),
         "approvers": [a.to_dict(include_user=True) for a in approvers],
     })
 
 
-def approve_order(order_id, current_user):
-    """Approve an order."""
-    order = Order.query.get(order_id)
-    if not order:
-        return jsonify({"error": "Order not found"}), 404
+def _build_items(items_data) -> list:
+    """Line items from request data, skipping lines without a description."""
+    return [
+        OrderItem(
+            line_number=idx + 1,
+            description=item_data["description"],
+            quantity=item_data.get("quantity"),
+            unit_cost=item_data.get("unit_cost"),
+        )
+        for idx, item_data in enumerate(items_data)
+        if item_data.get("description")
+    ]
 
-    if order.status != OrderStatus.PENDING:
-        return jsonify({"error": "Only pending orders can be approved"}), 400
 
+def _replace_items(order, items_data):
+    """Replace an order's line items with one DELETE plus the inserts."""
+    OrderItem.query.filter_by(order_id=order.id).delete()
+    # The bulk delete bypasses the loaded collection; start it over so the
+    # response lists the new items without reloading them
+    set_committed_value(order, "items", [])
+    order.items.extend(_build_items(items_data))
+    # Replacing items does not touch the order row, so mark it changed for delta sync
+    order.updated_at = datetime.now(timezone.utc)
+
+
+def _department_scope(routing: dict):
+    """WHERE clauses limiting a transition to orders from the approver's departments."""
+    if routing["is_global"]:
+        return ()
+    return (Order.ordered_by_id.in_(
+        select(User.id).where(User.department_id.in_(routing["department_ids"]))
+    ),)
+
+
+# Department of the order's creator, for telling 403 from 409 after a failed transition
+_ORDER_DEPARTMENT = (
+    select(User.department_id).where(User.id == Order.ordered_by_id).scalar_subquery().label("department_id")
+)
+
+
+def approve_order(order_id, current_user):
+    """Approve an order."""
     # Check if user is an approver who can approve this order
     if not current_user.is_approver:
         return jsonify({"error": "You are not an approver"}), 403
 
-    approver = Approver.query.filter_by(user_id=current_user.id).first()
-    if not approver or not approver.can_approve_for_department(order.ordered_by.department_id):
+    routing = get_approver_routing(current_user.id)
+    if not routing:
         return jsonify({"error": "You cannot approve orders from this department"}), 403
 
-    order.status = OrderStatus.APPROVED
-    order.approved_by_id = current_user.id
-    order.approved_at = datetime.now(timezone.utc)
-    db.session.commit()
+    now = datetime.now(timezone.utc)
+    order = transition(
+        Order, order_id, OrderStatus.PENDING,
+        {"status": OrderStatus.APPROVED, "approved_by_id": current_user.id, "approved_at": now},
+        conditions=_department_scope(routing),
+        options=() if wants_minimal() else ORDER_RESPONSE_OPTIONS,
+    )
+    if not order:
+        return transition_failed(
+            Order, order_id, OrderStatus.PENDING, "Only pending orders can be approved",
+            columns=(_ORDER_DEPARTMENT,),
+            allowed=lambda row: can_approve_for_department(routing, row.department_id),
+            denied_message="You cannot approve orders from this department",
+        )
 
-    # Notify all active admins via SMS
-    from models.user import User
+    # Queue SMS to all active admins in the same transaction as the approval
     admins = User.query.filter_by(is_admin=True, is_active=True).all()
     notify_order_approved(order, admins)
+    publish_status_change("order", order, order.ordered_by_id, order.ordered_by.department_id)
+    commit_keep_loaded()
 
-    return jsonify({
+    return write_response(order, lambda: {
         "message": "Order approved",
         "order": order.to_dict(include_relations=True),
     })
@@ -303,30 +444,40 @@ def approve_order(order_id, current_user):
 
 def reject_order(order_id, current_user):
     """Reject an order."""
-    order = Order.query.get(order_id)
-    if not order:
-        return jsonify({"error": "Order not found"}), 404
-
-    if order.status != OrderStatus.PENDING:
-        return jsonify({"error": "Only pending orders can be rejected"}), 400
-
     # Check if user is an approver who can reject this order
     if not current_user.is_approver:
         return jsonify({"error": "You are not an approver"}), 403
 
-    approver = Approver.query.filter_by(user_id=current_user.id).first()
-    if not approver or not approver.can_approve_for_department(order.ordered_by.department_id):
+    routing = get_approver_routing(current_user.id)
+    if not routing:
         return jsonify({"error": "You cannot reject orders from this department"}), 403
 
     data = request.get_json() or {}
 
-    order.status = OrderStatus.REJECTED
-    order.rejected_by_id = current_user.id
-    order.rejected_at = datetime.now(timezone.utc)
-    order.rejection_comment = data.get("comment", "")
-    db.session.commit()
+    now = datetime.now(timezone.utc)
+    order = transition(
+        Order, order_id, OrderStatus.PENDING,
+        {
+            "status": OrderStatus.REJECTED,
+            "rejected_by_id": current_user.id,
+            "rejected_at": now,
+            "rejection_comment": data.get("comment", ""),
+        },
+        conditions=_department_scope(routing),
+        options=() if wants_minimal() else ORDER_RESPONSE_OPTIONS,
+    )
+    if not order:
+        return transition_failed(
+            Order, order_id, OrderStatus.PENDING, "Only pending orders can be rejected",
+            columns=(_ORDER_DEPARTMENT,),
+            allowed=lambda row: can_approve_for_department(routing, row.department_id),
+            denied_message="You cannot reject orders from this department",
+        )
+
+    publish_status_change("order", order, order.ordered_by_id, order.ordered_by.department_id)
+    commit_keep_loaded()
 
-    return jsonify({
+    return write_response(order, lambda: {
         "message": "Order rejected",
         "order": order.to_dict(include_relations=True),
     })
@@ -372,26 +523,10 @@ def admin_update_order_items(order_id, current_user):
     if not data or "items" not in data:
         return jsonify({"error": "Items data is required"}), 400
 
-    # Remove existing items
-    OrderItem.query.filter_by(order_id=order.id).delete()
-
-    # Add new items
-    for idx, item_data in enumerate(data["items"]):
-        if not item_data.get("description"):
-            continue
+    _replace_items(order, data["items"])
+    commit_keep_loaded()
 
-        item = OrderItem(
-            order_id=order.id,
-            line_number=idx + 1,
-            description=item_data["description"],
-            quantity=item_data.get("quantity"),
-            unit_cost=item_data.get("unit_cost"),
-        )
-        db.session.add(item)
-
-    db.session.commit()
-
-    return jsonify({
+    return write_response(order, lambda: {
         "message": "Order items updated",
         "order": order.to_dict(include_relations=True),
     })
@@ -402,20 +537,19 @@ def mark_order_paid(order_id, current_user):
     if not current_user.is_admin:
         return jsonify({"error": "Only admins can mark orders as paid"}), 403
 
-    order = Order.query.get(order_id)
+    order = transition(
+        Order, order_id, OrderStatus.APPROVED, {"status": OrderStatus.PAID},
+        options=() if wants_minimal() else ORDER_RESPONSE_OPTIONS,
+    )
     if not order:
-        return jsonify({"error": "Order not found"}), 404
-
-    if order.status != OrderStatus.APPROVED:
-        return jsonify({"error": "Only approved orders can be marked as paid"}), 400
-
-    order.status = OrderStatus.PAID
-    db.session.commit()
+        return transition_failed(Order, order_id, OrderStatus.APPROVED, "Only approved orders can be marked as paid")
 
-    # Notify the original order creator via SMS
+    # Queue SMS to the original order creator in the same transaction
     notify_order_paid(order, order.ordered_by)
+    publish_status_change("order", order, order.ordered_by_id, order.ordered_by.department_id)
+    commit_keep_loaded()
 
-    return jsonify({
+    return write_response(order, lambda: {
         "message": "Order marked as paid",
         "order": order.to_dict(include_relations=True),
     })
@@ -2,6 +2,8 @@ from flask import request, jsonify
 from db import db
 from models.po_group import POGroup
 from models.order import Order, OrderStatus
+from lib.request_timing import phase
+from lib.serializers import serialize_orders
 
 
 # Default pagination settings
@@ -59,7 +61,9 @@ def get_po_group(po_group_id, current_user):
     if not po_group:
         return jsonify({"error": "PO Group not found"}), 404
 
-    return jsonify(po_group.to_dict(include_orders=True))
+    with phase("serialize"):
+        payload = po_group.to_dict(include_orders=True)
+    return jsonify(payload)
 
 
 def create_po_group(current_user):
@@ -231,4 +235,4 @@ def get_available_orders_for_po_group(current_user):
         Order.po_group_id.is_(None)
     ).order_by(Order.approved_at.desc()).all()
 
-    return jsonify([order.to_dict(include_relations=True) for order in orders])
+    return serialize_orders(orders)
@@ -1,5 +1,7 @@
 from datetime import datetime, timezone
 from flask import request, jsonify
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
 from db import db
 from models.repair import Repair, RepairStatus
 from models.repair_item import RepairItem
@@ -7,46 +9,117 @@ from models.approver import Approver
 from models.technician import Technician
 from models.unit import Unit
 from constants import REPAIRS_DEPARTMENT_ID
+from lib.delta_sync import deleted_since, get_sync_params, record_tombstone
+from lib.serializers import serialize_repairs
+from lib.events import publish_status_change
+from lib.reference_data import can_approve_for_department, get_approver_routing
+from lib.request_timing import phase
 from lib.sms_service import notify_repair_pending, notify_repair_approved, notify_repair_completed
+from lib.transitions import transition, transition_failed
+from lib.write_response import commit_keep_loaded, wants_minimal, write_response
+
+# Everything repair.to_dict(include_relations=True) reads, loaded with the transition's RETURNING row
+REPAIR_RESPONSE_OPTIONS = (
+    selectinload(Repair.items),
+    selectinload(Repair.unit),
+    selectinload(Repair.requested_by),
+    selectinload(Repair.approved_by),
+    selectinload(Repair.rejected_by),
+    selectinload(Repair.completed_by),
+)
+
+
+def _build_items(items_data) -> list:
+    """Repair items from request data, skipping lines without a description."""
+    return [
+        RepairItem(line_number=idx + 1, description=item_data["description"])
+        for idx, item_data in enumerate(items_data)
+        if item_data.get("description")
+    ]
 
 
 def get_repairs(current_user):
     """Get repairs for current user (their own or ones they can approve/complete)."""
+    try:
+        sync = get_sync_params()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    since = sync["since"]
+
     # Get repairs created by the user
-    user_repairs = Repair.query.filter_by(requested_by_id=current_user.id).all()
-
-    # If user is an approver, also get pending repairs they can approve
-    approver_repairs = []
-    if current_user.is_approver:
-        approver = Approver.query.filter_by(user_id=current_user.id).first()
-        if approver:
-            pending_repairs = Repair.query.filter_by(status=RepairStatus.PENDING).all()
-            for repair in pending_repairs:
-                # Check if approver can approve repairs (via Repairs department)
-                if approver.can_approve_for_department(REPAIRS_DEPARTMENT_ID):
-                    if repair not in user_repairs:
-                        approver_repairs.append(repair)
-
-    # If user is a technician, also get approved repairs they can complete
-    technician_repairs = []
+    user_query = Repair.query.filter_by(requested_by_id=current_user.id)
+    if since:
+        user_query = user_query.filter(Repair.updated_at >= since)
+    user_repairs = user_query.all()
+
+    # Check if approver can approve repairs (via Repairs department)
+    can_approve = current_user.is_approver and can_approve_for_department(
+        get_approver_routing(current_user.id), REPAIRS_DEPARTMENT_ID
+    )
+
+    # Approvers also get pending repairs, technicians approved repairs they can complete
+    visible_statuses = []
+    if can_approve:
+        visible_statuses.append(RepairStatus.PENDING)
     if current_user.is_technician:
-        approved_repairs = Repair.query.filter_by(status=RepairStatus.APPROVED).all()
-        for repair in approved_repairs:
-            if repair not in user_repairs and repair not in approver_repairs:
-                technician_repairs.append(repair)
+        visible_statuses.append(RepairStatus.APPROVED)
+
+    other_repairs = []
+    left_view = []
+    if visible_statuses:
+        if since:
+            # Any status: repairs that moved on must leave the client's view
+            candidates = Repair.query.filter(
+                Repair.updated_at >= since, Repair.requested_by_id != current_user.id
+            ).all()
+        else:
+            candidates = Repair.query.filter(Repair.status.in_(visible_statuses)).all()
+        user_repair_ids = {repair.id for repair in user_repairs}
+        for repair in candidates:
+            if repair.id in user_repair_ids:
+                continue
+            if repair.status in visible_statuses:
+                other_repairs.append(repair)
+            else:
+                left_view.append(repair.id)
+        # Pending before approved, as before
+        other_repairs.sort(key=lambda repair: visible_statuses.index(repair.status))
 
-    all_repairs = user_repairs + approver_repairs + technician_repairs
-    return jsonify([repair.to_dict(include_relations=True) for repair in all_repairs])
+    all_repairs = user_repairs + other_repairs
+    deleted = None
+    if since:
+        deleted = left_view + deleted_since("repair", since, owner_id=current_user.id)
+    return serialize_repairs(all_repairs, sync=sync, deleted=deleted)
 
 
 def get_all_repairs(current_user):
     """Get all repairs (admin sees all, approvers/technicians see relevant ones)."""
+    try:
+        sync = get_sync_params()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    since = sync["since"]
+
+    # Admins, approvers assigned to the Repairs department and technicians see all
+    can_access = current_user.is_admin or current_user.is_technician
+    if not can_access and current_user.is_approver:
+        routing = get_approver_routing(current_user.id)
+        can_access = can_approve_for_department(routing, REPAIRS_DEPARTMENT_ID)
+
+    if not can_access:
+        # Not authorized
+        return jsonify({"error": "Access denied"}), 403
+
     # Build base query
     query = Repair.query
 
-    # Apply filters from query params
+    # Apply filters from query params. In a delta sync the status filter is
+    # applied after loading, so repairs that changed status out of it are
+    # reported as deleted.
     status = request.args.get("status")
-    if status and status in RepairStatus.all():
+    if status not in RepairStatus.all():
+        status = None
+    if status and not since:
         query = query.filter_by(status=status)
 
     owner_id = request.args.get("owner_id")
@@ -57,25 +130,15 @@ def get_all_repairs(current_user):
     if unit_id:
         query = query.filter_by(unit_id=unit_id)
 
-    # If admin, return all matching repairs
-    if current_user.is_admin:
+    if not since:
         repairs = query.order_by(Repair.created_at.desc()).all()
-        return jsonify([repair.to_dict(include_relations=True) for repair in repairs])
+        return serialize_repairs(repairs, sync=sync)
 
-    # If approver assigned to Repairs department, return all
-    if current_user.is_approver:
-        approver = Approver.query.filter_by(user_id=current_user.id).first()
-        if approver and approver.can_approve_for_department(REPAIRS_DEPARTMENT_ID):
-            repairs = query.order_by(Repair.created_at.desc()).all()
-            return jsonify([repair.to_dict(include_relations=True) for repair in repairs])
-
-    # If technician, return all
-    if current_user.is_technician:
-        repairs = query.order_by(Repair.created_at.desc()).all()
-        return jsonify([repair.to_dict(include_relations=True) for repair in repairs])
-
-    # Not authorized
-    return jsonify({"error": "Access denied"}), 403
+    changed = query.filter(Repair.updated_at >= since).order_by(Repair.created_at.desc()).all()
+    repairs = [repair for repair in changed if not status or repair.status == status]
+    deleted = [repair.id for repair in changed if status and repair.status != status]
+    deleted += deleted_since("repair", since, owner_id=owner_id)
+    return serialize_repairs(repairs, sync=sync, deleted=deleted)
 
 
 def get_repair(repair_id, current_user):
@@ -92,14 +155,16 @@ def get_repair(repair_id, current_user):
     )
 
     if not can_access and current_user.is_approver:
-        approver = Approver.query.filter_by(user_id=current_user.id).first()
-        if approver and approver.can_approve_for_department(REPAIRS_DEPARTMENT_ID):
+        routing = get_approver_routing(current_user.id)
+        if can_approve_for_department(routing, REPAIRS_DEPARTMENT_ID):
             can_access = True
 
     if not can_access:
         return jsonify({"error": "Access denied"}), 403
 
-    return jsonify(repair.to_dict(include_relations=True))
+    with phase("serialize"):
+        payload = repair.to_dict(include_relations=True)
+    return jsonify(payload)
 
 
 def create_repair(current_user):
@@ -120,35 +185,22 @@ def create_repair(current_user):
     if not unit:
         return jsonify({"error": "Unit not found"}), 404
 
-    # Create repair
+    # Create repair. Relationships are set from the rows already loaded, so the
+    # response needs no further queries.
     repair = Repair(
         repair_number=Repair.generate_repair_number(),
-        unit_id=data["unit_id"],
+        unit=unit,
         description=data["description"],
         status=RepairStatus.DRAFT,
-        requested_by_id=current_user.id,
+        requested_by=current_user,
         notes=data.get("notes"),
+        items=_build_items(data.get("items", [])),
     )
 
     db.session.add(repair)
-    db.session.flush()
-
-    # Add repair items
-    items = data.get("items", [])
-    for idx, item_data in enumerate(items):
-        if not item_data.get("description"):
-            continue
-
-        item = RepairItem(
-            repair_id=repair.id,
-            line_number=idx + 1,
-            description=item_data["description"],
-        )
-        db.session.add(item)
-
-    db.session.commit()
+    commit_keep_loaded()
 
-    return jsonify(repair.to_dict(include_relations=True)), 201
+    return write_response(repair, status=201)
 
 
 def update_repair(repair_id, current_user):
@@ -169,11 +221,12 @@ def update_repair(repair_id, current_user):
 
     # Update basic fields
     if "unit_id" in data:
+        unit = None
         if data["unit_id"]:
             unit = Unit.query.get(data["unit_id"])
             if not unit:
                 return jsonify({"error": "Unit not found"}), 404
-        repair.unit_id = data["unit_id"]
+        repair.unit = unit
 
     if "description" in data:
         repair.description = data["description"]
@@ -182,24 +235,17 @@ def update_repair(repair_id, current_user):
 
     # Update items if provided
     if "items" in data:
-        # Remove existing items
         RepairItem.query.filter_by(repair_id=repair.id).delete()
+        # The bulk delete bypasses the loaded collection; start it over so the
+        # response lists the new items without reloading them
+        set_committed_value(repair, "items", [])
+        repair.items.extend(_build_items(data["items"]))
+        # Replacing items does not touch the repair row, so mark it changed for delta sync
+        repair.updated_at = datetime.now(timezone.utc)
 
-        # Add new items
-        for idx, item_data in enumerate(data["items"]):
-            if not item_data.get("description"):
-                continue
-
-            item = RepairItem(
-                repair_id=repair.id,
-                line_number=idx + 1,
-                description=item_data["description"],
-            )
-            db.session.add(item)
+    commit_keep_loaded()
 
-    db.session.commit()
-
-    return jsonify(repair.to_dict(include_relations=True))
+    return write_response(repair)
 
 
 def delete_repair(repair_id, current_user):
@@ -214,6 +260,7 @@ def delete_repair(repair_id, current_user):
     if repair.status != RepairStatus.DRAFT:
         return jsonify({"error": "Only draft repairs can be deleted"}), 400
 
+    record_tombstone("repair", repair.id, repair.requested_by_id)
     db.session.delete(repair)
     db.session.commit()
 
@@ -241,12 +288,13 @@ def submit_repair(repair_id, current_user):
         return jsonify({"error": "No approvers configured for repairs"}), 400
 
     repair.status = RepairStatus.PENDING
-    db.session.commit()
 
-    # Notify approvers via SMS
+    # Queue SMS to approvers in the same transaction as the status change
     notify_repair_pending(repair, approvers, current_user.full_name)
+    publish_status_change("repair", repair, repair.requested_by_id)
+    commit_keep_loaded()
 
-    return jsonify({
+    return write_response(repair, lambda: {
         "message": "Repair submitted for approval",
         "repair": repair.to_dict(include_relations=True),
         "approvers": [a.to_dict(include_user=True) for a in approvers],
@@ -255,31 +303,29 @@ def submit_repair(repair_id, current_user):
 
 def approve_repair(repair_id, current_user):
     """Approve a repair."""
-    repair = Repair.query.get(repair_id)
-    if not repair:
-        return jsonify({"error": "Repair not found"}), 404
-
-    if repair.status != RepairStatus.PENDING:
-        return jsonify({"error": "Only pending repairs can be approved"}), 400
-
     # Check if user is an approver who can approve repairs
     if not current_user.is_approver:
         return jsonify({"error": "You are not an approver"}), 403
 
-    approver = Approver.query.filter_by(user_id=current_user.id).first()
-    if not approver or not approver.can_approve_for_department(REPAIRS_DEPARTMENT_ID):
+    if not can_approve_for_department(get_approver_routing(current_user.id), REPAIRS_DEPARTMENT_ID):
         return jsonify({"error": "You cannot approve repairs"}), 403
 
-    repair.status = RepairStatus.APPROVED
-    repair.approved_by_id = current_user.id
-    repair.approved_at = datetime.now(timezone.utc)
-    db.session.commit()
+    now = datetime.now(timezone.utc)
+    repair = transition(
+        Repair, repair_id, RepairStatus.PENDING,
+        {"status": RepairStatus.APPROVED, "approved_by_id": current_user.id, "approved_at": now},
+        options=() if wants_minimal() else REPAIR_RESPONSE_OPTIONS,
+    )
+    if not repair:
+        return transition_failed(Repair, repair_id, RepairStatus.PENDING, "Only pending repairs can be approved")
 
-    # Notify all active technicians via SMS
+    # Queue SMS to all active technicians in the same transaction as the approval
     technicians = Technician.query.filter_by(is_active=True).all()
     notify_repair_approved(repair, technicians)
+    publish_status_change("repair", repair, repair.requested_by_id)
+    commit_keep_loaded()
 
-    return jsonify({
+    return write_response(repair, lambda: {
         "message": "Repair approved",
         "repair": repair.to_dict(include_relations=True),
     })
@@ -287,30 +333,33 @@ def approve_repair(repair_id, current_user):
 
 def reject_repair(repair_id, current_user):
     """Reject a repair."""
-    repair = Repair.query.get(repair_id)
-    if not repair:
-        return jsonify({"error": "Repair not found"}), 404
-
-    if repair.status != RepairStatus.PENDING:
-        return jsonify({"error": "Only pending repairs can be rejected"}), 400
-
     # Check if user is an approver who can reject repairs
     if not current_user.is_approver:
         return jsonify({"error": "You are not an approver"}), 403
 
-    approver = Approver.query.filter_by(user_id=current_user.id).first()
-    if not approver or not approver.can_approve_for_department(REPAIRS_DEPARTMENT_ID):
+    if not can_approve_for_department(get_approver_routing(current_user.id), REPAIRS_DEPARTMENT_ID):
         return jsonify({"error": "You cannot reject repairs"}), 403
 
     data = request.get_json() or {}
 
-    repair.status = RepairStatus.REJECTED
-    repair.rejected_by_id = current_user.id
-    repair.rejected_at = datetime.now(timezone.utc)
-    repair.rejection_comment = data.get("comment", "")
-    db.session.commit()
+    now = datetime.now(timezone.utc)
+    repair = transition(
+        Repair, repair_id, RepairStatus.PENDING,
+        {
+            "status": RepairStatus.REJECTED,
+            "rejected_by_id": current_user.id,
+            "rejected_at": now,
+            "rejection_comment": data.get("comment", ""),
+        },
+        options=() if wants_minimal() else REPAIR_RESPONSE_OPTIONS,
+    )
+    if not repair:
+        return transition_failed(Repair, repair_id, RepairStatus.PENDING, "Only pending repairs can be rejected")
+
+    publish_status_change("repair", repair, repair.requested_by_id)
+    commit_keep_loaded()
 
-    return jsonify({
+    return write_response(repair, lambda: {
         "message": "Repair rejected",
         "repair": repair.to_dict(include_relations=True),
     })
@@ -343,22 +392,23 @@ def complete_repair(repair_id, current_user):
     if not current_user.is_technician:
         return jsonify({"error": "Only technicians can mark repairs as completed"}), 403
 
-    repair = Repair.query.get(repair_id)
+    now = datetime.now(timezone.utc)
+    repair = transition(
+        Repair, repair_id, RepairStatus.APPROVED,
+        {"status": RepairStatus.COMPLETED, "completed_by_id": current_user.id, "completed_at": now},
+        options=() if wants_minimal() else REPAIR_RESPONSE_OPTIONS,
+    )
     if not repair:
-        return jsonify({"error": "Repair not found"}), 404
-
-    if repair.status != RepairStatus.APPROVED:
-        return jsonify({"error": "Only approved repairs can be marked as completed"}), 400
-
-    repair.status = RepairStatus.COMPLETED
-    repair.completed_by_id = current_user.id
-    repair.completed_at = datetime.now(timezone.utc)
-    db.session.commit()
+        return transition_failed(
+            Repair, repair_id, RepairStatus.APPROVED, "Only approved repairs can be marked as completed"
+        )
 
-    # Notify the original repair requester via SMS
+    # Queue SMS to the original repair requester in the same transaction
     notify_repair_completed(repair, repair.requested_by)
+    publish_status_change("repair", repair, repair.requested_by_id)
+    commit_keep_loaded()
 
-    return jsonify({
+    return write_response(repair, lambda: {
         "message": "Repair marked as completed",
         "repair": repair.to_dict(include_relations=True),
     })
@@ -0,0 +1,100 @@
+"""
+Notification dispatcher.
+
+Delivers SMS queued in the notification outbox (see lib/outbox.py) and
+reconciles delivery receipts (see lib/delivery_tracking.py). Runs as its own
+process, separate from the web workers:
+
+    python dispatcher.py                 # deliver queued SMS until stopped
+    python dispatcher.py reconcile       # pull delivery receipts once
+    python dispatcher.py resend-failed [--event-type order_pending] [--since-hours 24]
+"""
+
+import argparse
+import logging
+import os
+import signal
+import time
+
+# Longer statement timeout than web requests (see lib/db_engine.py)
+os.environ.setdefault("DB_ROLE", "worker")
+
+from app import app
+from db import db
+from lib.delivery_tracking import reconcile_receipts, resend_failed
+from lib.outbox import dispatch_batch
+
+logger = logging.getLogger("dispatcher")
+
+BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+POLL_INTERVAL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "2"))
+RECONCILE_INTERVAL_SECONDS = float(os.getenv("OUTBOX_RECONCILE_SECONDS", "300"))
+
+_running = True
+
+
+def _stop(signum, frame):
+    global _running
+    logger.info(f"Received signal {signum}, shutting down after current batch")
+    _running = False
+
+
+def _reconcile_safely():
+    try:
+        reconcile_receipts()
+    except Exception:
+        logger.exception("Delivery receipt reconciliation failed")
+        db.session.rollback()
+    finally:
+        db.session.remove()
+
+
+def run():
+    """Dispatch batches until stopped, reconciling receipts periodically."""
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    logger.info(f"Dispatcher started (batch size {BATCH_SIZE}, poll {POLL_INTERVAL_SECONDS}s)")
+    last_reconcile = time.monotonic()
+    with app.app_context():
+        while _running:
+            try:
+                processed = dispatch_batch(BATCH_SIZE)
+            except Exception:
+                logger.exception("Dispatch batch failed")
+                db.session.rollback()
+                processed = 0
+            finally:
+                db.session.remove()
+
+            if RECONCILE_INTERVAL_SECONDS and time.monotonic() - last_reconcile >= RECONCILE_INTERVAL_SECONDS:
+                _reconcile_safely()
+                last_reconcile = time.monotonic()
+
+            if not processed:
+                time.sleep(POLL_INTERVAL_SECONDS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SMS notification dispatcher")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("run", help="Deliver queued SMS until stopped (default)")
+    subparsers.add_parser("reconcile", help="Pull delivery receipts once")
+    resend = subparsers.add_parser("resend-failed", help="Re-queue undelivered SMS")
+    resend.add_argument("--event-type", help="Only resend this notification type")
+    resend.add_argument("--since-hours", type=int, default=24)
+    args = parser.parse_args()
+
+    if args.command == "reconcile":
+        with app.app_context():
+            print(f"Applied {reconcile_receipts()} delivery receipts")
+    elif args.command == "resend-failed":
+        with app.app_context():
+            count = resend_failed(event_type=args.event_type, since_hours=args.since_hours)
+            print(f"Re-queued {count} notifications")
+    else:
+        run()
+
+
+if __name__ == "__main__":
+    main()
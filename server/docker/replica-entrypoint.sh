@@ -0,0 +1,13 @@
+#!/bin/bash
+# Clone the primary on first start, then run as a hot standby (docker-compose.replica.yml)
+set -e
+
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    until pg_basebackup -h primary -U replicator -D "$PGDATA" -R -X stream; do
+        echo "Waiting for the primary..."
+        sleep 1
+    done
+    chmod 700 "$PGDATA"
+fi
+
+exec postgres -c hot_standby=on
@@ -0,0 +1,137 @@
+"""
+Gunicorn configuration for the web process.
+
+Pick a worker profile with GUNICORN_PROFILE:
+
+    gthread (default)  a few processes with a thread pool each. A request
+                       waiting on the database or an open SSE stream holds a
+                       thread, not a whole process.
+    sync               one request per process. Most isolation, least
+                       concurrency; use it to rule out thread-safety issues.
+    gevent             cooperative greenlets with psycopg2 made green through
+                       psycogreen. Highest concurrency for I/O-bound traffic;
+                       CPU-heavy requests block the other greenlets in their
+                       worker.
+
+Worker counts come from the CPUs available to the container and are capped by
+memory (GUNICORN_WORKER_MEMORY_MB per worker). WEB_CONCURRENCY, which Heroku
+sets per dyno size, GUNICORN_THREADS and GUNICORN_WORKER_CONNECTIONS override
+the derived values.
+
+Usage (from the repository root):
+    gunicorn --config server/gunicorn.conf.py app:app
+"""
+
+import os
+
+PROFILES = ("sync", "gthread", "gevent")
+PROFILE = os.environ.get("GUNICORN_PROFILE", "gthread")
+if PROFILE not in PROFILES:
+    raise RuntimeError(f"GUNICORN_PROFILE must be one of {', '.join(PROFILES)}, got {PROFILE!r}")
+
+if PROFILE == "gevent":
+    # Patch before the app (and psycopg2) is preloaded in the master
+    from gevent import monkey
+
+    monkey.patch_all()
+
+    from psycogreen.gevent import patch_psycopg
+
+    patch_psycopg()
+
+WORKER_MEMORY_MB = int(os.environ.get("GUNICORN_WORKER_MEMORY_MB", "150"))
+# Share of the container's memory the workers may use
+MEMORY_HEADROOM = 0.8
+
+
+def _cpu_count() -> int:
+    """CPUs this container may use: the cgroup quota if set, else the affinity mask."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return max(1, int(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _memory_mb() -> int | None:
+    """Memory limit of this container in MB, or None if unknown."""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except OSError:
+            continue
+        # cgroup v1 reports "unlimited" as a huge number
+        if value != "max" and int(value) < 1 << 60:
+            return int(value) // (1024 * 1024)
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def _default_workers() -> int:
+    cpus = _cpu_count()
+    by_cpu = {
+        "sync": 2 * cpus + 1,
+        "gthread": cpus + 1,
+        # One event loop per core
+        "gevent": cpus,
+    }[PROFILE]
+    memory_mb = _memory_mb()
+    if memory_mb:
+        by_cpu = min(by_cpu, int(memory_mb * MEMORY_HEADROOM // WORKER_MEMORY_MB))
+    return max(1, by_cpu)
+
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+preload_app = True
+
+worker_class = PROFILE
+workers = int(os.environ.get("WEB_CONCURRENCY") or _default_workers())
+threads = int(os.environ.get("GUNICORN_THREADS", "8")) if PROFILE == "gthread" else 1
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "200"))
+
+# Recycle workers periodically, staggered so they do not all restart at once
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", str(max_requests // 10)))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "30"))
+graceful_timeout = 30
+keepalive = 5
+
+
+def when_ready(server):
+    from lib.warmup import configure_models
+
+    # Done once here instead of in every worker; forked workers share the result
+    configure_models()
+    server.log.info(
+        f"Profile {PROFILE}: {workers} workers"
+        + (f" x {threads} threads" if PROFILE == "gthread" else "")
+        + (f" x {worker_connections} connections" if PROFILE == "gevent" else "")
+    )
+
+
+def post_fork(server, worker):
+    """Give each worker its own database connections and warm it up before it serves."""
+    from app import app
+    from db import db
+    from lib.db_routing import dispose_replicas
+    from lib.warmup import warm_up
+
+    with app.app_context():
+        # Connections opened by the preloading master must not be shared with
+        # it; close=False leaves them open for the master and just forgets them
+        db.engine.dispose(close=False)
+    dispose_replicas(app)
+    # Starts the listener thread too. The worker accepts connections only
+    # after this returns, so WARMUP_TIMEOUT_SECONDS must stay below timeout.
+    warm_up(app)
@@ -1,8 +1,8 @@
 import os
 from functools import wraps
-from flask import request, jsonify, current_app
+from flask import g, request, jsonify, current_app
 import jwt
-from models.user import User
+from lib.reference_data import load_user
 
 
 def authenticate(f):
@@ -22,11 +22,13 @@ def authenticate(f):
                 algorithms=[current_app.config["JWT_ALGORITHM"]],
             )
             user_id = payload.get("user_id")
-            user = User.query.get(user_id)
+            user = load_user(user_id)
 
             if not user or not user.is_active:
                 return jsonify({"error": "User not found or inactive"}), 401
 
+            # Read after the handler (see lib/request_timing.py), when user may be expired
+            g.user_is_admin = user.is_admin
             kwargs["current_user"] = user
             return f(*args, **kwargs)
 
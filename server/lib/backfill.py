@@ -0,0 +1,267 @@
+"""
+Online, resumable backfills for schema changes on large tables.
+
+A backfill fills a new or changed column for every existing row without one
+long UPDATE that would lock the table. It walks the table in primary-key
+order, ``batch_size`` rows at a time, and commits each batch together with its
+checkpoint in ``backfill_checkpoints``. An interrupted run resumes after the
+last committed batch. Between batches it sleeps, and it can be capped at a
+number of rows per second, so production traffic keeps its share of the
+database. On PostgreSQL each batch runs with a short ``lock_timeout``. A batch
+that cannot get its row locks is retried instead of queueing behind (and in
+front of) user requests.
+
+Backfills live in the ``backfills`` package, one module each, next to the
+migration that needs them:
+
+    from sqlalchemy import update
+
+    from db import db
+    from lib.backfill import register
+    from models.order import Order, OrderStatus
+
+    def fill_approved_at(ids):
+        # Approved orders from before approved_at existed
+        result = db.session.execute(
+            update(Order).where(Order.id.in_(ids)).values(approved_at=Order.updated_at)
+        )
+        return result.rowcount
+
+    register(
+        "order_approved_at", Order, fill_approved_at,
+        where=(Order.status == OrderStatus.APPROVED) & Order.approved_at.is_(None),
+    )
+
+Rows created while a backfill runs are written by code that already sets the
+new column, so skipping keys below the checkpoint is safe. Run with
+``flask --app app backfill run <name>`` (see cli.py).
+"""
+
+import importlib
+import logging
+import os
+import pkgutil
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import OperationalError
+
+from db import db
+from models.backfill_checkpoint import BackfillCheckpoint, BackfillStatus
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = int(os.environ.get("BACKFILL_BATCH_SIZE", "1000"))
+DEFAULT_SLEEP_SECONDS = float(os.environ.get("BACKFILL_SLEEP_SECONDS", "0.1"))
+LOCK_TIMEOUT_MS = int(os.environ.get("BACKFILL_LOCK_TIMEOUT_MS", "2000"))
+MAX_BATCH_RETRIES = 5
+REPORT_SECONDS = 10
+
+_registry = {}
+
+
+class Backfill:
+    """A registered backfill: which rows to visit and what to do with each batch."""
+
+    def __init__(self, name, model, process, where=None, batch_size=DEFAULT_BATCH_SIZE, description=None):
+        self.name = name
+        self.model = model
+        self.process = process
+        self.where = where
+        self.batch_size = batch_size
+        self.description = description or (process.__doc__ or "").strip().split("\n")[0]
+
+    @property
+    def key(self):
+        return self.model.__mapper__.primary_key[0]
+
+    def next_keys(self, after, limit):
+        query = select(self.key).order_by(self.key).limit(limit)
+        if after is not None:
+            query = query.where(self.key > after)
+        if self.where is not None:
+            query = query.where(self.where)
+        return db.session.execute(query).scalars().all()
+
+    def estimate_rows(self) -> int:
+        """Rough row count of the table, without scanning it on PostgreSQL."""
+        table = self.model.__table__.name
+        if db.session.get_bind().dialect.name == "postgresql":
+            estimate = db.session.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE relname = :table"), {"table": table}
+            ).scalar()
+            if estimate and estimate > 0:
+                return int(estimate)
+        return db.session.execute(select(func.count()).select_from(self.model)).scalar()
+
+
+def register(name, model, process, where=None, batch_size=DEFAULT_BATCH_SIZE, description=None) -> Backfill:
+    """
+    Register a backfill.
+
+    Args:
+        name: Unique name, also the checkpoint key
+        model: Model whose table is walked, in primary-key order
+        process: process(ids) updates the rows with those keys and returns the
+            number of rows changed. Runs inside the batch's transaction; do not commit.
+        where: Optional filter for rows that still need the backfill
+        batch_size: Default rows per batch
+        description: One line for `backfill list`; defaults to process's docstring
+    """
+    if name in _registry:
+        raise ValueError(f"Backfill {name!r} is already registered")
+    backfill = Backfill(name, model, process, where, batch_size, description)
+    _registry[name] = backfill
+    return backfill
+
+
+def load_backfills() -> dict:
+    """Import every module in the backfills package so they register themselves."""
+    import backfills
+
+    for module in pkgutil.iter_modules(backfills.__path__):
+        importlib.import_module(f"backfills.{module.name}")
+    return dict(_registry)
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _get_checkpoint(name, restart) -> BackfillCheckpoint:
+    checkpoint = db.session.get(BackfillCheckpoint, name)
+    if checkpoint is None:
+        checkpoint = BackfillCheckpoint(name=name, rows_processed=0, batches=0)
+        db.session.add(checkpoint)
+    elif restart:
+        checkpoint.last_key = None
+        checkpoint.rows_processed = 0
+        checkpoint.batches = 0
+        checkpoint.started_at = _now()
+    checkpoint.status = BackfillStatus.RUNNING
+    checkpoint.last_error = None
+    checkpoint.completed_at = None
+    db.session.commit()
+    return checkpoint
+
+
+def _run_batch(backfill, checkpoint, batch_size) -> int:
+    """Process the next batch and advance the checkpoint. Returns rows visited, 0 when done."""
+    keys = backfill.next_keys(checkpoint.last_key, batch_size)
+    if not keys:
+        return 0
+    if db.session.get_bind().dialect.name == "postgresql":
+        db.session.execute(text(f"SET LOCAL lock_timeout = {LOCK_TIMEOUT_MS}"))
+    changed = backfill.process(keys) or 0
+    checkpoint.last_key = keys[-1]
+    checkpoint.rows_processed += changed
+    checkpoint.batches += 1
+    db.session.commit()
+    return len(keys)
+
+
+def run_backfill(
+    name,
+    batch_size=None,
+    sleep_seconds=DEFAULT_SLEEP_SECONDS,
+    max_rows_per_second=None,
+    max_batches=None,
+    restart=False,
+    report=None,
+) -> BackfillCheckpoint:
+    """
+    Run (or resume) a backfill until every row is processed or max_batches is reached.
+
+    Args:
+        name: Registered backfill name
+        batch_size: Rows per batch (default: the backfill's own)
+        sleep_seconds: Pause after every batch
+        max_rows_per_second: Optional cap on rows visited per second
+        max_batches: Stop after this many batches in this run (the checkpoint is kept)
+        restart: Start from the first row instead of the checkpoint
+        report: Called with a progress line every few seconds (default: logger.info)
+
+    Raises:
+        KeyError: Unknown backfill name
+    """
+    backfills = load_backfills()
+    if name not in backfills:
+        raise KeyError(name)
+    backfill = backfills[name]
+    batch_size = batch_size or backfill.batch_size
+    report = report or logger.info
+
+    checkpoint = _get_checkpoint(name, restart)
+    estimate = backfill.estimate_rows()
+    db.session.commit()
+
+    started = time.monotonic()
+    last_report = started
+    visited = 0
+    batches_run = 0
+    retries = 0
+    while max_batches is None or batches_run < max_batches:
+        batch_started = time.monotonic()
+        try:
+            batch_rows = _run_batch(backfill, checkpoint, batch_size)
+        except OperationalError as e:
+            # Most likely the lock timeout; back off and retry the same batch
+            db.session.rollback()
+            retries += 1
+            if retries > MAX_BATCH_RETRIES:
+                checkpoint.status = BackfillStatus.FAILED
+                checkpoint.last_error = str(e.orig or e)[:2000]
+                db.session.commit()
+                raise
+            logger.warning(f"Backfill {name}: batch after {checkpoint.last_key} failed, retry {retries}: {e.orig or e}")
+            time.sleep(min(2 ** retries, 30))
+            continue
+        except Exception as e:
+            db.session.rollback()
+            checkpoint.status = BackfillStatus.FAILED
+            checkpoint.last_error = str(e)[:2000]
+            db.session.commit()
+            raise
+
+        if not batch_rows:
+            checkpoint.status = BackfillStatus.COMPLETED
+            checkpoint.completed_at = _now()
+            db.session.commit()
+            break
+        retries = 0
+        batches_run += 1
+        visited += batch_rows
+
+        now = time.monotonic()
+        if now - last_report >= REPORT_SECONDS:
+            report(_progress_line(name, checkpoint, visited, now - started, estimate, batch_size))
+            last_report = now
+
+        pause = sleep_seconds
+        if max_rows_per_second:
+            pause = max(pause, batch_size / max_rows_per_second - (time.monotonic() - batch_started))
+        if pause > 0:
+            time.sleep(pause)
+
+    report(_progress_line(name, checkpoint, visited, time.monotonic() - started, estimate, batch_size))
+    return checkpoint
+
+
+def _progress_line(name, checkpoint, visited, elapsed, estimate, batch_size) -> str:
+    rate = visited / elapsed if elapsed > 0 else 0.0
+    line = (
+        f"{name}: {checkpoint.status}, {checkpoint.rows_processed:,} rows changed in "
+        f"{checkpoint.batches:,} batches; this run visited ~{visited:,} rows in {elapsed:.0f}s "
+        f"({rate:,.0f} rows/s)"
+    )
+    if checkpoint.status == BackfillStatus.RUNNING and rate and estimate:
+        # Only an upper bound: the estimate counts rows the filter skips too
+        remaining = max(estimate - checkpoint.batches * batch_size, 0)
+        seconds = remaining / rate
+        line += f", at most ~{seconds / 60:.0f} min left" if seconds >= 60 else f", at most ~{seconds:.0f}s left"
+    return line
+
+
+def get_checkpoints() -> list[dict]:
+    return [c.to_dict() for c in BackfillCheckpoint.query.order_by(BackfillCheckpoint.name).all()]
@@ -0,0 +1,196 @@
+"""
+In-process cache with cross-worker invalidation.
+
+Each cached value records the tables it was read from. Every committed
+transaction that wrote to a table evicts the entries that depend on it, in
+this worker right after commit and in every other worker through Postgres
+NOTIFY on the ``cache_invalidation`` channel. The NOTIFY is sent inside the
+writing transaction, so it is delivered only once the write is visible. Only
+tables some ``@cached`` function depends on are tracked: a transaction that
+writes nothing but orders, say, sends no NOTIFY at all.
+
+Written tables are collected from ORM flushes and bulk UPDATE/DELETE/INSERT
+statements, so controllers do not need to invalidate by hand. Values are only
+stored while this worker's LISTEN connection is up; if it drops and reconnects,
+the whole cache is cleared because notifications may have been missed.
+
+Cached values are shared between requests and must not be mutated.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import current_app
+from sqlalchemy import event as sa_event, text
+from sqlalchemy.orm import Session
+
+from db import db
+from lib.db_routing import primary_reads
+from lib.events import is_listening, register_channel, start_listener
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "cache_invalidation"
+DEFAULT_TTL_SECONDS = float(os.environ.get("CACHE_TTL_SECONDS", "300"))
+MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "2048"))
+
+# Tables some cached value is read from, filled in by @cached
+CACHED_TABLES = set()
+
+
+class TTLCache:
+    """Thread-safe cache of values with a TTL and a set of source tables."""
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = {}  # key -> (expires_at, tables, value)
+        self._lock = threading.Lock()
+        # Bumped by every invalidation, so a value loaded before one is not stored after it
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Return (True, value) for a live entry, (False, None) otherwise."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                self.misses += 1
+                return False, None
+            self.hits += 1
+            return True, entry[2]
+
+    def set(self, key, value, tables, ttl=DEFAULT_TTL_SECONDS, generation=None):
+        """Store a value, unless an invalidation happened since generation was read."""
+        now = time.monotonic()
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if len(self._entries) >= self.max_entries:
+                self._evict_expired(now)
+                if len(self._entries) >= self.max_entries:
+                    # Drop the entry closest to expiry
+                    del self._entries[min(self._entries, key=lambda k: self._entries[k][0])]
+            self._entries[key] = (now + ttl, frozenset(tables), value)
+
+    def invalidate_tables(self, tables):
+        tables = set(tables)
+        with self._lock:
+            self.generation += 1
+            stale = [key for key, entry in self._entries.items() if entry[1] & tables]
+            for key in stale:
+                del self._entries[key]
+        if stale:
+            logger.debug(f"Evicted {len(stale)} cache entries for {sorted(tables)}")
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _evict_expired(self, now):
+        for key in [key for key, entry in self._entries.items() if entry[0] <= now]:
+            del self._entries[key]
+
+
+cache = TTLCache()
+
+
+def cached(name: str, depends_on: tuple, ttl: float = DEFAULT_TTL_SECONDS):
+    """
+    Cache a function's result per argument tuple until a dependent table changes.
+
+    Args:
+        name: Cache key prefix
+        depends_on: Table names the result is read from
+        ttl: Upper bound on an entry's life, in seconds
+    """
+    CACHED_TABLES.update(depends_on)
+
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args):
+            key = (name, *args)
+            hit, value = cache.get(key)
+            if hit:
+                return value
+            start_listener(current_app._get_current_object())
+            generation = cache.generation
+            # A lagging replica could hand back data an invalidation just evicted
+            with primary_reads(db.session):
+                value = f(*args)
+            if is_listening():
+                cache.set(key, value, depends_on, ttl, generation=generation)
+            return value
+
+        wrapper.uncached = f
+        return wrapper
+
+    return decorator
+
+
+# ============== Invalidation ==============
+
+def _on_notification(payload):
+    cache.invalidate_tables(payload.get("tables", []))
+
+
+register_channel(INVALIDATION_CHANNEL, _on_notification, on_reconnect=cache.clear)
+
+
+def _written_tables(session) -> set:
+    return session.info.setdefault("written_tables", set())
+
+
+@sa_event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session, flush_context):
+    tables = _written_tables(session)
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__table__", None)
+        if table is not None:
+            tables.add(table.name)
+
+
+@sa_event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_tables(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            _written_tables(orm_execute_state.session).add(table.name)
+
+
+@sa_event.listens_for(Session, "before_commit")
+def _notify_written_tables(session):
+    # Flush now so the final flush's tables are included in the NOTIFY
+    session.flush()
+    tables = _written_tables(session) & CACHED_TABLES
+    if not tables:
+        return
+    connection = session.connection()
+    if connection.dialect.name == "postgresql":
+        connection.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": INVALIDATION_CHANNEL, "payload": json.dumps({"tables": sorted(tables)})},
+        )
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _invalidate_locally(session):
+    # This worker does not wait for its own notification to come back
+    tables = session.info.pop("written_tables", set()) & CACHED_TABLES
+    if tables:
+        cache.invalidate_tables(tables)
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _discard_written_tables(session):
+    session.info.pop("written_tables", None)
@@ -0,0 +1,191 @@
+"""
+Circuit breaker for calls to external providers.
+
+Outcomes of recent calls are kept in a rolling time window. When enough calls
+have been made and the share of failed or slow calls reaches the threshold,
+the breaker opens and calls are refused with ``CircuitOpenError`` instead of
+waiting on a provider that is down. After ``open_seconds`` the breaker goes
+half-open and lets a few probe calls through: if they succeed it closes again,
+if any of them fails it reopens.
+
+The breaker also derives an adaptive read timeout from the p99 latency of
+recent successful calls, so a healthy provider is not given the worst-case
+timeout on every call. Latency is tracked per operation (a single send, a
+large batch and a page of receipts take very different times), and an
+operation keeps the static timeout until it has enough samples of its own.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitState:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while the breaker is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit '{name}' is open, retry in {retry_after:.0f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker with a rolling error-rate and latency window.
+
+    Args:
+        name: Provider name, used in logs and errors
+        window_seconds: Length of the rolling window of call outcomes
+        min_calls: Calls needed in the window before the breaker can open
+        failure_rate: Share of failed or slow calls that opens the breaker
+        slow_call_seconds: Calls slower than this count against the provider
+        open_seconds: Time to stay open before probing again
+        half_open_max_calls: Probe calls allowed while half-open
+        timeout_multiplier: Adaptive timeout is p99 latency times this
+        min_timeout: Lower bound of the adaptive timeout, in seconds
+        max_timeout: Upper bound of the adaptive timeout (the static timeout)
+        min_timeout_samples: Successful calls needed before adapting the timeout
+    """
+
+    def __init__(self, name: str, window_seconds: float = 60, min_calls: int = 10,
+                 failure_rate: float = 0.5, slow_call_seconds: float = 5,
+                 open_seconds: float = 30, half_open_max_calls: int = 1,
+                 timeout_multiplier: float = 2.0, min_timeout: float = 2.0,
+                 max_timeout: float = 15.0, min_timeout_samples: int = 20):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.timeout_multiplier = timeout_multiplier
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.min_timeout_samples = min_timeout_samples
+
+        self._lock = threading.Lock()
+        self._calls = deque()  # (monotonic time, failed, latency seconds, operation)
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh_state(time.monotonic())
+            return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker will let a probe call through (0 if closed)."""
+        with self._lock:
+            now = time.monotonic()
+            self._refresh_state(now)
+            if self._state != CircuitState.OPEN:
+                return 0.0
+            return max(self._opened_at + self.open_seconds - now, 0.0)
+
+    def before_call(self):
+        """
+        Reserve a call, or raise CircuitOpenError if calls are being refused.
+
+        Every call allowed here must be followed by record_success or
+        record_failure.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refresh_state(now)
+            if self._state == CircuitState.OPEN:
+                raise CircuitOpenError(self.name, self._opened_at + self.open_seconds - now)
+            if self._state == CircuitState.HALF_OPEN:
+                if self._half_open_calls >= self.half_open_max_calls:
+                    raise CircuitOpenError(self.name, self.open_seconds)
+                self._half_open_calls += 1
+
+    def record_success(self, latency: float, operation: str = "call"):
+        self._record(failed=False, latency=latency, operation=operation)
+
+    def record_failure(self, latency: float, operation: str = "call"):
+        self._record(failed=True, latency=latency, operation=operation)
+
+    def read_timeout(self, operation: str = "call") -> float:
+        """Adaptive read timeout: p99 of the operation's successful calls times the multiplier."""
+        with self._lock:
+            self._prune(time.monotonic())
+            latencies = sorted(
+                latency for _, failed, latency, op in self._calls if not failed and op == operation
+            )
+        if len(latencies) < self.min_timeout_samples:
+            return self.max_timeout
+        p99 = latencies[min(len(latencies) - 1, math.ceil(0.99 * len(latencies)) - 1)]
+        return min(max(p99 * self.timeout_multiplier, self.min_timeout), self.max_timeout)
+
+    def snapshot(self) -> dict:
+        """Current state and window statistics, for logs and diagnostics."""
+        with self._lock:
+            now = time.monotonic()
+            self._refresh_state(now)
+            calls = len(self._calls)
+            failures = sum(1 for _, failed, latency, _ in self._calls if self._counts_against(failed, latency))
+            operations = sorted({op for _, _, _, op in self._calls})
+            state = self._state
+        return {
+            "name": self.name,
+            "state": state,
+            "calls": calls,
+            "failure_rate": failures / calls if calls else 0.0,
+            "read_timeouts": {op: self.read_timeout(op) for op in operations},
+        }
+
+    def _record(self, failed: bool, latency: float, operation: str):
+        with self._lock:
+            now = time.monotonic()
+            self._refresh_state(now)
+            bad = self._counts_against(failed, latency)
+
+            if self._state == CircuitState.HALF_OPEN:
+                if bad:
+                    self._open(now, "probe call failed")
+                elif self._half_open_calls >= self.half_open_max_calls:
+                    # Probes succeeded: start over with a clean window
+                    self._state = CircuitState.CLOSED
+                    self._calls.clear()
+                    self._calls.append((now, failed, latency, operation))
+                    logger.info(f"Circuit '{self.name}' closed")
+                return
+
+            self._calls.append((now, failed, latency, operation))
+            self._prune(now)
+            if self._state == CircuitState.CLOSED and len(self._calls) >= self.min_calls:
+                failures = sum(1 for _, f, l, _ in self._calls if self._counts_against(f, l))
+                if failures / len(self._calls) >= self.failure_rate:
+                    self._open(now, f"{failures} of {len(self._calls)} recent calls failed or were slow")
+
+    def _counts_against(self, failed: bool, latency: float) -> bool:
+        return failed or latency >= self.slow_call_seconds
+
+    def _open(self, now: float, reason: str):
+        self._state = CircuitState.OPEN
+        self._opened_at = now
+        self._half_open_calls = 0
+        logger.warning(f"Circuit '{self.name}' opened for {self.open_seconds:.0f}s - {reason}")
+
+    def _refresh_state(self, now: float):
+        if self._state == CircuitState.OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = CircuitState.HALF_OPEN
+            self._half_open_calls = 0
+
+    def _prune(self, now: float):
+        cutoff = now - self.window_seconds
+        while self._calls and self._calls[0][0] < cutoff:
+            self._calls.popleft()
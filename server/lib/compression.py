@@ -0,0 +1,230 @@
+"""
+Negotiated gzip/brotli compression for API responses.
+
+Large JSON payloads (order lists with nested users and items) are compressed
+when the client advertises support and the body is above a size threshold.
+Bodies of shareable responses (ones with an ETag or a public/max-age
+Cache-Control) are kept in an in-process LRU, bounded by total compressed
+bytes and keyed by a digest of the uncompressed body, so identical responses
+are not recompressed on every hit. Per-user and per-query responses, which
+never repeat, are compressed without being hashed or cached.
+A compressed response gets an ETag suffixed with its encoding, and
+``Vary: Accept-Encoding``. Static files (direct passthrough) are sent
+uncompressed.
+"""
+
+import gzip
+import hashlib
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import request
+
+from lib.request_timing import phase
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Defaults (overridable through app config)
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 4
+DEFAULT_CACHE_BYTES = 8 * 1024 * 1024
+
+COMPRESSIBLE_MIMETYPES = (
+    "application/json",
+    "text/html",
+    "text/css",
+    "text/plain",
+    "application/javascript",
+    "text/javascript",
+)
+
+
+class CompressedBodyCache:
+    """Thread-safe LRU of compressed bodies keyed by (encoding, body digest), bounded in bytes."""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def set(self, key, body):
+        # A body over a quarter of the budget would evict most of the cache for one entry
+        if len(body) > self.max_bytes // 4:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+def _parse_accept_encoding(header):
+    """Return a dict of encoding -> q-value from an Accept-Encoding header."""
+    encodings = {}
+    for part in (header or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, params = part.partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[name.strip().lower()] = q
+    return encodings
+
+
+def choose_encoding(header):
+    """Pick the best supported encoding for an Accept-Encoding header, or None."""
+    accepted = _parse_accept_encoding(header)
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = None
+    best_q = 0.0
+    for encoding in candidates:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress_body(body, encoding, gzip_level, brotli_quality):
+    """Compress a complete body with the given encoding."""
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+def compress_stream(chunks, encoding, gzip_level, brotli_quality):
+    """Compress an iterable of byte chunks incrementally, flushing each chunk."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=brotli_quality)
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+        return
+
+    # wbits=31 produces a gzip container
+    compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _is_compressible(response):
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if "Content-Encoding" in response.headers:
+        return False
+    return response.mimetype in COMPRESSIBLE_MIMETYPES
+
+
+def _is_shareable(response):
+    """Whether the same body is likely to be sent again, to this or another client."""
+    cache_control = response.cache_control
+    if cache_control.no_store or cache_control.private:
+        return False
+    return bool(response.get_etag()[0]) or cache_control.public or cache_control.max_age is not None
+
+
+def _encode_etag(response, encoding):
+    """Give the compressed representation its own ETag; it is a different body."""
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak=weak)
+
+
+def _add_vary(response):
+    vary = response.headers.get("Vary")
+    if not vary:
+        response.headers["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        response.headers["Vary"] = f"{vary}, Accept-Encoding"
+
+
+def init_compression(app):
+    """Register the after_request hook that compresses responses."""
+    app.config.setdefault("COMPRESS_MIN_SIZE", DEFAULT_MIN_SIZE)
+    app.config.setdefault("COMPRESS_GZIP_LEVEL", DEFAULT_GZIP_LEVEL)
+    app.config.setdefault("COMPRESS_BROTLI_QUALITY", DEFAULT_BROTLI_QUALITY)
+    app.config.setdefault("COMPRESS_CACHE_BYTES", DEFAULT_CACHE_BYTES)
+
+    cache = CompressedBodyCache(app.config["COMPRESS_CACHE_BYTES"])
+    app.extensions["compression_cache"] = cache
+
+    @app.after_request
+    def compress_response(response):
+        # File passthrough (static assets from send_from_directory) goes out as is;
+        # compressing it chunk by chunk on every hit costs CPU for a poor ratio
+        if response.direct_passthrough or not _is_compressible(response):
+            return response
+
+        _add_vary(response)
+
+        encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+        if not encoding:
+            return response
+
+        gzip_level = app.config["COMPRESS_GZIP_LEVEL"]
+        brotli_quality = app.config["COMPRESS_BROTLI_QUALITY"]
+
+        # Streamed responses (generators) are compressed chunk by chunk
+        if response.is_streamed:
+            response.response = compress_stream(
+                response.response, encoding, gzip_level, brotli_quality
+            )
+            response.headers.pop("Content-Length", None)
+            response.headers["Content-Encoding"] = encoding
+            _encode_etag(response, encoding)
+            return response
+
+        body = response.get_data()
+        if len(body) < app.config["COMPRESS_MIN_SIZE"]:
+            return response
+
+        with phase("compress"):
+            if _is_shareable(response):
+                key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+                compressed = cache.get(key)
+                if compressed is None:
+                    compressed = compress_body(body, encoding, gzip_level, brotli_quality)
+                    cache.set(key, compressed)
+            else:
+                compressed = compress_body(body, encoding, gzip_level, brotli_quality)
+
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        _encode_etag(response, encoding)
+        return response
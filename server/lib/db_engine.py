@@ -0,0 +1,289 @@
+"""
+Database engine profiles and connection pool telemetry.
+
+DB_ENGINE_PROFILE selects how connections are managed:
+
+    direct (default)  a QueuePool per worker sized to the worker's threads,
+                      with pre-ping and recycling. statement_timeout is set
+                      once per connection through startup options.
+    pgbouncer         for PgBouncer in transaction pooling mode. SQLAlchemy
+                      keeps no pool of its own (NullPool); PgBouncer pools.
+                      Session state does not survive a transaction there, so
+                      statement_timeout (and read-only mode for replicas) is
+                      set at the start of every transaction. LISTEN needs a session, so the
+                      listener connects to DATABASE_DIRECT_URL.
+
+Statement timeouts depend on the process role (DB_ROLE): "web" requests,
+the notification "worker" and "cli" commands each get their own limit.
+
+Every checkout through the pool is timed. Per-worker counters (checkouts, wait
+time, overflow, timeouts) are kept per engine, so the primary and each
+replica report their own pool. They are available from ``pool_stats`` and at
+GET /api/admin/pool-stats, and slow waits are logged, so pool exhaustion
+shows up before requests start failing. Under the pgbouncer profile there is
+no SQLAlchemy pool and no checkout wait to measure.
+"""
+
+import logging
+import os
+import threading
+import time
+import weakref
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.pool import NullPool, QueuePool
+
+from lib import request_timing
+
+logger = logging.getLogger(__name__)
+
+PROFILES = ("direct", "pgbouncer")
+ROLE_STATEMENT_TIMEOUTS_MS = {
+    "web": int(os.environ.get("DB_STATEMENT_TIMEOUT_WEB_MS", "15000")),
+    "worker": int(os.environ.get("DB_STATEMENT_TIMEOUT_WORKER_MS", "60000")),
+    # Migrations and backfills manage their own pace
+    "cli": int(os.environ.get("DB_STATEMENT_TIMEOUT_CLI_MS", "0")),
+}
+WAIT_WARNING_MS = float(os.environ.get("DB_POOL_WAIT_WARN_MS", "100"))
+
+
+def get_role() -> str:
+    # Flask CLI commands (migrations, seeding, backfills) default to the cli role
+    default = "cli" if os.environ.get("FLASK_RUN_FROM_CLI") == "true" else "web"
+    role = os.environ.get("DB_ROLE", default)
+    return role if role in ROLE_STATEMENT_TIMEOUTS_MS else default
+
+
+class PoolStats:
+    """Checkout counters for the pool of the current process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.pid = os.getpid()
+            self.started_at = time.time()
+            self.checkouts = 0
+            self.checkins = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.wait_ms_total = 0.0
+            self.wait_ms_max = 0.0
+            self.slow_waits = 0
+            self.peak_checked_out = 0
+            self.peak_overflow = 0
+
+    def _check_fork(self):
+        if self.pid != os.getpid():
+            self.reset()
+
+    def record_wait(self, wait_ms: float, checked_out: int, overflow: int, timed_out: bool = False):
+        self._check_fork()
+        with self._lock:
+            self.checkouts += 0 if timed_out else 1
+            self.timeouts += 1 if timed_out else 0
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+            self.peak_overflow = max(self.peak_overflow, overflow)
+            if wait_ms >= WAIT_WARNING_MS:
+                self.slow_waits += 1
+
+    def count(self, name: str):
+        self._check_fork()
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> dict:
+        self._check_fork()
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            return {
+                "pid": self.pid,
+                "uptime_seconds": round(time.time() - self.started_at),
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "slow_waits": self.slow_waits,
+                "wait_ms_avg": round(self.wait_ms_total / waits, 3) if waits else 0.0,
+                "wait_ms_max": round(self.wait_ms_max, 3),
+                "peak_checked_out": self.peak_checked_out,
+                "peak_overflow": self.peak_overflow,
+            }
+
+
+# PoolStats of each engine with hooks installed
+_engine_stats = weakref.WeakKeyDictionary()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times every checkout, including waits for a free connection."""
+
+    def __init__(self, *args, max_overflow: int = 10, **kwargs):
+        super().__init__(*args, max_overflow=max_overflow, **kwargs)
+        self.max_overflow = max_overflow
+        # Replaced by install_engine_hooks with the engine's own stats
+        self.stats = PoolStats()
+
+    def recreate(self):
+        # engine.dispose() swaps in a new pool; keep counting into the same stats
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        stats = self.stats
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            wait_ms = (time.perf_counter() - start) * 1000
+            stats.record_wait(wait_ms, self.checkedout(), self.overflow(), timed_out=True)
+            logger.error(
+                f"Connection pool exhausted after {wait_ms:.0f} ms "
+                f"(size {self.size()}, overflow {self.overflow()}, checked out {self.checkedout()})"
+            )
+            raise
+        wait = time.perf_counter() - start
+        request_timing.record("pool", wait)
+        wait_ms = wait * 1000
+        stats.record_wait(wait_ms, self.checkedout(), self.overflow())
+        if wait_ms >= WAIT_WARNING_MS:
+            logger.warning(
+                f"Waited {wait_ms:.0f} ms for a database connection "
+                f"(size {self.size()}, overflow {self.overflow()}, checked out {self.checkedout()})"
+            )
+        return connection
+
+
+def _default_pool_size() -> int:
+    # One connection per request thread (see gunicorn.conf.py)
+    if os.environ.get("GUNICORN_PROFILE", "gthread") == "gthread":
+        return int(os.environ.get("GUNICORN_THREADS", "8"))
+    return 5
+
+
+def engine_options(database_url: str | None, read_only: bool = False) -> dict:
+    """
+    Build SQLALCHEMY_ENGINE_OPTIONS for the configured profile.
+
+    Only PostgreSQL URLs get pool settings; other databases (local SQLite)
+    keep Flask-SQLAlchemy's defaults. read_only makes every transaction
+    read-only (used for replicas, see lib/db_routing.py).
+    """
+    if not database_url or not database_url.startswith("postgresql"):
+        return {}
+
+    profile = os.environ.get("DB_ENGINE_PROFILE", "direct")
+    if profile not in PROFILES:
+        raise RuntimeError(f"DB_ENGINE_PROFILE must be one of {', '.join(PROFILES)}, got {profile!r}")
+
+    if profile == "pgbouncer":
+        return {"poolclass": NullPool}
+
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", str(_default_pool_size()))),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", "4")),
+        "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT", "10")),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "true").lower() != "false",
+    }
+    startup = []
+    timeout_ms = ROLE_STATEMENT_TIMEOUTS_MS[get_role()]
+    if timeout_ms:
+        startup.append(f"-c statement_timeout={timeout_ms}")
+    if read_only:
+        startup.append("-c default_transaction_read_only=on")
+    if startup:
+        options["connect_args"] = {"options": " ".join(startup)}
+    return options
+
+
+def install_engine_hooks(engine, read_only: bool = False):
+    """Attach pool telemetry and, for PgBouncer, per-transaction session settings."""
+    if engine.dialect.name != "postgresql":
+        return
+
+    stats = _engine_stats.setdefault(engine, PoolStats())
+    if isinstance(engine.pool, InstrumentedQueuePool):
+        engine.pool.stats = stats
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        stats.count("connects")
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        stats.count("checkins")
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        stats.count("invalidations")
+
+    if not isinstance(engine.pool, NullPool):
+        return
+    # PgBouncer does not pass startup options through, so set them per transaction
+    settings = []
+    if read_only:
+        settings.append("SET TRANSACTION READ ONLY")
+    timeout_ms = ROLE_STATEMENT_TIMEOUTS_MS[get_role()]
+    if timeout_ms:
+        settings.append(f"SET LOCAL statement_timeout = {timeout_ms}")
+    if settings:
+        @event.listens_for(engine, "begin")
+        def _apply_settings(connection):
+            for statement in settings:
+                connection.exec_driver_sql(statement)
+
+
+def listener_engine(default_engine):
+    """
+    Engine for LISTEN connections.
+
+    Behind PgBouncer transaction pooling LISTEN does not work, so it connects
+    to DATABASE_DIRECT_URL when that is set.
+    """
+    direct_url = os.environ.get("DATABASE_DIRECT_URL")
+    if not direct_url:
+        return default_engine
+    if direct_url.startswith("postgres://"):
+        direct_url = direct_url.replace("postgres://", "postgresql://", 1)
+    return create_engine(direct_url, poolclass=NullPool)
+
+
+def pool_stats(engine) -> dict:
+    """Counters and current state of this worker's pool for one engine."""
+    pool = engine.pool
+    data = {
+        "role": get_role(),
+        "profile": os.environ.get("DB_ENGINE_PROFILE", "direct"),
+        "pool": pool.status(),
+    }
+    stats = _engine_stats.get(engine)
+    if stats is not None:
+        data.update(stats.snapshot())
+    if isinstance(pool, InstrumentedQueuePool):
+        data.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool.max_overflow,
+        })
+    else:
+        # Checkout waits are only measured by InstrumentedQueuePool
+        data["checkout_waits"] = None
+        data["note"] = (
+            "No SQLAlchemy pool (PgBouncer pools connections; see SHOW POOLS)"
+            if isinstance(pool, NullPool)
+            else "Checkout waits are not measured for this pool"
+        )
+        for key in ("checkouts", "timeouts", "slow_waits", "wait_ms_avg", "wait_ms_max",
+                    "peak_checked_out", "peak_overflow"):
+            data.pop(key, None)
+    return data
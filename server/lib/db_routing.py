@@ -0,0 +1,157 @@
+"""
+Read-replica routing.
+
+When DATABASE_REPLICA_URLS lists one or more replicas, GET and HEAD requests
+read from a replica picked at random per request; every other request, and
+anything outside a request (dispatcher, CLI), uses the primary. Replica
+connections are read-only, so a write that slips into a GET fails loudly
+instead of landing on the wrong server.
+
+Replicas lag the primary, so a user who just changed something would not see
+it in the list they load next. Every successful mutation sets a short-lived
+cookie that pins that client's reads to the primary for
+DB_PRIMARY_PIN_SECONDS. Views that must read the primary regardless are
+marked with ``@use_primary``, and code that must not read stale data (the
+reference data cache) wraps its queries in ``primary_reads()``.
+"""
+
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, text
+
+from lib.db_engine import engine_options, install_engine_hooks
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = "db_primary_until"
+PIN_SECONDS = float(os.environ.get("DB_PRIMARY_PIN_SECONDS", "5"))
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+READ_METHODS = {"GET", "HEAD"}
+
+
+class RoutingSession(Session):
+    """
+    Flask-SQLAlchemy session that sends its queries to the request's replica, if any.
+
+    While ``info["defer_commit"]`` is set, ``commit()`` only flushes and records
+    that a commit was requested; whoever set the flag commits once at the end
+    (see lib/idempotency.py), so later writes land in the same transaction.
+    """
+
+    def commit(self):
+        if self.info.get("defer_commit"):
+            self.flush()
+            self.info["commit_requested"] = True
+            return
+        super().commit()
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            replica = self.info.get("read_replica")
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _replica_urls() -> list[str]:
+    urls = []
+    for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(","):
+        url = url.strip()
+        if url.startswith("postgres://"):
+            url = url.replace("postgres://", "postgresql://", 1)
+        if url:
+            urls.append(url)
+    return urls
+
+
+def init_read_replicas(app, db):
+    """Create the replica engines and register the per-request routing hooks."""
+    engines = []
+    for url in _replica_urls():
+        engine = create_engine(url, **engine_options(url, read_only=True))
+        install_engine_hooks(engine, read_only=True)
+        engines.append(engine)
+    app.extensions["read_replicas"] = engines
+    if not engines:
+        return
+    logger.info(f"Routing reads to {len(engines)} replica(s)")
+
+    @app.before_request
+    def _route_reads():
+        if request.method not in READ_METHODS or is_pinned():
+            return
+        view = current_app.view_functions.get(request.endpoint)
+        if getattr(view, "use_primary", False):
+            return
+        db.session.info["read_replica"] = random.choice(engines)
+
+    @app.after_request
+    def _pin_after_mutation(response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                PIN_COOKIE,
+                str(int(time.time() + PIN_SECONDS)),
+                max_age=int(PIN_SECONDS) + 1,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+def dispose_replicas(app):
+    """Forget replica connections inherited from a parent process (see gunicorn.conf.py)."""
+    for engine in app.extensions.get("read_replicas", []):
+        engine.dispose(close=False)
+
+
+def is_pinned() -> bool:
+    """True if this client wrote recently and its reads must see the primary."""
+    try:
+        return float(request.cookies.get(PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def use_primary(f):
+    """Mark a read view that must see the primary's latest state. Place it right below the route."""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        return f(*args, **kwargs)
+
+    wrapper.use_primary = True
+    return wrapper
+
+
+@contextmanager
+def primary_reads(session):
+    """Run the enclosed queries on the primary, even in a request routed to a replica."""
+    replica = session.info.pop("read_replica", None)
+    try:
+        yield
+    finally:
+        if replica is not None:
+            session.info["read_replica"] = replica
+
+
+def replica_lag_seconds(session) -> float:
+    """
+    How far the replica serving this session is behind the primary.
+
+    0 on the primary, and on a replica that has replayed everything it
+    received. Delta sync adds this to its overlap so rows committed on the
+    primary but not yet replayed are not skipped.
+    """
+    if session.info.get("read_replica") is None:
+        return 0.0
+    lag = session.execute(text(
+        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+    )).scalar()
+    return float(lag or 0)
@@ -0,0 +1,200 @@
+"""
+SMS delivery tracking and status reconciliation.
+
+Every provider send is recorded in ``notification_log`` with the provider
+message id, per-recipient status and request latency. Rows are written in one
+batched INSERT per dispatch batch. ``reconcile_receipts`` pulls delivery
+receipts from ClickSend in pages and applies them with one batched UPDATE per
+page. ``resend_failed`` re-queues only the messages that failed or were not
+delivered, instead of re-notifying everybody.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, bindparam, insert, or_, update
+
+from db import db
+from lib.outbox import enqueue_notifications
+from models.notification_log import DeliveryStatus, NotificationLog
+from models.notification_outbox import NotificationOutbox, OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+# ClickSend receipt status code for a delivered message
+DELIVERED_STATUS_CODES = ("201",)
+MAX_RECEIPT_PAGES = 50
+
+
+def log_deliveries(claimed: list[dict], results: list[dict]):
+    """
+    Add notification_log rows for a dispatched batch in one batched INSERT.
+
+    Not committed here: the rows are committed with the outbox status updates.
+    Rows deferred by the circuit breaker were never sent and are not logged.
+
+    Args:
+        claimed: Rows returned by claim_batch
+        results: Per-row results keyed by 'reference' (the outbox row id)
+    """
+    if not claimed:
+        return
+
+    by_reference = {r.get("reference"): r for r in results}
+    now = datetime.now(timezone.utc)
+    rows = []
+    for message in claimed:
+        result = by_reference.get(message["id"]) or {}
+        if result.get("deferred"):
+            continue
+        rows.append({
+            "outbox_id": message["id"],
+            "event_type": message["event_type"],
+            "recipient": message["to"],
+            "provider_message_id": result.get("message_id"),
+            "status": DeliveryStatus.SENT if result.get("success") else DeliveryStatus.FAILED,
+            "provider_status": result.get("status"),
+            "error": result.get("error") or (None if result else "No result from provider"),
+            "latency_ms": result.get("latency_ms"),
+            "sent_at": now,
+        })
+
+    if rows:
+        db.session.execute(insert(NotificationLog), rows)
+
+
+def _receipt_update(receipt: dict) -> dict:
+    """Convert a ClickSend delivery receipt into parameters for the batched UPDATE."""
+    delivered = str(receipt.get("status_code")) in DELIVERED_STATUS_CODES
+    timestamp = receipt.get("timestamp")
+    return {
+        "b_message_id": receipt.get("message_id"),
+        "b_status": DeliveryStatus.DELIVERED if delivered else DeliveryStatus.UNDELIVERED,
+        "b_provider_status": receipt.get("status_text") or str(receipt.get("status_code")),
+        "b_delivered_at": (
+            datetime.fromtimestamp(int(timestamp), timezone.utc) if delivered and timestamp else None
+        ),
+        "b_updated_at": datetime.now(timezone.utc),
+    }
+
+
+def reconcile_receipts(max_pages: int = MAX_RECEIPT_PAGES) -> int:
+    """
+    Pull unread delivery receipts and apply them to notification_log.
+
+    Receipts are marked read only up to what was applied. If max_pages runs
+    out before the last page, the rest stay unread for the next run. Marking
+    part of the receipts read relies on pages coming oldest first, which the
+    ClickSend API does not promise. The order is therefore checked on the
+    receipts fetched: if any arrived out of order, nothing is marked read and
+    the next run fetches the same receipts again.
+
+    Returns:
+        Number of receipts applied
+    """
+    from lib.sms_service import fetch_delivery_receipts, mark_receipts_read
+
+    statement = (
+        update(NotificationLog.__table__)
+        .where(NotificationLog.__table__.c.provider_message_id == bindparam("b_message_id"))
+        .values(
+            status=bindparam("b_status"),
+            provider_status=bindparam("b_provider_status"),
+            delivered_at=bindparam("b_delivered_at"),
+            updated_at=bindparam("b_updated_at"),
+        )
+    )
+
+    started_at = int(datetime.now(timezone.utc).timestamp())
+    applied = 0
+    newest = None
+    ascending = True
+    reached_last_page = False
+    page = 1
+    while page <= max_pages:
+        result = fetch_delivery_receipts(page=page)
+        updates = [_receipt_update(r) for r in result["receipts"] if r.get("message_id")]
+        if updates:
+            db.session.execute(statement, updates)
+            db.session.commit()
+            applied += len(updates)
+        for timestamp in (int(r["timestamp"]) for r in result["receipts"] if r.get("timestamp")):
+            if newest is not None and timestamp < newest:
+                ascending = False
+            newest = max(newest or 0, timestamp)
+        if page >= result["last_page"]:
+            reached_last_page = True
+            break
+        page += 1
+
+    if applied and reached_last_page:
+        mark_receipts_read(started_at)
+    elif not reached_last_page and newest and ascending:
+        # Pages past max_pages were not fetched, and hold only newer receipts:
+        # only mark what was applied. Receipts sharing the newest second may
+        # sit on the next page, so stop one second short; applying a receipt
+        # twice is harmless.
+        mark_receipts_read(newest - 1)
+        logger.warning(f"Stopped after {max_pages} receipt pages; the rest are picked up next run")
+    elif not reached_last_page:
+        # Unfetched pages may hold receipts older than the ones applied
+        logger.warning(
+            f"Stopped after {max_pages} receipt pages with receipts out of timestamp order; "
+            f"none were marked read. Raise max_pages if this repeats."
+        )
+    logger.info(f"Reconciled {applied} delivery receipts")
+    return applied
+
+
+def resend_failed(event_type: str | None = None, since_hours: int = 24) -> int:
+    """
+    Re-queue messages that were not delivered or that exhausted their retries.
+
+    Sends that failed but are still being retried by the outbox are skipped.
+    Each outbox row is resent at most once per run, and its log rows are marked
+    with resent_at so later runs skip them.
+
+    Args:
+        event_type: Only resend this notification type
+        since_hours: Only consider sends from the last N hours
+
+    Returns:
+        Number of messages re-queued
+    """
+    since = datetime.now(timezone.utc) - timedelta(hours=since_hours)
+    query = (
+        db.session.query(NotificationLog, NotificationOutbox)
+        .join(NotificationOutbox, NotificationLog.outbox_id == NotificationOutbox.id)
+        .filter(
+            or_(
+                NotificationLog.status == DeliveryStatus.UNDELIVERED,
+                and_(
+                    NotificationLog.status == DeliveryStatus.FAILED,
+                    NotificationOutbox.status == OutboxStatus.FAILED,
+                ),
+            ),
+            NotificationLog.resent_at.is_(None),
+            NotificationLog.sent_at >= since,
+        )
+    )
+    if event_type:
+        query = query.filter(NotificationLog.event_type == event_type)
+
+    now = datetime.now(timezone.utc)
+    grouped = {}
+    seen_outbox_ids = set()
+    for log, outbox in query.all():
+        log.resent_at = now
+        if outbox.id in seen_outbox_ids:
+            continue
+        seen_outbox_ids.add(outbox.id)
+        key = (outbox.event_type, outbox.entity_id)
+        grouped.setdefault(key, []).append({"to": outbox.recipient, "message": outbox.message})
+
+    for (group_event_type, entity_id), recipients in grouped.items():
+        enqueue_notifications(group_event_type, entity_id, recipients)
+
+    db.session.commit()
+    count = sum(len(r) for r in grouped.values())
+    logger.info(f"Re-queued {count} failed notifications")
+    return count
@@ -0,0 +1,123 @@
+"""
+Delta sync for the order and repair list endpoints.
+
+Every list response carries an ``X-Sync-Cursor`` header. A client that passes
+it back as ``?updated_since=<cursor>`` gets only the rows created or updated
+since then, plus the ids of rows that were deleted or have left its view
+(e.g. an order another user's approval moved out of "pending"):
+
+    {"data": [...], "deleted": ["<id>", ...], "cursor": "<next cursor>", "full": false}
+
+Changed rows are found through the index on ``updated_at``; deletions through
+``sync_tombstones``. The cursor is the query start time minus a small overlap,
+so rows committed by transactions that were still in flight are picked up on
+the next sync (clients may see a row twice, never miss one). When the request
+reads from a replica, the overlap also covers the replica's replay lag. Tombstones are
+kept for ``SYNC_TOMBSTONE_DAYS``; an older cursor gets the full list back with
+``"full": true`` and the client replaces its copy.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+
+from flask import request
+
+from db import db
+from lib.db_routing import replica_lag_seconds
+from models.sync_tombstone import SyncTombstone
+
+OVERLAP_SECONDS = float(os.environ.get("SYNC_OVERLAP_SECONDS", "5"))
+TOMBSTONE_DAYS = int(os.environ.get("SYNC_TOMBSTONE_DAYS", "30"))
+
+
+def _utcnow():
+    # Timestamps are stored as naive UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _parse_timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def get_sync_params() -> dict:
+    """
+    Read ``updated_since`` (or its alias ``cursor``) from the query string.
+
+    Returns:
+        Dict with 'since' (naive UTC datetime, or None for a full list),
+        'requested' (True if the client asked for a delta), 'full' (True if
+        the cursor was too old and the full list is returned) and 'cursor'
+        (the cursor for the client's next sync)
+
+    Raises:
+        ValueError: The timestamp could not be parsed
+    """
+    now = _utcnow()
+    overlap = OVERLAP_SECONDS + replica_lag_seconds(db.session)
+    params = {
+        "since": None,
+        "requested": False,
+        "full": False,
+        "cursor": (now - timedelta(seconds=overlap)).isoformat() + "Z",
+    }
+
+    value = request.args.get("updated_since") or request.args.get("cursor")
+    if not value:
+        return params
+
+    try:
+        since = _parse_timestamp(value)
+    except ValueError:
+        raise ValueError("Invalid updated_since, expected an ISO 8601 timestamp")
+
+    params["requested"] = True
+    if since < now - timedelta(days=TOMBSTONE_DAYS):
+        params["full"] = True
+    else:
+        params["since"] = since
+    return params
+
+
+def record_tombstone(entity_type: str, entity_id: str, owner_id: str | None = None,
+                     department_id: str | None = None):
+    """
+    Record a deletion in the current session, and prune expired tombstones.
+
+    Args:
+        entity_type: "order" or "repair"
+        entity_id: ID of the deleted row
+        owner_id: ID of the user who created it
+        department_id: Department used for approver visibility (orders only)
+    """
+    SyncTombstone.query.filter(
+        SyncTombstone.deleted_at < _utcnow() - timedelta(days=TOMBSTONE_DAYS)
+    ).delete(synchronize_session=False)
+    db.session.add(SyncTombstone(
+        entity_type=entity_type,
+        entity_id=entity_id,
+        owner_id=owner_id,
+        department_id=department_id,
+    ))
+
+
+def deleted_since(entity_type: str, since: datetime, owner_id: str | None = None,
+                  department_ids: list | None = None) -> list[str]:
+    """
+    IDs of rows of entity_type deleted since a timestamp.
+
+    Args:
+        owner_id: Only deletions of rows this user created
+        department_ids: Only deletions of rows from these departments
+    """
+    query = db.session.query(SyncTombstone.entity_id).filter(
+        SyncTombstone.entity_type == entity_type,
+        SyncTombstone.deleted_at >= since,
+    )
+    if owner_id:
+        query = query.filter(SyncTombstone.owner_id == owner_id)
+    if department_ids is not None:
+        query = query.filter(SyncTombstone.department_id.in_(department_ids))
+    return [entity_id for (entity_id,) in query.all()]
@@ -0,0 +1,380 @@
+"""
+Change events for orders and repairs, streamed to clients over SSE.
+
+State-transition handlers call ``publish_status_change`` before committing. On
+PostgreSQL the event is sent with ``pg_notify`` inside the same transaction,
+so it is delivered only if the status change commits, and it reaches every web
+worker: each worker runs one LISTEN thread that feeds its in-process
+``EventBus``. On other databases (local SQLite) events are published to the
+bus of the current process after commit. The same LISTEN thread serves other
+channels registered with ``register_channel`` (see lib/cache.py).
+
+The bus keeps the most recent events in a ring buffer, so a client that
+reconnects with Last-Event-ID gets the events it missed. Streams wait on a
+condition variable instead of polling, send a heartbeat comment while idle
+and end after ``SSE_MAX_STREAM_SECONDS``; the browser's EventSource then
+reconnects. The number of open streams per worker is capped so they cannot
+take every request thread.
+"""
+
+import json
+import logging
+import os
+import select
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timezone
+
+from sqlalchemy import event as sa_event, text
+from sqlalchemy.orm import Session
+
+from constants import REPAIRS_DEPARTMENT_ID
+from db import db
+from lib.db_engine import listener_engine
+
+logger = logging.getLogger(__name__)
+
+CHANGES_CHANNEL = "entity_changes"
+
+# Stream tuning (overridable through the environment)
+HEARTBEAT_SECONDS = float(os.environ.get("SSE_HEARTBEAT_SECONDS", "15"))
+MAX_STREAM_SECONDS = float(os.environ.get("SSE_MAX_STREAM_SECONDS", "300"))
+REPLAY_EVENTS = int(os.environ.get("SSE_REPLAY_EVENTS", "1000"))
+# Under gthread, at most one in this many request threads may hold a stream
+STREAM_THREAD_SHARE = 4
+RECONNECT_MS = int(os.environ.get("SSE_RETRY_MS", "3000"))
+LISTEN_POLL_SECONDS = 5
+
+
+def _default_max_streams() -> int:
+    """
+    Streams per worker for the gunicorn profile (see gunicorn.conf.py).
+
+    Under gthread an open stream holds a thread for up to MAX_STREAM_SECONDS,
+    and EventSource reconnects as soon as it closes, so streaming threads are
+    busy all the time. Only one thread in STREAM_THREAD_SHARE may stream (2 of
+    the default 8), leaving the rest for API requests; deployments with many
+    live clients should use the gevent profile. Under gevent a stream is an
+    idle greenlet, so most of the worker's connections may stream. A sync
+    worker would be blocked by a single stream, so streams are refused there.
+    """
+    profile = os.environ.get("GUNICORN_PROFILE", "gthread")
+    if profile == "gevent":
+        connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", "200"))
+        return max(1, connections - connections // 4)
+    if profile == "gthread":
+        return int(os.environ.get("GUNICORN_THREADS", "8")) // STREAM_THREAD_SHARE
+    return 0
+
+
+MAX_STREAMS = int(os.environ.get("SSE_MAX_STREAMS") or _default_max_streams())
+
+
+class EventBus:
+    """In-process fan-out of change events with a replay ring buffer."""
+
+    def __init__(self, max_events=REPLAY_EVENTS):
+        self._events = deque(maxlen=max_events)  # (seq, event)
+        self._seq = 0
+        self._condition = threading.Condition()
+
+    def publish(self, event: dict):
+        with self._condition:
+            self._seq += 1
+            self._events.append((self._seq, event))
+            self._condition.notify_all()
+
+    @property
+    def last_seq(self) -> int:
+        with self._condition:
+            return self._seq
+
+    def seq_after(self, event_id: str) -> int | None:
+        """Sequence number of a buffered event, or None if it is no longer buffered."""
+        with self._condition:
+            for seq, event in reversed(self._events):
+                if event.get("event_id") == event_id:
+                    return seq
+        return None
+
+    def wait(self, after_seq: int, timeout: float) -> tuple[list[dict], int]:
+        """
+        Wait up to timeout seconds for events newer than after_seq.
+
+        Returns:
+            (events, last sequence number seen)
+        """
+        with self._condition:
+            if self._seq <= after_seq:
+                self._condition.wait(timeout)
+            events = [event for seq, event in self._events if seq > after_seq]
+            return events, self._seq
+
+
+bus = EventBus()
+
+_channel_handlers = {CHANGES_CHANNEL: bus.publish}
+_reconnect_handlers = []
+_listener_pid = None
+_listener_lock = threading.Lock()
+_listening = threading.Event()
+
+_streams = 0
+_streams_lock = threading.Lock()
+
+
+# ============== Publishing ==============
+
+def _uses_notify() -> bool:
+    return db.session.get_bind().dialect.name == "postgresql"
+
+
+def publish_status_change(entity_type: str, entity, owner_id: str, department_id: str | None = None):
+    """
+    Publish a status change in the caller's transaction. Call before commit.
+
+    Args:
+        entity_type: "order" or "repair"
+        entity: The Order or Repair whose status changed
+        owner_id: ID of the user who created it
+        department_id: Department used for approver visibility (orders only)
+    """
+    # Flush so updated_at reflects this change
+    db.session.flush()
+    updated_at = entity.updated_at
+    event = {
+        "event_id": str(uuid.uuid4()),
+        "type": entity_type,
+        "id": entity.id,
+        "status": entity.status,
+        "updated_at": updated_at.isoformat() if updated_at else None,
+        "owner_id": owner_id,
+        "department_id": department_id,
+    }
+
+    if _uses_notify():
+        # NOTIFY is transactional: listeners only see it if the commit succeeds
+        db.session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": CHANGES_CHANNEL, "payload": json.dumps(event)},
+        )
+    else:
+        db.session.info.setdefault("pending_events", []).append(event)
+
+
+@sa_event.listens_for(Session, "after_commit")
+def _publish_pending_events(session):
+    for event in session.info.pop("pending_events", []):
+        bus.publish(event)
+
+
+@sa_event.listens_for(Session, "after_rollback")
+def _discard_pending_events(session):
+    session.info.pop("pending_events", None)
+
+
+# ============== Cross-worker listener ==============
+
+def register_channel(channel: str, handler, on_reconnect=None):
+    """
+    Deliver payloads NOTIFYed on channel to handler(payload) in every worker.
+
+    Register at import time, before the listener starts. on_reconnect is
+    called when the LISTEN connection comes back after a failure, since
+    notifications sent in between were lost.
+    """
+    _channel_handlers[channel] = handler
+    if on_reconnect:
+        _reconnect_handlers.append(on_reconnect)
+
+
+def is_listening() -> bool:
+    """True once this worker receives notifications (always True off PostgreSQL)."""
+    return _listening.is_set() and _listener_pid == os.getpid()
+
+
+def wait_until_listening(timeout: float) -> bool:
+    """Block until this worker's LISTEN connection is up, or timeout seconds pass."""
+    return _listening.wait(timeout) and _listener_pid == os.getpid()
+
+
+def _publish_reset():
+    bus.publish({"event_id": str(uuid.uuid4()), "type": "reset"})
+
+
+_reconnect_handlers.append(_publish_reset)
+
+
+def start_listener(app):
+    """
+    Start this process's LISTEN thread if it is not running yet.
+
+    Called lazily from request handlers rather than at import time, so each
+    forked worker starts its own thread. Does nothing on non-PostgreSQL
+    databases, where events never leave the process.
+    """
+    global _listener_pid
+
+    pid = os.getpid()
+    if _listener_pid == pid:
+        return
+    with _listener_lock:
+        if _listener_pid == pid:
+            return
+        with app.app_context():
+            engine = listener_engine(db.engine)
+        _listener_pid = pid
+        # Flags inherited from the parent process do not apply to this one
+        _listening.clear()
+        if engine.dialect.name != "postgresql":
+            # Single process: writes are applied locally after commit
+            _listening.set()
+            return
+        thread = threading.Thread(target=_listen, args=(engine,), name="pg-listener", daemon=True)
+        thread.start()
+
+
+def _listen(engine):
+    """LISTEN on every registered channel and dispatch notifications, reconnecting on failure."""
+    backoff = 1
+    connected_before = False
+    while True:
+        try:
+            raw = engine.raw_connection()
+            # Keep the connection out of the pool; it is held for the life of the thread
+            raw.detach()
+            connection = raw.driver_connection
+            connection.autocommit = True
+            try:
+                cursor = connection.cursor()
+                for channel in _channel_handlers:
+                    cursor.execute(f'LISTEN "{channel}"')
+                _listening.set()
+                if connected_before:
+                    # Notifications may have been missed while disconnected
+                    for handler in _reconnect_handlers:
+                        handler()
+                connected_before = True
+                backoff = 1
+
+                while True:
+                    if select.select([connection], [], [], LISTEN_POLL_SECONDS) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        _dispatch(connection.notifies.pop(0))
+            finally:
+                _listening.clear()
+                raw.close()
+        except Exception:
+            logger.exception(f"LISTEN connection lost, reconnecting in {backoff}s")
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 60)
+
+
+def _dispatch(notification):
+    handler = _channel_handlers.get(notification.channel)
+    if not handler:
+        return
+    try:
+        handler(json.loads(notification.payload))
+    except Exception:
+        logger.exception(f"Failed to handle notification on {notification.channel}")
+
+
+# ============== Streaming ==============
+
+def user_scope(user) -> dict:
+    """
+    Snapshot what a user may see, mirroring the order and repair list endpoints.
+
+    Taken once per stream; streams are short-lived, so changes to a user's
+    roles apply on the next reconnect.
+    """
+    from lib.reference_data import get_approver_routing
+
+    departments = None
+    if user.is_approver:
+        routing = get_approver_routing(user.id)
+        if routing:
+            departments = "all" if routing["is_global"] else routing["department_ids"]
+    return {
+        "user_id": user.id,
+        "is_admin": user.is_admin,
+        "is_technician": user.is_technician,
+        "departments": departments,
+    }
+
+
+def can_see(scope: dict, event: dict) -> bool:
+    if event["type"] == "reset" or scope["is_admin"] or event.get("owner_id") == scope["user_id"]:
+        return True
+    departments = scope["departments"]
+    if event["type"] == "order":
+        return departments == "all" or (departments is not None and event.get("department_id") in departments)
+    if event["type"] == "repair":
+        return scope["is_technician"] or departments == "all" or (
+            departments is not None and REPAIRS_DEPARTMENT_ID in departments
+        )
+    return False
+
+
+def acquire_stream() -> bool:
+    """Reserve one of this worker's stream slots."""
+    global _streams
+    with _streams_lock:
+        if _streams >= MAX_STREAMS:
+            return False
+        _streams += 1
+        return True
+
+
+def release_stream():
+    global _streams
+    with _streams_lock:
+        _streams = max(_streams - 1, 0)
+
+
+def format_event(event: dict) -> str:
+    if event["type"] == "reset":
+        return f"id: {event['event_id']}\nevent: reset\ndata: {{}}\n\n"
+    data = {
+        "id": event["id"],
+        "type": event["type"],
+        "status": event["status"],
+        "updated_at": event["updated_at"],
+    }
+    return f"id: {event['event_id']}\nevent: {event['type']}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream(scope: dict, last_event_id: str | None = None):
+    """
+    Yield SSE frames visible to scope until MAX_STREAM_SECONDS have passed.
+
+    If last_event_id is given and still buffered, the events after it are
+    replayed first. If it is too old, a 'reset' event tells the client to
+    re-fetch its lists.
+    """
+    yield f"retry: {RECONNECT_MS}\n\n"
+
+    last_seq = bus.last_seq
+    if last_event_id:
+        seq = bus.seq_after(last_event_id)
+        if seq is None:
+            yield format_event({"event_id": str(uuid.uuid4()), "type": "reset"})
+        else:
+            last_seq = seq
+
+    deadline = time.monotonic() + MAX_STREAM_SECONDS
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        events, last_seq = bus.wait(last_seq, timeout=min(HEARTBEAT_SECONDS, remaining))
+        frames = [format_event(e) for e in events if can_see(scope, e)]
+        if frames:
+            yield "".join(frames)
+        else:
+            yield f": heartbeat {datetime.now(timezone.utc).isoformat()}\n\n"
@@ -0,0 +1,263 @@
+"""
+Idempotency-Key support for create and submit endpoints.
+
+Clients on flaky connections retry POSTs whose response they never saw. A
+client that sends an ``Idempotency-Key`` header (any unique string up to 255
+characters, e.g. a UUID per user action) gets the stored response of the first
+request for every retry within IDEMPOTENCY_TTL_HOURS, with
+``Idempotent-Replayed: true``. The handler does not run again, so retries
+allocate no numbers and send no SMS.
+
+The first request claims the key by inserting an ``in_progress`` row and
+committing it before the handler runs. A duplicate that arrives while the
+first one is still running finds the claim and waits for its response, up to
+IDEMPOTENCY_WAIT_SECONDS, then gets a 409 with Retry-After. Keys are scoped to
+the user. Reusing a key for a different method, path, query string or body is
+a 422.
+
+The handler's commits are deferred (see RoutingSession), and its writes
+commit in one transaction with the stored response, status and headers. A
+worker that dies before that commit leaves nothing behind but the claim, so
+running the request again is safe. A claim whose worker died is taken over
+after IDEMPOTENCY_LOCK_SECONDS. Each claim carries its lease as a fencing
+token: if a slow request finds its claim taken over, it rolls back instead of
+committing a second time. Responses with 5xx codes, or a handler exception,
+release the claim so the client can retry.
+
+Apply below ``@authenticate``:
+
+    @order_bp.route("/", methods=["POST"])
+    @authenticate
+    @idempotent
+    def create_order_route(current_user):
+"""
+
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+from flask import jsonify, make_response, request
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from db import db
+from lib.write_response import commit_keep_loaded
+from models.idempotency_key import IdempotencyKey, IdempotencyStatus
+
+logger = logging.getLogger(__name__)
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+TTL_HOURS = float(os.environ.get("IDEMPOTENCY_TTL_HOURS", "24"))
+WAIT_SECONDS = float(os.environ.get("IDEMPOTENCY_WAIT_SECONDS", "10"))
+LOCK_SECONDS = float(os.environ.get("IDEMPOTENCY_LOCK_SECONDS", "60"))
+POLL_SECONDS = 0.05
+MAX_POLL_SECONDS = 0.5
+# Set per response by Flask or by after_request hooks, not by the handler
+UNSTORED_HEADERS = {"content-type", "content-length", "set-cookie"}
+
+
+def _utcnow():
+    # Timestamps are stored as naive UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _request_hash() -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.path}\n".encode())
+    digest.update(request.query_string + b"\n")
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+
+def _claim(user_id: str, key: str, request_hash: str):
+    """
+    Claim a key for this request and commit the claim.
+
+    Returns:
+        The claim's lease (locked_until) if this request owns the key and
+        should run the handler, else None
+    """
+    now = _utcnow()
+    lease = now + timedelta(seconds=LOCK_SECONDS)
+    # Drop expired keys, then try to insert ours
+    db.session.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < now))
+    try:
+        db.session.execute(insert(IdempotencyKey).values(
+            user_id=user_id,
+            key=key,
+            request_hash=request_hash,
+            status=IdempotencyStatus.IN_PROGRESS,
+            locked_until=lease,
+            expires_at=now + timedelta(hours=TTL_HOURS),
+            created_at=now,
+        ))
+        commit_keep_loaded()
+        return lease
+    except IntegrityError:
+        db.session.rollback()
+
+    # Take over a claim left behind by a request that never finished
+    result = db.session.execute(
+        update(IdempotencyKey)
+        .where(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.request_hash == request_hash,
+            IdempotencyKey.status == IdempotencyStatus.IN_PROGRESS,
+            IdempotencyKey.locked_until < now,
+        )
+        .values(locked_until=lease)
+    )
+    commit_keep_loaded()
+    if not result.rowcount:
+        return None
+    logger.warning(f"Took over abandoned idempotency key {key!r} of user {user_id}")
+    return lease
+
+
+def _load(user_id: str, key: str):
+    row = db.session.execute(
+        select(
+            IdempotencyKey.request_hash,
+            IdempotencyKey.status,
+            IdempotencyKey.response_status,
+            IdempotencyKey.response_body,
+            IdempotencyKey.response_content_type,
+            IdempotencyKey.response_headers,
+        ).where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+    ).first()
+    # End the read so the next poll sees the first request's commit
+    db.session.rollback()
+    return row
+
+
+def _in_progress():
+    response = jsonify({"error": f"A request with this {HEADER} is still in progress; retry shortly"})
+    response.headers["Retry-After"] = "1"
+    return response, 409
+
+
+def _wait_for_response(user_id: str, key: str, request_hash: str):
+    """
+    Wait for the request that owns the key to finish, and replay its response.
+
+    Returns:
+        The response to send, or None if the owner failed and released the key
+    """
+    deadline = time.monotonic() + WAIT_SECONDS
+    pause = POLL_SECONDS
+    while True:
+        row = _load(user_id, key)
+        if row is None:
+            return None
+        if row.request_hash != request_hash:
+            return jsonify({"error": f"{HEADER} was already used for a different request"}), 422
+        if row.status == IdempotencyStatus.COMPLETED:
+            response = make_response(row.response_body, row.response_status)
+            response.content_type = row.response_content_type
+            for name, value in row.response_headers or []:
+                response.headers.add(name, value)
+            response.headers["Idempotent-Replayed"] = "true"
+            return response
+        if time.monotonic() + pause > deadline:
+            return _in_progress()
+        time.sleep(pause)
+        pause = min(pause * 2, MAX_POLL_SECONDS)
+
+
+def _release(user_id: str, key: str, lease):
+    db.session.rollback()
+    db.session.execute(
+        delete(IdempotencyKey).where(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.locked_until == lease,
+        )
+    )
+    commit_keep_loaded()
+
+
+def _store(user_id: str, key: str, lease, response) -> bool:
+    """
+    Store the response in the handler's transaction and commit both.
+
+    Returns:
+        False if the claim was taken over meanwhile; nothing is committed then
+    """
+    result = db.session.execute(
+        update(IdempotencyKey)
+        .where(
+            IdempotencyKey.user_id == user_id,
+            IdempotencyKey.key == key,
+            IdempotencyKey.status == IdempotencyStatus.IN_PROGRESS,
+            IdempotencyKey.locked_until == lease,
+        )
+        .values(
+            status=IdempotencyStatus.COMPLETED,
+            response_status=response.status_code,
+            response_body=response.get_data(),
+            response_content_type=response.content_type,
+            response_headers=[
+                [name, value] for name, value in response.headers.items()
+                if name.lower() not in UNSTORED_HEADERS
+            ],
+        )
+    )
+    if not result.rowcount:
+        db.session.rollback()
+        return False
+    commit_keep_loaded()
+    return True
+
+
+def idempotent(f):
+    """Replay the stored response for a repeated Idempotency-Key instead of running f again."""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return f(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({"error": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters"}), 400
+
+        user_id = kwargs["current_user"].id
+        request_hash = _request_hash()
+        lease = _claim(user_id, key, request_hash)
+        if lease is None:
+            response = _wait_for_response(user_id, key, request_hash)
+            if response is not None:
+                return response
+            # The first request failed and released the key: run this one instead
+            lease = _claim(user_id, key, request_hash)
+            if lease is None:
+                return _in_progress()
+
+        session = db.session()
+        session.info["defer_commit"] = True
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            session.info.pop("defer_commit", None)
+            session.info.pop("commit_requested", None)
+            _release(user_id, key, lease)
+            raise
+        session.info.pop("defer_commit", None)
+        committed = session.info.pop("commit_requested", False)
+
+        if response.status_code >= 500:
+            _release(user_id, key, lease)
+            return response
+        if not committed:
+            # Whatever the handler did not commit (e.g. before returning an error) is not kept
+            db.session.rollback()
+        if not _store(user_id, key, lease, response):
+            logger.warning(f"Idempotency key {key!r} of user {user_id} was taken over; discarded this run")
+            return _in_progress()
+        return response
+
+    return decorated_function
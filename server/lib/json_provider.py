@@ -0,0 +1,67 @@
+"""
+Fast JSON provider for Flask backed by orjson.
+
+orjson serializes datetimes and UUIDs natively in C, so model ``to_dict``
+methods can return raw column values instead of calling ``.isoformat()`` and
+``float()`` by hand. Decimals (order quantities and costs) are emitted as
+numbers. If orjson is not installed the provider falls back to the standard
+library encoder with the same type handling.
+"""
+
+import dataclasses
+import datetime
+import decimal
+import json
+import uuid
+
+from flask.json.provider import JSONProvider
+
+from lib.request_timing import phase
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+
+def _default(o):
+    """Serialize types that the encoder does not handle natively."""
+    if isinstance(o, decimal.Decimal):
+        return float(o)
+    if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+        return o.isoformat()
+    if isinstance(o, uuid.UUID):
+        return str(o)
+    if dataclasses.is_dataclass(o) and not isinstance(o, type):
+        return dataclasses.asdict(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONProvider(JSONProvider):
+    """JSON provider that uses orjson when available."""
+
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj).decode("utf-8")
+
+    def dumps_bytes(self, obj):
+        """Serialize to UTF-8 bytes without an intermediate str when possible."""
+        if orjson is not None:
+            return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return json.dumps(
+            obj, default=_default, ensure_ascii=False, separators=(",", ":")
+        ).encode("utf-8")
+
+    def loads(self, s, **kwargs):
+        if orjson is not None:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        with phase("json"):
+            body = self.dumps_bytes(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
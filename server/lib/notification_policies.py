@@ -0,0 +1,91 @@
+"""
+Per-event-type coalescing policies for SMS notifications.
+
+Messages of a coalescing event type are held in the outbox for up to
+``window_seconds``. Every message queued for the same recipient and event type
+while one is still pending joins that digest, and the dispatcher sends one SMS
+built from the ``digest`` template instead of one per event. A window of 0
+sends each message on its own.
+
+The window is added latency: the first message of a digest waits the full
+window even if nothing else arrives, so a lone "order pending" SMS goes out
+about two minutes after the order is submitted. Only approval notifications,
+where a few minutes do not matter, use a window.
+
+Windows can be overridden per event type with NOTIFY_<EVENT_TYPE>_WINDOW,
+e.g. NOTIFY_ORDER_PENDING_WINDOW=300.
+"""
+
+import os
+
+DEFAULT_POLICY = {"window_seconds": 0, "digest": None}
+
+NOTIFICATION_POLICIES = {
+    "order_pending": {
+        "window_seconds": 120,
+        "digest": "{count} orders pending approval: {client_url}/all-orders",
+    },
+    "repair_pending": {
+        "window_seconds": 120,
+        "digest": "{count} repairs pending approval: {client_url}/all-repairs",
+    },
+    "order_approved": {
+        "window_seconds": 300,
+        "digest": "{count} orders have been approved: {client_url}/all-orders",
+    },
+    "repair_approved": {
+        "window_seconds": 300,
+        "digest": "{count} repairs approved and ready for completion: {client_url}/all-repairs",
+    },
+    # Personal notifications about a single order or repair are never merged
+    "order_paid": {"window_seconds": 0, "digest": None},
+    "repair_completed": {"window_seconds": 0, "digest": None},
+}
+
+
+def get_policy(event_type: str) -> dict:
+    """Return the coalescing policy for an event type, applying env overrides."""
+    policy = dict(NOTIFICATION_POLICIES.get(event_type, DEFAULT_POLICY))
+    override = os.environ.get(f"NOTIFY_{event_type.upper()}_WINDOW")
+    if override is not None:
+        policy["window_seconds"] = int(override)
+    if not policy["digest"]:
+        policy["window_seconds"] = 0
+    return policy
+
+
+def coalesce(messages: list[dict], client_url: str) -> list[dict]:
+    """
+    Merge claimed outbox messages into one message per recipient and event type.
+
+    Args:
+        messages: Dicts with 'id', 'event_type', 'to' and 'message'
+        client_url: Base URL used in digest links
+
+    Returns:
+        List of dicts with 'to', 'message' and 'ids' (the outbox rows covered)
+    """
+    groups = {}
+    for message in messages:
+        policy = get_policy(message["event_type"])
+        if policy["window_seconds"]:
+            key = (message["to"], message["event_type"])
+        else:
+            key = (message["to"], message["event_type"], message["id"])
+        groups.setdefault(key, []).append(message)
+
+    merged = []
+    for group in groups.values():
+        first = group[0]
+        if len(group) == 1:
+            text = first["message"]
+        else:
+            text = get_policy(first["event_type"])["digest"].format(
+                count=len(group), client_url=client_url
+            )
+        merged.append({
+            "to": first["to"],
+            "message": text,
+            "ids": [m["id"] for m in group],
+        })
+    return merged
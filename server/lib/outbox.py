@@ -0,0 +1,253 @@
+"""
+Transactional outbox for SMS notifications.
+
+Controllers enqueue notifications into the ``notification_outbox`` table in the
+same transaction as the status change that triggers them, so API latency no
+longer depends on the SMS provider. The dispatcher process (``dispatcher.py``)
+claims due rows, delivers them through ``send_bulk_sms`` and records the
+outcome, retrying failures with exponential backoff.
+
+Delivery is idempotent per outbox row: a row is claimed exclusively (row lock
+plus a lease) before it is sent, and rows in a terminal state are never sent
+again. If a dispatcher dies mid-send, the row is retried once its lease expires.
+
+While the SMS provider's circuit breaker is open the dispatcher claims nothing,
+and rows refused mid-batch are deferred until the breaker's retry time without
+using up one of their attempts.
+
+Event types with a coalescing policy (lib/notification_policies.py) are held
+for a digest window, and the dispatcher merges rows for the same recipient and
+event type into a single SMS. A digest is claimed whole, so it is never split
+across two batches.
+"""
+
+import logging
+import random
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, func, or_, tuple_
+
+from db import db
+from lib.notification_policies import coalesce, get_policy
+from models.notification_outbox import NotificationOutbox, OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 6
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 60 * 60
+LEASE_SECONDS = 120
+
+
+def enqueue_notifications(event_type: str, entity_id: str | None, recipients: list[dict]):
+    """
+    Queue SMS messages in the current session.
+
+    The rows are committed (or rolled back) together with the caller's
+    transaction, so a notification exists if and only if its status change does.
+    For coalescing event types, a row joins the pending digest for its
+    recipient if there is one, or opens a new digest window otherwise. Only
+    digests that have not been attempted yet are joined: a new event is not
+    held back by another message's retry backoff.
+
+    Args:
+        event_type: Notification type, e.g. "order_pending"
+        entity_id: ID of the order or repair the notification is about
+        recipients: List of dicts with 'to' and 'message' keys
+    """
+    recipients = [r for r in recipients if r.get("to") and r.get("message")]
+    if not recipients:
+        return
+
+    now = datetime.now(timezone.utc)
+    window = get_policy(event_type)["window_seconds"]
+
+    # Due time of the digest already pending for each recipient, if any
+    pending_digests = {}
+    if window:
+        pending_digests = dict(
+            db.session.query(
+                NotificationOutbox.recipient,
+                func.max(NotificationOutbox.next_attempt_at),
+            )
+            .filter(
+                NotificationOutbox.event_type == event_type,
+                NotificationOutbox.status == OutboxStatus.PENDING,
+                NotificationOutbox.attempts == 0,
+                NotificationOutbox.recipient.in_([r["to"] for r in recipients]),
+            )
+            .group_by(NotificationOutbox.recipient)
+            .all()
+        )
+
+    for recipient in recipients:
+        next_attempt_at = pending_digests.get(recipient["to"]) or now + timedelta(seconds=window)
+        db.session.add(NotificationOutbox(
+            event_type=event_type,
+            entity_id=entity_id,
+            recipient=recipient["to"],
+            message=recipient["message"],
+            status=OutboxStatus.PENDING,
+            next_attempt_at=next_attempt_at,
+        ))
+
+
+def _backoff_seconds(attempts: int) -> float:
+    """Exponential backoff with full jitter."""
+    delay = min(BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0), BACKOFF_MAX_SECONDS)
+    return random.uniform(delay / 2, delay)
+
+
+def claim_batch(batch_size: int) -> list[dict]:
+    """
+    Claim up to batch_size due rows for delivery.
+
+    Rows are locked with SKIP LOCKED so several dispatchers can run side by
+    side, marked as sending with a lease, and committed before any provider
+    call is made. The other due rows of every digest in the batch are claimed
+    with it, so a batch can exceed batch_size by the size of its last digest.
+
+    Returns:
+        List of dicts with 'id', 'event_type', 'to' and 'message' for the claimed rows
+    """
+    now = datetime.now(timezone.utc)
+    due = or_(
+        and_(
+            NotificationOutbox.status == OutboxStatus.PENDING,
+            NotificationOutbox.next_attempt_at <= now,
+        ),
+        and_(
+            NotificationOutbox.status == OutboxStatus.SENDING,
+            NotificationOutbox.locked_until < now,
+        ),
+    )
+    rows = (
+        NotificationOutbox.query
+        .filter(due)
+        .order_by(
+            NotificationOutbox.next_attempt_at,
+            NotificationOutbox.recipient,
+            NotificationOutbox.event_type,
+        )
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+
+    # The limit may have cut a digest in two: claim the rest of each digest too
+    digest_keys = {
+        (row.recipient, row.event_type)
+        for row in rows
+        if get_policy(row.event_type)["window_seconds"]
+    }
+    if digest_keys:
+        rows += (
+            NotificationOutbox.query
+            .filter(
+                due,
+                tuple_(NotificationOutbox.recipient, NotificationOutbox.event_type).in_(digest_keys),
+                NotificationOutbox.id.notin_([row.id for row in rows]),
+            )
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+    claimed = []
+    for row in rows:
+        row.status = OutboxStatus.SENDING
+        row.attempts += 1
+        row.locked_until = now + timedelta(seconds=LEASE_SECONDS)
+        claimed.append({
+            "id": row.id,
+            "event_type": row.event_type,
+            "to": row.recipient,
+            "message": row.message,
+        })
+
+    db.session.commit()
+    return claimed
+
+
+def record_results(claimed: list[dict], results: list[dict]):
+    """
+    Record provider results for claimed rows and schedule retries for failures.
+
+    Args:
+        claimed: Rows returned by claim_batch
+        results: Per-recipient results from send_bulk_sms, keyed by 'reference'
+    """
+    by_reference = {r.get("reference"): r for r in results}
+    rows = NotificationOutbox.query.filter(
+        NotificationOutbox.id.in_([c["id"] for c in claimed])
+    ).all()
+
+    now = datetime.now(timezone.utc)
+    # Rows that failed together retry together, so digests stay merged
+    retry_delays = {}
+    for row in rows:
+        result = by_reference.get(row.id)
+        if result and result.get("deferred"):
+            # Never reached the provider: put it back without spending an attempt
+            row.status = OutboxStatus.PENDING
+            row.attempts = max(row.attempts - 1, 0)
+            row.locked_until = None
+            row.last_error = result.get("error")
+            row.next_attempt_at = now + timedelta(seconds=result.get("retry_after") or 0)
+            continue
+        if result and result.get("success"):
+            row.status = OutboxStatus.SENT
+            row.sent_at = now
+            row.locked_until = None
+            row.last_error = None
+            continue
+
+        row.last_error = (result or {}).get("error") or "No result from provider"
+        row.locked_until = None
+        if row.attempts >= MAX_ATTEMPTS:
+            row.status = OutboxStatus.FAILED
+            logger.error(f"Notification {row.id} failed after {row.attempts} attempts - {row.last_error}")
+        else:
+            row.status = OutboxStatus.PENDING
+            if row.attempts not in retry_delays:
+                retry_delays[row.attempts] = _backoff_seconds(row.attempts)
+            row.next_attempt_at = now + timedelta(seconds=retry_delays[row.attempts])
+
+    db.session.commit()
+
+
+def dispatch_batch(batch_size: int = 100) -> int:
+    """
+    Claim and deliver one batch of due notifications.
+
+    Returns:
+        Number of rows processed (0 when the outbox is idle or the provider's
+        circuit breaker is open)
+    """
+    from lib.delivery_tracking import log_deliveries
+    from lib.circuit_breaker import CircuitState
+    from lib.sms_service import _get_config, get_breaker, send_bulk_sms
+
+    if get_breaker().state == CircuitState.OPEN:
+        return 0
+
+    claimed = claim_batch(batch_size)
+    if not claimed:
+        return 0
+
+    # One SMS per recipient and event type; the first row id identifies the digest
+    messages = coalesce(claimed, _get_config()["client_url"])
+    results = send_bulk_sms([
+        {"to": m["to"], "message": m["message"], "reference": m["ids"][0]}
+        for m in messages
+    ])
+
+    by_reference = {r.get("reference"): r for r in results["results"]}
+    row_results = []
+    for message in messages:
+        result = by_reference.get(message["ids"][0])
+        if result:
+            row_results.extend({**result, "reference": row_id} for row_id in message["ids"])
+
+    log_deliveries(claimed, row_results)
+    record_results(claimed, row_results)
+    return len(claimed)
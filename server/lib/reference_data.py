@@ -0,0 +1,114 @@
+"""
+Cached reference data read on most requests.
+
+Values are plain dicts and lists, not ORM objects, so they can be shared
+across requests. They are evicted whenever one of their tables is written
+(see lib/cache.py).
+"""
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from db import db
+from lib.cache import cached
+from models.approver import Approver
+from models.department import Department
+from models.technician import Technician
+from models.unit import Unit
+from models.user import User
+
+# Rows in the unit combo box before the user types anything
+UNIT_OPTIONS_LIMIT = 50
+
+
+@cached("approver_routing", depends_on=("approvers", "approver_departments"))
+def get_approver_routing(user_id: str) -> dict | None:
+    """
+    Return which departments a user can approve for.
+
+    Returns:
+        Dict with 'id', 'is_global' and 'department_ids', or None if the user
+        is not an approver
+    """
+    approver = Approver.query.filter_by(user_id=user_id).first()
+    if not approver:
+        return None
+    return {
+        "id": approver.id,
+        "is_global": approver.is_global_approver,
+        "department_ids": frozenset(approver.department_ids),
+    }
+
+
+def can_approve_for_department(routing: dict | None, department_id) -> bool:
+    """Same rule as Approver.can_approve_for_department, for cached routing."""
+    if not routing:
+        return False
+    return routing["is_global"] or department_id in routing["department_ids"]
+
+
+@cached("departments", depends_on=("departments",))
+def get_departments(active_only: bool) -> list[dict]:
+    """Serialized departments ordered by name."""
+    query = Department.query
+    if active_only:
+        query = query.filter(Department.is_active == True)
+    return [d.to_dict() for d in query.order_by(Department.name).all()]
+
+
+@cached("unit_options", depends_on=("units", "departments"))
+def get_unit_options() -> list[dict]:
+    """Active units with their department, as listed before a search term is typed."""
+    units = (
+        Unit.query.filter(Unit.is_active == True)
+        .order_by(Unit.unit_number)
+        .limit(UNIT_OPTIONS_LIMIT)
+        .all()
+    )
+    return [u.to_dict(include_department=True) for u in units]
+
+
+def _columns(obj) -> dict | None:
+    if obj is None:
+        return None
+    return {attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs}
+
+
+@cached("user", depends_on=("users", "approvers", "technicians"))
+def get_user_columns(user_id: str) -> dict | None:
+    """Column values of a user and of its approver and technician rows, or None."""
+    user = User.query.get(user_id)
+    if not user:
+        return None
+    return {
+        "user": _columns(user),
+        "approver": _columns(user.approver),
+        "technician": _columns(user.technician),
+    }
+
+
+def _attach(model, columns: dict | None):
+    """Add a row to the session as a persistent object, without querying it."""
+    if columns is None:
+        return None
+    obj = model(**columns)
+    make_transient_to_detached(obj)
+    return db.session.merge(obj, load=False)
+
+
+def load_user(user_id: str) -> User | None:
+    """
+    Return the user for a request, built from the cache.
+
+    The User is attached to the session like a queried one, so it can be
+    updated and its lazy relationships load as usual. Its approver and
+    technician, which User loads eagerly, come from the cache too.
+    """
+    row = get_user_columns(user_id)
+    if row is None:
+        return None
+    user = _attach(User, row["user"])
+    set_committed_value(user, "approver", _attach(Approver, row["approver"]))
+    set_committed_value(user, "technician", _attach(Technician, row["technician"]))
+    return user
@@ -0,0 +1,177 @@
+"""
+Per-request timing breakdown: Server-Timing header and one log line per request.
+
+Every API request records:
+
+    db         time in cursor execute (SQL on the server plus the network round
+               trip and, for psycopg2, fetching the rows), and the query count
+    pool       time waiting for a pooled connection (PostgreSQL direct profile)
+    serialize  building response payloads with ``to_dict``: lists
+               (lib/serializers.py), write responses (lib/write_response.py)
+               and order, repair and PO group details
+    json       encoding the payload (lib/json_provider.py)
+    compress   gzip/brotli of the body (lib/compression.py)
+    app        everything else: routing, auth, ORM hydration, controller code
+    total      from the first before_request hook to the last after_request hook
+
+Phases are exclusive. Queries and connection waits inside a phase (a lazy
+load in ``to_dict``) count as db and pool, not as that phase, so the parts add
+up to total.
+
+The numbers go out as a ``Server-Timing`` header, which browser devtools show
+in the request's Timing tab:
+
+    Server-Timing: db;dur=41.2;desc="7 queries", serialize;dur=88.0, json;dur=12.5, ...
+
+and as a logfmt line from this module's logger:
+
+    request method=GET path=/api/order/all status=200 queries=7 db_ms=41.2 ... total_ms=160.3
+
+Requests slower than REQUEST_TIMING_SLOW_MS are logged as warnings. The cost
+per request is a few perf_counter calls and one context variable lookup per
+query. REQUEST_TIMING_ENABLED=false turns everything off.
+
+Query counts and database timings tell an outsider a lot about the backend, so
+by default only admins get the header (REQUEST_TIMING_HEADER=admin). Set it to
+all for local development, or to none to keep only the log line.
+
+Register before other after_request hooks (``init_request_timing`` before
+``init_compression``) so that total includes them.
+"""
+
+import logging
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("REQUEST_TIMING_ENABLED", "true").lower() != "false"
+# Who gets the Server-Timing header: admin, all or none
+HEADER_AUDIENCE = os.environ.get("REQUEST_TIMING_HEADER", "admin").lower()
+SLOW_MS = float(os.environ.get("REQUEST_TIMING_SLOW_MS", "1000"))
+PATH_PREFIX = "/api/"
+PHASES = ("pool", "serialize", "json", "compress")
+
+_current = ContextVar("request_timing", default=None)
+
+
+class RequestTiming:
+    """Timings collected for one request."""
+
+    __slots__ = ("started", "queries", "db", "query_started", "phases")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.query_started = None
+        self.phases = dict.fromkeys(PHASES, 0.0)
+
+    def metrics(self) -> list[tuple[str, float]]:
+        """(name, milliseconds) for each part, app and total last."""
+        total = time.perf_counter() - self.started
+        parts = [("db", self.db)] + [(name, self.phases[name]) for name in PHASES]
+        app = total - sum(seconds for _, seconds in parts)
+        return [(name, seconds * 1000) for name, seconds in parts + [("app", app), ("total", total)]]
+
+
+def current():
+    """The current request's timing, or None outside an API request."""
+    return _current.get()
+
+
+def record(name: str, seconds: float):
+    """Add time to a phase of the current request, if there is one."""
+    timing = _current.get()
+    if timing is not None:
+        timing.phases[name] += seconds
+
+
+@contextmanager
+def phase(name: str):
+    """Time a block as one phase of the current request, excluding its queries and pool waits."""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    start = time.perf_counter()
+    waited_before = timing.db + timing.phases["pool"]
+    try:
+        yield
+    finally:
+        waited = timing.db + timing.phases["pool"] - waited_before
+        timing.phases[name] += time.perf_counter() - start - waited
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timing = _current.get()
+    if timing is not None:
+        timing.query_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timing = _current.get()
+    if timing is not None and timing.query_started is not None:
+        timing.db += time.perf_counter() - timing.query_started
+        timing.queries += 1
+        timing.query_started = None
+
+
+def server_timing_header(metrics, queries: int) -> str:
+    entries = []
+    for name, ms in metrics:
+        if name == "db":
+            entries.append(f'db;dur={ms:.1f};desc="{queries} {"query" if queries == 1 else "queries"}"')
+        elif ms or name in ("app", "total"):
+            entries.append(f"{name};dur={ms:.1f}")
+    return ", ".join(entries)
+
+
+def _shows_header() -> bool:
+    if HEADER_AUDIENCE in ("all", "true"):
+        return True
+    if HEADER_AUDIENCE == "admin":
+        # Set by lib/authenticate.py for signed-in requests
+        return g.get("user_is_admin", False)
+    return False
+
+
+def init_request_timing(app):
+    """Register the hooks that start, report and clear each request's timing."""
+    if not ENABLED:
+        return
+
+    @app.before_request
+    def _start_timing():
+        if request.path.startswith(PATH_PREFIX):
+            _current.set(RequestTiming())
+
+    @app.after_request
+    def _report_timing(response):
+        timing = _current.get()
+        if timing is None:
+            return response
+        metrics = timing.metrics()
+        if _shows_header():
+            response.headers["Server-Timing"] = server_timing_header(metrics, timing.queries)
+
+        fields = " ".join(f"{name}_ms={ms:.1f}" for name, ms in metrics)
+        total_ms = metrics[-1][1]
+        logger.log(
+            logging.WARNING if total_ms >= SLOW_MS else logging.INFO,
+            f"request method={request.method} path={request.path} status={response.status_code} "
+            f"queries={timing.queries} {fields}",
+        )
+        return response
+
+    @app.teardown_request
+    def _clear_timing(exc):
+        _current.set(None)
@@ -0,0 +1,116 @@
+"""
+List serializers for orders and repairs.
+
+By default each row embeds its related vendor, unit, PO group and users. With
+``?format=normalized`` the rows keep only foreign ids and every referenced
+entity is serialized once into a side table, so payload size and CPU scale with
+the number of distinct entities instead of the number of rows:
+
+    {
+        "data": [{"id": ..., "vendor_id": ..., "ordered_by_id": ..., "items": [...]}],
+        "entities": {"vendors": {id: {...}}, "users": {id: {...}}, ...}
+    }
+"""
+
+from flask import request, jsonify
+
+from lib.request_timing import phase
+
+NORMALIZED_FORMAT = "normalized"
+
+
+def wants_normalized():
+    """Return True if the client asked for the normalized response format."""
+    return request.args.get("format") == NORMALIZED_FORMAT
+
+
+def _collect(table, entity):
+    """Serialize an entity into its side table the first time it is seen."""
+    if entity is not None and entity.id not in table:
+        table[entity.id] = entity.to_dict()
+
+
+def normalize_orders(orders):
+    """Build the normalized payload for a list of orders."""
+    entities = {"vendors": {}, "units": {}, "po_groups": {}, "users": {}}
+    rows = []
+    for order in orders:
+        row = order.to_dict()
+        row["items"] = [item.to_dict() for item in order.items]
+        rows.append(row)
+
+        _collect(entities["vendors"], order.vendor)
+        _collect(entities["units"], order.unit)
+        _collect(entities["po_groups"], order.po_group)
+        _collect(entities["users"], order.ordered_by)
+        _collect(entities["users"], order.approved_by)
+        _collect(entities["users"], order.rejected_by)
+
+    return {"data": rows, "entities": entities}
+
+
+def normalize_repairs(repairs):
+    """Build the normalized payload for a list of repairs."""
+    entities = {"units": {}, "users": {}}
+    rows = []
+    for repair in repairs:
+        row = repair.to_dict()
+        row["items"] = [item.to_dict() for item in repair.items]
+        rows.append(row)
+
+        _collect(entities["units"], repair.unit)
+        _collect(entities["users"], repair.requested_by)
+        _collect(entities["users"], repair.approved_by)
+        _collect(entities["users"], repair.rejected_by)
+        _collect(entities["users"], repair.completed_by)
+
+    return {"data": rows, "entities": entities}
+
+
+def _respond(payload, sync, deleted):
+    """Wrap a list payload in the delta sync envelope when the client asked for one."""
+    if sync and sync["requested"]:
+        if isinstance(payload, list):
+            payload = {"data": payload}
+        payload["deleted"] = deleted or []
+        payload["cursor"] = sync["cursor"]
+        payload["full"] = sync["full"]
+
+    response = jsonify(payload)
+    if sync:
+        response.headers["X-Sync-Cursor"] = sync["cursor"]
+    return response
+
+
+def serialize_orders(orders, sync=None, deleted=None):
+    """
+    Return the JSON response for an order list in the requested format.
+
+    Args:
+        orders: Orders to serialize
+        sync: Delta sync parameters from get_sync_params, if the endpoint supports it
+        deleted: IDs of orders deleted or no longer visible since the client's cursor
+    """
+    with phase("serialize"):
+        if wants_normalized():
+            payload = normalize_orders(orders)
+        else:
+            payload = [order.to_dict(include_relations=True) for order in orders]
+    return _respond(payload, sync, deleted)
+
+
+def serialize_repairs(repairs, sync=None, deleted=None):
+    """
+    Return the JSON response for a repair list in the requested format.
+
+    Args:
+        repairs: Repairs to serialize
+        sync: Delta sync parameters from get_sync_params, if the endpoint supports it
+        deleted: IDs of repairs deleted or no longer visible since the client's cursor
+    """
+    with phase("serialize"):
+        if wants_normalized():
+            payload = normalize_repairs(repairs)
+        else:
+            payload = [repair.to_dict(include_relations=True) for repair in repairs]
+    return _respond(payload, sync, deleted)
@@ -0,0 +1,151 @@
+"""
+Request coalescing (single-flight) for expensive list GETs.
+
+When many clients load the same list at the same moment (admins and approvers
+opening /order/all at the start of the day), each request would run the same
+queries and serialization. With ``@single_flight`` the first request for a key
+computes the response, and identical requests that arrive while it is running
+wait for it and get a copy. Nothing is kept once the computation finishes, so
+this is not a cache: a request never receives a response that was computed
+before it arrived and completed.
+
+The key is the path, the sorted query string and the caller's visibility scope
+(``visibility_scope``). Users who see the same rows share a computation. A
+request only joins a computation if no cached table was written since it
+started: writes bump ``lib.cache.cache.generation`` in this worker after
+commit and in other workers through NOTIFY. A client whose reads are pinned to
+the primary after its own write never joins another request's computation.
+If the first request fails, or takes longer than SINGLE_FLIGHT_WAIT_SECONDS,
+waiting requests compute their own response.
+
+Coalescing is in-process only: identical requests share a computation only
+when they reach the same worker. Workers never share responses.
+
+Apply below ``@authenticate``:
+
+    @order_bp.route("/all", methods=["GET"])
+    @authenticate
+    @single_flight
+    def get_all_orders_route(current_user):
+"""
+
+import logging
+import os
+import threading
+from functools import wraps
+
+from flask import current_app, make_response, request
+
+from lib.cache import cache
+from lib.db_routing import is_pinned
+from lib.reference_data import get_approver_routing
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("SINGLE_FLIGHT_ENABLED", "true").lower() != "false"
+WAIT_SECONDS = float(os.environ.get("SINGLE_FLIGHT_WAIT_SECONDS", "30"))
+
+
+class _Flight:
+    """One in-progress computation and the requests waiting for it."""
+
+    __slots__ = ("generation", "done", "result", "failed")
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+class SingleFlight:
+    """Share one call's result with concurrent callers using the same key."""
+
+    def __init__(self):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.computed = 0
+        self.shared = 0
+
+    def do(self, key, generation, compute):
+        """
+        Return compute()'s result, or the result of an identical call already running.
+
+        Args:
+            key: Hashable identity of the call
+            generation: Only calls started at the same generation are shared
+            compute: Produces the result; called at most once per caller
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None or flight.generation != generation
+            if leader:
+                flight = _Flight(generation)
+                self._flights[key] = flight
+
+        if not leader:
+            if flight.done.wait(WAIT_SECONDS) and not flight.failed:
+                with self._lock:
+                    self.shared += 1
+                return flight.result
+            # The first call failed or is stuck; do the work ourselves
+            return compute()
+
+        try:
+            flight.result = compute()
+        except BaseException:
+            flight.failed = True
+            raise
+        finally:
+            with self._lock:
+                self.computed += 1
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"in_flight": len(self._flights), "computed": self.computed, "shared": self.shared}
+
+
+flights = SingleFlight()
+
+
+def visibility_scope(user) -> tuple:
+    """Which rows a user can see in the order and repair lists; equal scopes see the same rows."""
+    if user.is_admin:
+        return ("admin",)
+    routing = get_approver_routing(user.id) if user.is_approver else None
+    if routing:
+        return ("approver", "all" if routing["is_global"] else tuple(sorted(routing["department_ids"])))
+    return ("user", user.id)
+
+
+def _snapshot(rv):
+    """Freeze a view's return value so each waiting request can build its own Response."""
+    response = make_response(rv)
+    return response.get_data(), response.status_code, list(response.headers.items())
+
+
+def single_flight(f):
+    """Coalesce concurrent identical requests to this view into one computation."""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not ENABLED or is_pinned():
+            return f(*args, **kwargs)
+
+        key = (
+            request.path,
+            tuple(sorted(request.args.items(multi=True))),
+            visibility_scope(kwargs["current_user"]),
+        )
+
+        def compute():
+            return _snapshot(f(*args, **kwargs))
+
+        body, status, headers = flights.do(key, cache.generation, compute)
+        return current_app.response_class(body, status=status, headers=headers)
+
+    return decorated_function
@@ -5,14 +5,61 @@ SMS service for sending text messages via ClickSend API.
 import os
 import base64
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from urllib3.util.retry import Retry
+
+from lib.circuit_breaker import CircuitBreaker, CircuitOpenError
+from lib.outbox import enqueue_notifications
 
 logger = logging.getLogger(__name__)
 
 # ClickSend API configuration
 CLICKSEND_API_URL = "https://rest.clicksend.com/v3/sms/send"
+CLICKSEND_RECEIPTS_URL = "https://rest.clicksend.com/v3/sms/receipts"
+RECEIPTS_PAGE_SIZE = 100
 SMS_COMPANY_SUFFIX = " -Sent by Spyco Oilfield Service"
 
+# HTTP client tuning (overridable through the environment)
+CONNECT_TIMEOUT_SECONDS = float(os.environ.get("CLICKSEND_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT_SECONDS = float(os.environ.get("CLICKSEND_READ_TIMEOUT", "15"))
+POOL_CONNECTIONS = int(os.environ.get("CLICKSEND_POOL_CONNECTIONS", "2"))
+POOL_MAXSIZE = int(os.environ.get("CLICKSEND_POOL_MAXSIZE", "10"))
+MAX_RETRIES = int(os.environ.get("CLICKSEND_MAX_RETRIES", "2"))
+
+# Bulk dispatch: ClickSend accepts up to 1000 messages per request
+MAX_MESSAGES_PER_REQUEST = int(os.environ.get("CLICKSEND_MAX_MESSAGES_PER_REQUEST", "1000"))
+SEND_CONCURRENCY = int(os.environ.get("CLICKSEND_SEND_CONCURRENCY", "4"))
+
+# Circuit breaker: stop calling ClickSend while it is failing or slow
+BREAKER_WINDOW_SECONDS = float(os.environ.get("CLICKSEND_BREAKER_WINDOW", "60"))
+BREAKER_MIN_CALLS = int(os.environ.get("CLICKSEND_BREAKER_MIN_CALLS", "5"))
+BREAKER_FAILURE_RATE = float(os.environ.get("CLICKSEND_BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_SLOW_CALL_SECONDS = float(os.environ.get("CLICKSEND_BREAKER_SLOW_CALL", "5"))
+BREAKER_OPEN_SECONDS = float(os.environ.get("CLICKSEND_BREAKER_OPEN_SECONDS", "30"))
+MIN_READ_TIMEOUT_SECONDS = float(os.environ.get("CLICKSEND_MIN_READ_TIMEOUT", "2"))
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+_breaker = CircuitBreaker(
+    "clicksend",
+    window_seconds=BREAKER_WINDOW_SECONDS,
+    min_calls=BREAKER_MIN_CALLS,
+    failure_rate=BREAKER_FAILURE_RATE,
+    slow_call_seconds=BREAKER_SLOW_CALL_SECONDS,
+    open_seconds=BREAKER_OPEN_SECONDS,
+    min_timeout=MIN_READ_TIMEOUT_SECONDS,
+    max_timeout=READ_TIMEOUT_SECONDS,
+)
+
 
 def _get_config():
     """Get configuration from environment (called at runtime, not import time)."""
@@ -20,9 +67,17 @@ def _get_config():
         "username": os.environ.get("CLICKSEND_USERNAME"),
         "api_key": os.environ.get("CLICKSEND_API_KEY"),
         "client_url": os.environ.get("CLIENT_URL", "http://localhost:5173"),
+        "api_url": os.environ.get("CLICKSEND_API_URL", CLICKSEND_API_URL),
+        "receipts_url": os.environ.get("CLICKSEND_RECEIPTS_URL", CLICKSEND_RECEIPTS_URL),
     }
 
 
+@lru_cache(maxsize=4)
+def _encode_credentials(username: str, api_key: str) -> str:
+    """Base64-encode Basic Auth credentials (cached per credential pair)."""
+    return base64.b64encode(f"{username}:{api_key}".encode()).decode()
+
+
 def _get_auth_header() -> dict:
     """
     Generate the Basic Auth header for ClickSend API.
@@ -35,11 +90,123 @@ def _get_auth_header() -> dict:
         logger.error("ClickSend credentials not configured")
         return {}
     
-    credentials = f"{config['username']}:{config['api_key']}"
-    encoded = base64.b64encode(credentials.encode()).decode()
+    encoded = _encode_credentials(config["username"], config["api_key"])
     return {"Authorization": f"Basic {encoded}"}
 
 
+def _build_retry() -> Retry:
+    """
+    Retry policy for provider calls.
+    
+    Only failures where the message cannot have been accepted are retried:
+    connection errors and explicit throttling (429, honouring Retry-After).
+    Read timeouts and 5xx responses to a POST may already have sent the SMS,
+    so they are left to the outbox retry schedule instead. This is the only
+    place provider calls are retried immediately.
+    """
+    return Retry(
+        total=MAX_RETRIES,
+        connect=MAX_RETRIES,
+        read=0,
+        status=MAX_RETRIES,
+        other=0,
+        backoff_factor=0.5,
+        status_forcelist=(429,),
+        allowed_methods=frozenset({"POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def _get_session() -> requests.Session:
+    """
+    Return the long-lived HTTP session for this process.
+    
+    The session keeps TCP/TLS connections to ClickSend alive between messages.
+    It is recreated after a fork so workers never share sockets.
+    """
+    global _session, _session_pid
+    
+    pid = os.getpid()
+    if _session is not None and _session_pid == pid:
+        return _session
+    
+    with _session_lock:
+        if _session is None or _session_pid != pid:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=POOL_CONNECTIONS,
+                pool_maxsize=POOL_MAXSIZE,
+                max_retries=_build_retry(),
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["Content-Type"] = "application/json"
+            _session = session
+            _session_pid = pid
+    return _session
+
+
+def get_breaker() -> CircuitBreaker:
+    """Return the circuit breaker guarding ClickSend calls in this process."""
+    return _breaker
+
+
+def _operation(method: str, messages: list | None) -> str:
+    """
+    Latency class of a provider call, for the adaptive read timeout.
+    
+    Sends are bucketed by message count (1, up to 10, 100 or 1000), so a
+    timeout learned from single messages is never applied to a full chunk.
+    """
+    if messages is None:
+        return f"{method.lower()}_receipts"
+    bucket = 1
+    while bucket < len(messages):
+        bucket *= 10
+    return "send" if bucket == 1 else f"bulk_{bucket}"
+
+
+def _provider_request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Make a ClickSend API call through the circuit breaker.
+    
+    The read timeout adapts to the recent p99 latency of the same kind of call
+    (see _operation), never below CLICKSEND_MIN_READ_TIMEOUT. Connection
+    errors, timeouts, 5xx and 429 responses count as failures; other 4xx
+    responses are our own fault and do not.
+    
+    Raises:
+        CircuitOpenError: The breaker is open and the call was not made
+    """
+    operation = _operation(method, (kwargs.get("json") or {}).get("messages"))
+    _breaker.before_call()
+    start = time.perf_counter()
+    failed = True
+    try:
+        response = _get_session().request(
+            method,
+            url,
+            headers=_get_auth_header(),
+            timeout=(CONNECT_TIMEOUT_SECONDS, _breaker.read_timeout(operation)),
+            **kwargs,
+        )
+        failed = response.status_code >= 500 or response.status_code == 429
+        return response
+    finally:
+        latency = time.perf_counter() - start
+        if failed:
+            _breaker.record_failure(latency, operation)
+        else:
+            _breaker.record_success(latency, operation)
+
+
+def _post_messages(messages: list[dict]) -> requests.Response:
+    """POST a list of ClickSend message objects through the pooled session."""
+    config = _get_config()
+    return _provider_request("POST", config["api_url"], json={"messages": messages})
+
+
 def send_sms(to: str, message: str) -> bool:
     """
     Send a single SMS message.
@@ -58,28 +225,14 @@ def send_sms(to: str, message: str) -> bool:
         return False
     
     try:
-        headers = {
-            **_get_auth_header(),
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "messages": [
-                {
-                    "to": to,
-                    "body": message + SMS_COMPANY_SUFFIX,
-                    "source": "spyco-po",
-                    "country": "US"
-                }
-            ]
-        }
-        
-        response = requests.post(
-            CLICKSEND_API_URL,
-            json=payload,
-            headers=headers,
-            timeout=30
-        )
+        response = _post_messages([
+            {
+                "to": to,
+                "body": message + SMS_COMPANY_SUFFIX,
+                "source": "spyco-po",
+                "country": "US"
+            }
+        ])
         
         if response.status_code == 200:
             data = response.json()
@@ -100,6 +253,9 @@ def send_sms(to: str, message: str) -> bool:
             logger.error(f"HTTP {response.status_code} - {response.text}")
             return False
             
+    except CircuitOpenError as e:
+        logger.warning(f"SMS not sent - {str(e)}")
+        return False
     except requests.exceptions.Timeout:
         logger.error("Request timed out")
         return False
@@ -111,16 +267,139 @@ def send_sms(to: str, message: str) -> bool:
         return False
 
 
+def _never_sent(error: requests.exceptions.RequestException) -> bool:
+    """True if the request failed while connecting, before any of it reached the provider."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _send_chunk(messages: list[dict]) -> list[dict]:
+    """
+    Send one provider request and return a result per message, in order.
+    
+    Failures where the provider cannot have accepted the messages (connect-phase
+    errors and 429, after the session's own retries) are marked 'retryable'.
+    Everything else, including 5xx responses and connections dropped after the
+    body was sent, may already have delivered the SMS and is not. Nothing is
+    re-sent here; the outbox schedules the next attempt. Messages refused by
+    the open circuit breaker are marked 'deferred' with the breaker's
+    'retry_after'.
+    """
+    start = time.perf_counter()
+    
+    def elapsed_ms():
+        return int((time.perf_counter() - start) * 1000)
+    
+    def fail_all(error, retryable=False, retry_after=None):
+        return [
+            _message_result(
+                message, success=False, error=error, retryable=retryable,
+                latency_ms=elapsed_ms(), retry_after=retry_after,
+            )
+            for message in messages
+        ]
+    
+    try:
+        response = _post_messages(messages)
+        latency_ms = elapsed_ms()
+        
+        if response.status_code == 200:
+            data = response.json()
+            if data.get("response_code") != "SUCCESS":
+                return fail_all(data.get("response_code") or "Provider rejected request")
+            
+            sms_messages = data.get("data", {}).get("messages", [])
+            if not sms_messages:
+                # No per-message detail; trust the queued count for the whole chunk
+                queued = data.get("data", {}).get("queued_count", 0)
+                return [
+                    _message_result(
+                        message,
+                        success=index < queued,
+                        error=None if index < queued else "Not queued",
+                        latency_ms=latency_ms,
+                    )
+                    for index, message in enumerate(messages)
+                ]
+            
+            results = []
+            for index, message in enumerate(messages):
+                msg = sms_messages[index] if index < len(sms_messages) else {}
+                status = msg.get("status")
+                success = status == "SUCCESS"
+                results.append(_message_result(
+                    message,
+                    success=success,
+                    status=status,
+                    message_id=msg.get("message_id"),
+                    error=None if success else (status or "No status from provider"),
+                    latency_ms=latency_ms,
+                ))
+            return results
+        
+        logger.error(f"Bulk HTTP {response.status_code} - {response.text}")
+        return fail_all(
+            f"HTTP {response.status_code}",
+            retryable=response.status_code == 429,
+        )
+            
+    except CircuitOpenError as e:
+        return fail_all(str(e), retry_after=e.retry_after)
+    except requests.exceptions.Timeout as e:
+        logger.error("Bulk request timed out")
+        # A connect timeout never reached the provider; a read timeout might have
+        return fail_all("Request timed out", retryable=_never_sent(e))
+    except requests.exceptions.ConnectionError as e:
+        logger.error(f"Bulk connection failed - {str(e)}")
+        return fail_all(f"Connection failed - {str(e)}", retryable=_never_sent(e))
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Bulk request failed - {str(e)}")
+        return fail_all(f"Request failed - {str(e)}")
+    except Exception as e:
+        logger.error(f"Bulk unexpected error - {str(e)}")
+        return fail_all(f"Unexpected error - {str(e)}")
+
+
+def _send_chunks(messages: list[dict]) -> list[dict]:
+    """
+    Split messages into provider-sized chunks and send them concurrently.
+    
+    Returns:
+        One result per message, in the same order as messages
+    """
+    chunks = [
+        messages[i:i + MAX_MESSAGES_PER_REQUEST]
+        for i in range(0, len(messages), MAX_MESSAGES_PER_REQUEST)
+    ]
+    if len(chunks) == 1:
+        return _send_chunk(chunks[0])
+    
+    with ThreadPoolExecutor(max_workers=min(SEND_CONCURRENCY, len(chunks))) as executor:
+        chunk_results = list(executor.map(_send_chunk, chunks))
+    return [result for results in chunk_results for result in results]
+
+
 def send_bulk_sms(recipients: list[dict]) -> dict:
     """
     Send SMS messages to multiple recipients.
     
+    Recipients are sent in provider-sized chunks with bounded parallelism, so
+    a large fan-out takes roughly one provider round trip. Each chunk is sent
+    once; failed recipients are retried by the caller (the outbox), never here.
+    
     Args:
-        recipients: List of dicts with 'to' and 'message' keys
+        recipients: List of dicts with 'to' and 'message' keys, and an optional
+                   'reference' that is echoed back in the per-recipient results
                    Example: [{'to': '5551234567', 'message': 'Hello'}]
         
     Returns:
-        Dict with 'success_count', 'failure_count', and 'results' list
+        Dict with 'success_count', 'failure_count', and 'results' list. Each
+        result has 'to', 'reference', 'success', 'status', 'message_id',
+        'error', 'retryable', 'latency_ms', 'deferred' and 'retry_after'.
+        Deferred recipients were not sent because the circuit breaker is open.
+        Retryable recipients provably never reached the provider.
     """
     config = _get_config()
     
@@ -133,65 +412,87 @@ def send_bulk_sms(recipients: list[dict]) -> dict:
     if not recipients:
         return results
     
+    messages = []
+    for recipient in recipients:
+        if recipient.get("to") and recipient.get("message"):
+            message = {
+                "to": recipient["to"],
+                "body": recipient["message"] + SMS_COMPANY_SUFFIX,
+                "source": "spyco-po",
+                "country": "US"
+            }
+            if recipient.get("reference"):
+                message["custom_string"] = recipient["reference"]
+            messages.append(message)
+    
+    if not messages:
+        return results
+    
     if not config["username"] or not config["api_key"]:
         logger.error("ClickSend credentials not configured")
-        results["failure_count"] = len(recipients)
+        results["failure_count"] = len(messages)
+        results["results"] = [
+            _message_result(message, success=False, error="ClickSend credentials not configured")
+            for message in messages
+        ]
         return results
     
-    try:
-        headers = {
-            **_get_auth_header(),
-            "Content-Type": "application/json"
-        }
-        
-        messages = []
-        for recipient in recipients:
-            if recipient.get("to") and recipient.get("message"):
-                messages.append({
-                    "to": recipient["to"],
-                    "body": recipient["message"] + SMS_COMPANY_SUFFIX,
-                    "source": "spyco-po",
-                    "country": "US"
-                })
-        
-        if not messages:
-            return results
-        
-        payload = {"messages": messages}
-        
-        response = requests.post(
-            CLICKSEND_API_URL,
-            json=payload,
-            headers=headers,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get("response_code") == "SUCCESS":
-                queued = data.get("data", {}).get("queued_count", 0)
-                results["success_count"] = queued
-                results["failure_count"] = len(messages) - queued
-            else:
-                results["failure_count"] = len(messages)
-        else:
-            results["failure_count"] = len(messages)
-            logger.error(f"Bulk HTTP {response.status_code} - {response.text}")
-            
-    except requests.exceptions.Timeout:
-        results["failure_count"] = len(recipients)
-        logger.error("Bulk request timed out")
-    except requests.exceptions.RequestException as e:
-        results["failure_count"] = len(recipients)
-        logger.error(f"Bulk request failed - {str(e)}")
-    except Exception as e:
-        results["failure_count"] = len(recipients)
-        logger.error(f"Bulk unexpected error - {str(e)}")
-    
+    final = _send_chunks(messages)
+    results["results"] = final
+    results["success_count"] = sum(1 for r in final if r["success"])
+    results["failure_count"] = len(final) - results["success_count"]
     return results
 
 
+def _message_result(message: dict, success: bool, status=None, message_id=None, error=None,
+                    retryable=False, latency_ms=None, retry_after=None) -> dict:
+    """Build a per-recipient result entry for send_bulk_sms."""
+    return {
+        "to": message["to"],
+        "reference": message.get("custom_string"),
+        "success": success,
+        "status": status,
+        "message_id": message_id,
+        "error": error,
+        "retryable": retryable,
+        "latency_ms": latency_ms,
+        "deferred": retry_after is not None,
+        "retry_after": retry_after,
+    }
+
+
+def fetch_delivery_receipts(page: int = 1, limit: int = RECEIPTS_PAGE_SIZE) -> dict:
+    """
+    Fetch one page of unread SMS delivery receipts from ClickSend.
+    
+    Returns:
+        Dict with 'receipts' (list of receipt dicts with 'message_id',
+        'status_code', 'status_text' and 'timestamp') and 'last_page'
+    """
+    config = _get_config()
+    response = _provider_request(
+        "GET", config["receipts_url"], params={"page": page, "limit": limit}
+    )
+    response.raise_for_status()
+    data = response.json().get("data") or {}
+    return {
+        "receipts": data.get("data", []),
+        "last_page": data.get("last_page", page),
+    }
+
+
+def mark_receipts_read(date_before: int):
+    """Mark delivery receipts up to a unix timestamp as read, so they are not fetched again."""
+    config = _get_config()
+    response = _provider_request(
+        "PUT", f"{config['receipts_url']}-read", json={"date_before": date_before}
+    )
+    response.raise_for_status()
+
+
 # ============== Notification Helper Functions ==============
+# These queue messages in the notification outbox as part of the caller's
+# transaction; dispatcher.py delivers them. Call them before db.session.commit().
 
 def notify_order_pending(order, approvers: list, submitter_name: str):
     """
@@ -218,7 +519,7 @@ def notify_order_pending(order, approvers: list, submitter_name: str):
             })
     
     if recipients:
-        send_bulk_sms(recipients)
+        enqueue_notifications("order_pending", order.id, recipients)
 
 
 def notify_repair_pending(repair, approvers: list, submitter_name: str):
@@ -245,7 +546,7 @@ def notify_repair_pending(repair, approvers: list, submitter_name: str):
             })
     
     if recipients:
-        send_bulk_sms(recipients)
+        enqueue_notifications("repair_pending", repair.id, recipients)
 
 
 def notify_order_approved(order, admins: list):
@@ -271,7 +572,7 @@ def notify_order_approved(order, admins: list):
             })
     
     if recipients:
-        send_bulk_sms(recipients)
+        enqueue_notifications("order_approved", order.id, recipients)
 
 
 def notify_repair_approved(repair, technicians: list):
@@ -297,7 +598,7 @@ def notify_repair_approved(repair, technicians: list):
             })
     
     if recipients:
-        send_bulk_sms(recipients)
+        enqueue_notifications("repair_approved", repair.id, recipients)
 
 
 def notify_order_paid(order, user):
@@ -322,7 +623,7 @@ def notify_order_paid(order, user):
         f"{config['client_url']}/order/{order.id}"
     )
     
-    send_sms(user.phone, message)
+    enqueue_notifications("order_paid", order.id, [{"to": user.phone, "message": message}])
 
 
 def notify_repair_completed(repair, user):
@@ -343,4 +644,4 @@ def notify_repair_completed(repair, user):
         f"{config['client_url']}/repair/{repair.id}"
     )
     
-    send_sms(user.phone, message)
+    enqueue_notifications("repair_completed", repair.id, [{"to": user.phone, "message": message}])
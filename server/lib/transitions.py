@@ -0,0 +1,78 @@
+"""
+Guarded status transitions for orders and repairs.
+
+A transition is a single conditional statement:
+
+    UPDATE orders SET status = 'approved', ... WHERE id = :id AND status = 'pending' [AND <permission>]
+    RETURNING orders.*
+
+The status check and the write happen atomically in the database, so when two
+approvers click at the same moment exactly one UPDATE matches; the other sees
+its row already changed (PostgreSQL re-checks the WHERE clause after waiting
+for the winner's row lock) and gets a 409. There is no read-then-write window
+and no row is loaded before the write.
+
+Only a request whose UPDATE matched nothing runs a second, primary-key lookup
+to tell "not found" (404) from "wrong status" (409) and "not allowed" (403).
+"""
+
+from datetime import datetime, timezone
+
+from flask import jsonify
+from sqlalchemy import select, update
+
+from db import db
+
+
+def transition(model, entity_id: str, from_status: str, values: dict, conditions=(), options=()):
+    """
+    Move one row from from_status to values["status"] in a single UPDATE ... RETURNING.
+
+    Args:
+        model: Order or Repair
+        entity_id: Primary key of the row
+        from_status: Status the row must currently have
+        values: Columns to set; updated_at is added
+        conditions: Extra WHERE clauses, e.g. the caller's permission
+        options: Loader options for relationships the caller will use
+
+    Returns:
+        The updated entity, or None if no row matched. Does not commit.
+    """
+    now = datetime.now(timezone.utc)
+    stmt = (
+        update(model)
+        .where(model.id == entity_id, model.status == from_status, *conditions)
+        .values(**values, updated_at=now)
+        .returning(model)
+        .options(*options)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    return db.session.execute(stmt).scalars().first()
+
+
+def transition_failed(
+    model, entity_id: str, from_status: str, conflict_message: str,
+    columns=(), allowed=None, denied_message="Access denied",
+):
+    """
+    Error response for a transition that matched no row.
+
+    Args:
+        model: Order or Repair
+        entity_id: Primary key of the row
+        from_status: Status the transition required
+        conflict_message: Error when the row has moved on to another status
+        columns: Extra labelled columns that allowed() needs
+        allowed: Optional allowed(row) mirroring the permission condition
+        denied_message: Error when allowed(row) is false
+
+    Returns:
+        (response, status code): 404, 403 or 409
+    """
+    row = db.session.execute(select(model.status, *columns).where(model.id == entity_id)).first()
+    if row is None:
+        return jsonify({"error": f"{model.__name__} not found"}), 404
+    if row.status == from_status and allowed is not None and not allowed(row):
+        return jsonify({"error": denied_message}), 403
+    return jsonify({"error": conflict_message, "status": row.status}), 409
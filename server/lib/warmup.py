@@ -0,0 +1,131 @@
+"""
+Worker warm-up.
+
+A freshly forked worker would otherwise pay, on its first requests, for mapper
+configuration, opening database connections, filling the reference data cache
+and SQLAlchemy's statement compilation cache. ``warm_up`` does that work in
+``post_fork`` (see gunicorn.conf.py), before the worker accepts connections,
+so rollouts and scale-outs do not show up as p99 spikes.
+
+Each step is bounded by WARMUP_TIMEOUT_SECONDS in total and failures are
+logged, not raised: a cold worker is better than no worker. A worker whose
+warm-up had a failed or skipped step is "degraded" rather than "ready", and
+GET /api/health/ready answers 503 for it so the router keeps it out of rotation.
+"""
+
+import logging
+import os
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import configure_mappers
+
+from db import db
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("WARMUP_ENABLED", "true").lower() != "false"
+TIMEOUT_SECONDS = float(os.environ.get("WARMUP_TIMEOUT_SECONDS", "10"))
+# Connections opened up front, capped by the pool size
+CONNECTIONS = int(os.environ.get("WARMUP_CONNECTIONS", "2"))
+# Rows loaded by the representative list queries
+SAMPLE_ROWS = 50
+
+_status = {"state": "cold", "pid": None, "steps": {}, "errors": []}
+
+
+def configure_models():
+    """Configure every mapper. Pure CPU, so the gunicorn master does it once before forking."""
+    import models  # noqa: F401  (registers every model)
+
+    configure_mappers()
+
+
+def _open_connections():
+    pool = db.engine.pool
+    size = pool.size() if hasattr(pool, "size") else 1
+    connections = [db.engine.connect() for _ in range(max(1, min(CONNECTIONS, size)))]
+    for connection in connections:
+        connection.execute(text("SELECT 1"))
+    # Back to the pool, open and ready for the first requests
+    for connection in connections:
+        connection.close()
+
+
+def _start_listener(app):
+    from lib.events import start_listener, wait_until_listening
+
+    start_listener(app)
+    # The cache only stores values once invalidations can be received
+    wait_until_listening(timeout=min(5, TIMEOUT_SECONDS))
+
+
+def _preload_reference_data():
+    from lib.reference_data import get_approver_routing, get_departments, get_unit_options
+    from models.approver import Approver
+
+    get_departments(True)
+    get_departments(False)
+    get_unit_options()
+    for (user_id,) in db.session.query(Approver.user_id).filter(Approver.is_active == True):
+        get_approver_routing(user_id)
+
+
+def _representative_queries(app):
+    from lib.serializers import serialize_orders, serialize_repairs
+    from models import Order, Repair
+
+    # The list endpoints' queries and serializers, in both response formats
+    for query_string in ("", "format=normalized"):
+        with app.test_request_context(f"/api/order/all?{query_string}"):
+            serialize_orders(Order.query.order_by(Order.created_at.desc()).limit(SAMPLE_ROWS).all())
+        with app.test_request_context(f"/api/repair/all?{query_string}"):
+            serialize_repairs(Repair.query.order_by(Repair.created_at.desc()).limit(SAMPLE_ROWS).all())
+
+
+def warm_up(app) -> dict:
+    """Prime this worker. Returns the warm-up status."""
+    _status.update({"state": "warming", "pid": os.getpid(), "steps": {}, "errors": []})
+    if not ENABLED:
+        _status["state"] = "ready"
+        return _status
+
+    deadline = time.monotonic() + TIMEOUT_SECONDS
+    steps = [
+        ("mappers", configure_models),
+        ("connections", _open_connections),
+        ("listener", lambda: _start_listener(app)),
+        ("reference_data", _preload_reference_data),
+        ("queries", lambda: _representative_queries(app)),
+    ]
+    started = time.perf_counter()
+    with app.app_context():
+        for name, step in steps:
+            if time.monotonic() > deadline:
+                _status["errors"].append(f"{name}: skipped, warm-up timed out")
+                continue
+            step_started = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                logger.exception(f"Warm-up step {name} failed")
+                _status["errors"].append(f"{name}: {e}")
+                db.session.rollback()
+            _status["steps"][name] = round((time.perf_counter() - step_started) * 1000, 1)
+        db.session.remove()
+
+    _status["state"] = "degraded" if _status["errors"] else "ready"
+    total_ms = (time.perf_counter() - started) * 1000
+    _status["total_ms"] = round(total_ms, 1)
+    if _status["errors"]:
+        logger.warning(f"Worker {os.getpid()} warm-up degraded after {total_ms:.0f} ms: {_status['errors']}")
+    else:
+        logger.info(f"Worker {os.getpid()} warmed up in {total_ms:.0f} ms {_status['steps']}")
+    return _status
+
+
+def get_status() -> dict:
+    """Warm-up status of this worker ("cold" if it never ran, e.g. the dev server)."""
+    if _status["pid"] != os.getpid():
+        return {"state": "cold", "pid": os.getpid(), "steps": {}, "errors": []}
+    return dict(_status)
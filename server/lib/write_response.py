@@ -0,0 +1,87 @@
+"""
+Responses for write endpoints, built without reloading what was just written.
+
+A plain ``db.session.commit()`` expires every loaded object, so serializing
+the order afterwards re-SELECTs the order, its items and each related user,
+vendor, unit and PO group. Write handlers instead commit with
+``commit_keep_loaded`` and serialize the objects as they are in memory: the
+values the handler set, plus what the database returned (RETURNING rows and
+relationships loaded before the commit).
+
+Values set in Python differ in one way from their reloaded form: timestamps are
+timezone-aware, while the database returns naive UTC. ``write_response`` converts them,
+so a write response is identical to a later GET.
+
+Clients that only need a confirmation send ``Prefer: return=minimal``
+(RFC 7240) and get ``{"id", "status", "updated_at"}``, which skips loading
+and serializing relationships altogether.
+"""
+
+from datetime import datetime, timezone
+
+from flask import jsonify, request
+
+from db import db
+from lib.request_timing import phase
+
+MINIMAL_PREFERENCE = "return=minimal"
+
+
+def wants_minimal() -> bool:
+    """Return True if the client asked for a minimal write response."""
+    return MINIMAL_PREFERENCE in request.headers.get("Prefer", "")
+
+
+def commit_keep_loaded():
+    """Commit without expiring loaded objects. Use for a handler's final commit."""
+    session = db.session()
+    session.expire_on_commit = False
+    try:
+        session.commit()
+    finally:
+        session.expire_on_commit = True
+
+
+def as_stored(value):
+    """Convert timezone-aware datetimes to the naive UTC values the database returns."""
+    if isinstance(value, dict):
+        return {key: as_stored(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [as_stored(item) for item in value]
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def write_response(entity, body=None, status=200):
+    """
+    Respond to a write from the entity's in-memory state.
+
+    Args:
+        entity: The order or repair that was written
+        body: Callable returning the full response body; defaults to
+            entity.to_dict(include_relations=True). Not called for minimal responses.
+        status: HTTP status code
+    """
+    if wants_minimal():
+        with phase("serialize"):
+            payload = as_stored(_minimal(entity))
+        return jsonify(payload), status, {"Preference-Applied": MINIMAL_PREFERENCE}
+    with phase("serialize"):
+        payload = as_stored(body() if body else entity.to_dict(include_relations=True))
+    return jsonify(payload), status
+
+
+def write_many_response(entities, status=200):
+    """Like write_response, for a list of entities written together."""
+    if wants_minimal():
+        with phase("serialize"):
+            payload = as_stored([_minimal(entity) for entity in entities])
+        return jsonify(payload), status, {"Preference-Applied": MINIMAL_PREFERENCE}
+    with phase("serialize"):
+        payload = as_stored([entity.to_dict(include_relations=True) for entity in entities])
+    return jsonify(payload), status
+
+
+def _minimal(entity) -> dict:
+    return {"id": entity.id, "status": entity.status, "updated_at": entity.updated_at}
@@ -0,0 +1,329 @@
+"""Baseline schema
+
+Creates every table the models define. Databases created before migrations
+(by db.create_all() at startup) are adopted: tables that already exist are
+left alone, and only indexes they are missing are added. The indexes on the
+existing orders and repairs tables are built concurrently on PostgreSQL, so
+the release phase does not block writes while they build.
+
+Revision ID: f4dc27cab412
+Revises:
+Create Date: 2026-10-19 05:52:14.937475
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4dc27cab412'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def _create_index_if_missing(name, table, columns):
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+    if name not in existing:
+        op.create_index(name, table, columns, unique=False)
+
+
+def _invalid_postgres_index(name):
+    return op.get_bind().execute(sa.text(
+        "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {"name": name}).first() is not None
+
+
+def _create_index_concurrently_if_missing(name, table, columns):
+    """
+    Like _create_index_if_missing, for tables that may already be live and large.
+
+    On PostgreSQL the index is built with CREATE INDEX CONCURRENTLY, which does
+    not block writes but cannot run in a transaction: the migration's
+    transaction is committed first. A concurrent build that failed part way
+    leaves an invalid index behind, which is dropped and built again.
+    """
+    if op.get_bind().dialect.name != 'postgresql':
+        _create_index_if_missing(name, table, columns)
+        return
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+    with op.get_context().autocommit_block():
+        if name in existing:
+            if not _invalid_postgres_index(name):
+                return
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
+        op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+
+def upgrade():
+    if not _has_table('departments'):
+        op.create_table('departments',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('description', sa.String(length=255), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+        )
+    if not _has_table('notification_outbox'):
+        op.create_table('notification_outbox',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('event_type', sa.String(length=50), nullable=False),
+        sa.Column('entity_id', sa.String(length=36), nullable=True),
+        sa.Column('recipient', sa.String(length=20), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+    _create_index_if_missing('ix_notification_outbox_status_next_attempt', 'notification_outbox', ['status', 'next_attempt_at'])
+    if not _has_table('sync_tombstones'):
+        op.create_table('sync_tombstones',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('entity_type', sa.String(length=20), nullable=False),
+        sa.Column('entity_id', sa.String(length=36), nullable=False),
+        sa.Column('owner_id', sa.String(length=36), nullable=True),
+        sa.Column('department_id', sa.String(length=36), nullable=True),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+    _create_index_if_missing('ix_sync_tombstones_type_deleted_at', 'sync_tombstones', ['entity_type', 'deleted_at'])
+    if not _has_table('vendors'):
+        op.create_table('vendors',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('contact_info', sa.Text(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if not _has_table('notification_log'):
+        op.create_table('notification_log',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('outbox_id', sa.String(length=36), nullable=True),
+        sa.Column('event_type', sa.String(length=50), nullable=False),
+        sa.Column('recipient', sa.String(length=20), nullable=False),
+        sa.Column('provider_message_id', sa.String(length=64), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('provider_status', sa.String(length=50), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('latency_ms', sa.Integer(), nullable=True),
+        sa.Column('sent_at', sa.DateTime(), nullable=False),
+        sa.Column('delivered_at', sa.DateTime(), nullable=True),
+        sa.Column('resent_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['outbox_id'], ['notification_outbox.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    _create_index_if_missing('ix_notification_log_outbox_id', 'notification_log', ['outbox_id'])
+    _create_index_if_missing('ix_notification_log_provider_message_id', 'notification_log', ['provider_message_id'])
+    if not _has_table('users'):
+        op.create_table('users',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=False),
+        sa.Column('password_hash', sa.String(length=255), nullable=False),
+        sa.Column('first_name', sa.String(length=100), nullable=False),
+        sa.Column('last_name', sa.String(length=100), nullable=False),
+        sa.Column('phone', sa.String(length=20), nullable=True),
+        sa.Column('department_id', sa.String(length=36), nullable=True),
+        sa.Column('job_title', sa.String(length=100), nullable=True),
+        sa.Column('is_admin', sa.Boolean(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['department_id'], ['departments.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email')
+        )
+    if not _has_table('approvers'):
+        op.create_table('approvers',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('created_by_id', sa.String(length=36), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['created_by_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id')
+        )
+    if not _has_table('po_groups'):
+        op.create_table('po_groups',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('po_number', sa.String(length=100), nullable=False),
+        sa.Column('created_by_id', sa.String(length=36), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['created_by_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('po_number')
+        )
+    if not _has_table('technicians'):
+        op.create_table('technicians',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('user_id', sa.String(length=36), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('created_by_id', sa.String(length=36), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['created_by_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id')
+        )
+    if not _has_table('units'):
+        op.create_table('units',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('unit_number', sa.String(length=50), nullable=False),
+        sa.Column('description', sa.String(length=255), nullable=True),
+        sa.Column('unit_type', sa.String(length=20), nullable=False),
+        sa.Column('department_id', sa.String(length=36), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('created_by_id', sa.String(length=36), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['created_by_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['department_id'], ['departments.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('unit_number')
+        )
+    if not _has_table('approver_departments'):
+        op.create_table('approver_departments',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('approver_id', sa.String(length=36), nullable=False),
+        sa.Column('department_id', sa.String(length=36), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['approver_id'], ['approvers.id'], ),
+        sa.ForeignKeyConstraint(['department_id'], ['departments.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('approver_id', 'department_id', name='uq_approver_department')
+        )
+    if not _has_table('orders'):
+        op.create_table('orders',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('order_number', sa.String(length=50), nullable=False),
+        sa.Column('vendor_id', sa.String(length=36), nullable=False),
+        sa.Column('unit_id', sa.String(length=36), nullable=True),
+        sa.Column('po_group_id', sa.String(length=36), nullable=True),
+        sa.Column('description', sa.String(length=255), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('ordered_by_id', sa.String(length=36), nullable=False),
+        sa.Column('approved_by_id', sa.String(length=36), nullable=True),
+        sa.Column('approved_at', sa.DateTime(), nullable=True),
+        sa.Column('rejected_by_id', sa.String(length=36), nullable=True),
+        sa.Column('rejected_at', sa.DateTime(), nullable=True),
+        sa.Column('rejection_comment', sa.Text(), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['approved_by_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['ordered_by_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['po_group_id'], ['po_groups.id'], ),
+        sa.ForeignKeyConstraint(['rejected_by_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['unit_id'], ['units.id'], ),
+        sa.ForeignKeyConstraint(['vendor_id'], ['vendors.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('order_number')
+        )
+    _create_index_concurrently_if_missing('ix_orders_updated_at', 'orders', ['updated_at'])
+    if not _has_table('repairs'):
+        op.create_table('repairs',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('repair_number', sa.String(length=50), nullable=False),
+        sa.Column('unit_id', sa.String(length=36), nullable=False),
+        sa.Column('description', sa.String(length=255), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('requested_by_id', sa.String(length=36), nullable=False),
+        sa.Column('approved_by_id', sa.String(length=36), nullable=True),
+        sa.Column('approved_at', sa.DateTime(), nullable=True),
+        sa.Column('rejected_by_id', sa.String(length=36), nullable=True),
+        sa.Column('rejected_at', sa.DateTime(), nullable=True),
+        sa.Column('rejection_comment', sa.Text(), nullable=True),
+        sa.Column('completed_by_id', sa.String(length=36), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.Column('notes', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['approved_by_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['completed_by_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['rejected_by_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['requested_by_id'], ['users.id'], ),
+        sa.ForeignKeyConstraint(['unit_id'], ['units.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('repair_number')
+        )
+    _create_index_concurrently_if_missing('ix_repairs_updated_at', 'repairs', ['updated_at'])
+    if not _has_table('order_items'):
+        op.create_table('order_items',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('order_id', sa.String(length=36), nullable=False),
+        sa.Column('line_number', sa.Integer(), nullable=False),
+        sa.Column('description', sa.String(length=255), nullable=False),
+        sa.Column('quantity', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('unit_cost', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+    if not _has_table('repair_items'):
+        op.create_table('repair_items',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('repair_id', sa.String(length=36), nullable=False),
+        sa.Column('line_number', sa.Integer(), nullable=False),
+        sa.Column('description', sa.String(length=255), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['repair_id'], ['repairs.id'], ),
+        sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('repair_items')
+    op.drop_table('order_items')
+    with op.batch_alter_table('repairs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_repairs_updated_at'))
+
+    op.drop_table('repairs')
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_orders_updated_at'))
+
+    op.drop_table('orders')
+    op.drop_table('approver_departments')
+    op.drop_table('units')
+    op.drop_table('technicians')
+    op.drop_table('po_groups')
+    op.drop_table('approvers')
+    op.drop_table('users')
+    with op.batch_alter_table('notification_log', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_notification_log_provider_message_id'))
+        batch_op.drop_index(batch_op.f('ix_notification_log_outbox_id'))
+
+    op.drop_table('notification_log')
+    op.drop_table('vendors')
+    with op.batch_alter_table('sync_tombstones', schema=None) as batch_op:
+        batch_op.drop_index('ix_sync_tombstones_type_deleted_at')
+
+    op.drop_table('sync_tombstones')
+    with op.batch_alter_table('notification_outbox', schema=None) as batch_op:
+        batch_op.drop_index('ix_notification_outbox_status_next_attempt')
+
+    op.drop_table('notification_outbox')
+    op.drop_table('departments')
@@ -10,6 +10,11 @@ from .approver_department import ApproverDepartment
 from .repair import Repair
 from .repair_item import RepairItem
 from .technician import Technician
+from .notification_outbox import NotificationOutbox
+from .notification_log import NotificationLog
+from .sync_tombstone import SyncTombstone
+from .backfill_checkpoint import BackfillCheckpoint
+from .idempotency_key import IdempotencyKey
 
 __all__ = [
     "Department",
@@ -24,4 +29,9 @@ __all__ = [
     "Repair",
     "RepairItem",
     "Technician",
+    "NotificationOutbox",
+    "NotificationLog",
+    "SyncTombstone",
+    "BackfillCheckpoint",
+    "IdempotencyKey",
 ]
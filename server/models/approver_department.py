@@ -29,5 +29,5 @@ class ApproverDepartment(db.Model):
             "id": self.id,
             "approver_id": self.approver_id,
             "department_id": self.department_id,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "created_at": self.created_at,
         }
@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+from db import db
+
+
+class BackfillStatus:
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+    @classmethod
+    def all(cls):
+        return [cls.RUNNING, cls.COMPLETED, cls.FAILED]
+
+
+class BackfillCheckpoint(db.Model):
+    """Progress of a backfill (see lib/backfill.py), committed with every batch."""
+
+    __tablename__ = "backfill_checkpoints"
+
+    name = db.Column(db.String(100), primary_key=True)
+    # Key of the last row processed; the next batch starts after it
+    last_key = db.Column(db.String(36), nullable=True)
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)
+    batches = db.Column(db.Integer, nullable=False, default=0)
+    status = db.Column(db.String(20), nullable=False, default=BackfillStatus.RUNNING)
+    last_error = db.Column(db.Text, nullable=True)
+    started_at = db.Column(
+        db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False
+    )
+    completed_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(
+        db.DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "last_key": self.last_key,
+            "rows_processed": self.rows_processed,
+            "batches": self.batches,
+            "status": self.status,
+            "last_error": self.last_error,
+            "started_at": self.started_at,
+            "completed_at": self.completed_at,
+            "updated_at": self.updated_at,
+        }
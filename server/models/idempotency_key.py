@@ -0,0 +1,34 @@
+from datetime import datetime, timezone
+from db import db
+
+
+class IdempotencyStatus:
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+
+    @classmethod
+    def all(cls):
+        return [cls.IN_PROGRESS, cls.COMPLETED]
+
+
+class IdempotencyKey(db.Model):
+    """A client's Idempotency-Key and the response stored for it (see lib/idempotency.py)."""
+
+    __tablename__ = "idempotency_keys"
+
+    user_id = db.Column(db.String(36), db.ForeignKey("users.id"), primary_key=True)
+    key = db.Column(db.String(255), primary_key=True)
+    # Method, path and body digest; reusing a key for another request is an error
+    request_hash = db.Column(db.String(64), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=IdempotencyStatus.IN_PROGRESS)
+    response_status = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.LargeBinary, nullable=True)
+    response_content_type = db.Column(db.String(100), nullable=True)
+    # [name, value] pairs the handler set (e.g. Preference-Applied), replayed as is
+    response_headers = db.Column(db.JSON, nullable=True)
+    # An in-progress claim older than this is abandoned (its worker died) and can be taken over
+    locked_until = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(
+        db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False
+    )
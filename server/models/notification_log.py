@@ -0,0 +1,64 @@
+import uuid
+from datetime import datetime, timezone
+from db import db
+
+
+class DeliveryStatus:
+    SENT = "sent"
+    FAILED = "failed"
+    DELIVERED = "delivered"
+    UNDELIVERED = "undelivered"
+
+    @classmethod
+    def all(cls):
+        return [cls.SENT, cls.FAILED, cls.DELIVERED, cls.UNDELIVERED]
+
+
+class NotificationLog(db.Model):
+    """One provider send attempt for one outbox row, updated by delivery receipts."""
+
+    __tablename__ = "notification_log"
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    outbox_id = db.Column(
+        db.String(36), db.ForeignKey("notification_outbox.id"), nullable=True, index=True
+    )
+    event_type = db.Column(db.String(50), nullable=False)
+    recipient = db.Column(db.String(20), nullable=False)
+    provider_message_id = db.Column(db.String(64), nullable=True, index=True)
+    status = db.Column(db.String(20), nullable=False)
+    provider_status = db.Column(db.String(50), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    latency_ms = db.Column(db.Integer, nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=False)
+    delivered_at = db.Column(db.DateTime, nullable=True)
+    resent_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(
+        db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False
+    )
+    updated_at = db.Column(
+        db.DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+    outbox = db.relationship("NotificationOutbox")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "outbox_id": self.outbox_id,
+            "event_type": self.event_type,
+            "recipient": self.recipient,
+            "provider_message_id": self.provider_message_id,
+            "status": self.status,
+            "provider_status": self.provider_status,
+            "error": self.error,
+            "latency_ms": self.latency_ms,
+            "sent_at": self.sent_at,
+            "delivered_at": self.delivered_at,
+            "resent_at": self.resent_at,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
@@ -0,0 +1,63 @@
+import uuid
+from datetime import datetime, timezone
+from db import db
+
+
+class OutboxStatus:
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+
+    @classmethod
+    def all(cls):
+        return [cls.PENDING, cls.SENDING, cls.SENT, cls.FAILED]
+
+
+class NotificationOutbox(db.Model):
+    """An SMS queued in the same transaction as the status change that caused it."""
+
+    __tablename__ = "notification_outbox"
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    event_type = db.Column(db.String(50), nullable=False)
+    entity_id = db.Column(db.String(36), nullable=True)
+    recipient = db.Column(db.String(20), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default=OutboxStatus.PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(
+        db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False
+    )
+    locked_until = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+    created_at = db.Column(
+        db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False
+    )
+    updated_at = db.Column(
+        db.DateTime,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+        nullable=False,
+    )
+
+    __table_args__ = (
+        db.Index("ix_notification_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "event_type": self.event_type,
+            "entity_id": self.entity_id,
+            "recipient": self.recipient,
+            "message": self.message,
+            "status": self.status,
+            "attempts": self.attempts,
+            "next_attempt_at": self.next_attempt_at,
+            "last_error": self.last_error,
+            "sent_at": self.sent_at,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
@@ -52,6 +52,7 @@ class Order(db.Model):
         default=lambda: datetime.now(timezone.utc),
         onupdate=lambda: datetime.now(timezone.utc),
         nullable=False,
+        index=True,
     )
 
     vendor = db.relationship("Vendor", back_populates="orders")
@@ -83,6 +84,11 @@ class Order(db.Model):
     @staticmethod
     def generate_order_number():
         """Generate a unique order number."""
+        return Order.generate_order_numbers(1)[0]
+
+    @staticmethod
+    def generate_order_numbers(count):
+        """Generate count consecutive order numbers with a single query."""
         now = datetime.now(timezone.utc)
         prefix = now.strftime("ORD-%Y%m%d")
         
@@ -90,7 +96,7 @@ class Order(db.Model):
             Order.order_number.like(f"{prefix}%")
         ).count()
         
-        return f"{prefix}-{existing + 1:04d}"
+        return [f"{prefix}-{existing + n:04d}" for n in range(1, count + 1)]
 
     @property
     def total(self):
@@ -112,14 +118,14 @@ class Order(db.Model):
             "status": self.status,
             "ordered_by_id": self.ordered_by_id,
             "approved_by_id": self.approved_by_id,
-            "approved_at": self.approved_at.isoformat() if self.approved_at else None,
+            "approved_at": self.approved_at,
             "rejected_by_id": self.rejected_by_id,
-            "rejected_at": self.rejected_at.isoformat() if self.rejected_at else None,
+            "rejected_at": self.rejected_at,
             "rejection_comment": self.rejection_comment,
             "notes": self.notes,
             "total": self.total,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
         if include_relations:
             data["vendor"] = self.vendor.to_dict() if self.vendor else None
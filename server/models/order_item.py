@@ -1,7 +1,11 @@
 import uuid
 from datetime import datetime, timezone
+from decimal import Decimal
+from sqlalchemy.orm import validates
 from db import db
 
+CENTS = Decimal("0.01")
+
 
 class OrderItem(db.Model):
     __tablename__ = "order_items"
@@ -26,6 +30,13 @@ class OrderItem(db.Model):
 
     order = db.relationship("Order", back_populates="items")
 
+    @validates("quantity", "unit_cost")
+    def validate_amount(self, key, value):
+        """Store amounts as the Decimal the Numeric(10, 2) column returns, so responses match reloads."""
+        if value is None or value == "":
+            return None
+        return Decimal(str(value)).quantize(CENTS)
+
     @property
     def total(self):
         """Calculate line item total if quantity and unit_cost are provided."""
@@ -39,9 +50,9 @@ class OrderItem(db.Model):
             "order_id": self.order_id,
             "line_number": self.line_number,
             "description": self.description,
-            "quantity": float(self.quantity) if self.quantity is not None else None,
-            "unit_cost": float(self.unit_cost) if self.unit_cost is not None else None,
+            "quantity": self.quantity,
+            "unit_cost": self.unit_cost,
             "total": self.total,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
@@ -45,8 +45,8 @@ class POGroup(db.Model):
             "created_by": self.created_by.to_dict() if self.created_by else None,
             "order_count": self.order_count,
             "total": self.total,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
         if include_orders:
             data["orders"] = [order.to_dict(include_relations=True) for order in self.orders]
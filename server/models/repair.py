@@ -50,6 +50,7 @@ class Repair(db.Model):
         default=lambda: datetime.now(timezone.utc),
         onupdate=lambda: datetime.now(timezone.utc),
         nullable=False,
+        index=True,
     )
 
     unit = db.relationship("Unit", back_populates="repairs")
@@ -102,15 +103,15 @@ class Repair(db.Model):
             "status": self.status,
             "requested_by_id": self.requested_by_id,
             "approved_by_id": self.approved_by_id,
-            "approved_at": self.approved_at.isoformat() if self.approved_at else None,
+            "approved_at": self.approved_at,
             "rejected_by_id": self.rejected_by_id,
-            "rejected_at": self.rejected_at.isoformat() if self.rejected_at else None,
+            "rejected_at": self.rejected_at,
             "rejection_comment": self.rejection_comment,
             "completed_by_id": self.completed_by_id,
-            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+            "completed_at": self.completed_at,
             "notes": self.notes,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
         if include_relations:
             data["unit"] = self.unit.to_dict() if self.unit else None
@@ -30,6 +30,6 @@ class RepairItem(db.Model):
             "repair_id": self.repair_id,
             "line_number": self.line_number,
             "description": self.description,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
@@ -0,0 +1,30 @@
+import uuid
+from datetime import datetime, timezone
+from db import db
+
+
+class SyncTombstone(db.Model):
+    """Marker left behind when an order or repair is deleted, for delta sync clients."""
+
+    __tablename__ = "sync_tombstones"
+    __table_args__ = (
+        db.Index("ix_sync_tombstones_type_deleted_at", "entity_type", "deleted_at"),
+    )
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    entity_type = db.Column(db.String(20), nullable=False)
+    entity_id = db.Column(db.String(36), nullable=False)
+    # Copied from the deleted row so tombstones can be scoped like the row was
+    owner_id = db.Column(db.String(36), nullable=True)
+    department_id = db.Column(db.String(36), nullable=True)
+    deleted_at = db.Column(
+        db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "entity_type": self.entity_type,
+            "entity_id": self.entity_id,
+            "deleted_at": self.deleted_at,
+        }
@@ -35,8 +35,8 @@ class Technician(db.Model):
             "user_id": self.user_id,
             "is_active": self.is_active,
             "created_by_id": self.created_by_id,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
         if include_user and self.user:
             data["user"] = self.user.to_dict()
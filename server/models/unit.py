@@ -57,8 +57,8 @@ class Unit(db.Model):
             "department_id": self.department_id,
             "is_active": self.is_active,
             "created_by_id": self.created_by_id,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
         if include_department and self.department:
             data["department"] = self.department.to_dict()
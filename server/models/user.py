@@ -123,8 +123,8 @@ class User(db.Model):
             "is_approver": self.is_approver,
             "is_technician": self.is_technician,
             "is_active": self.is_active,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
         if include_department and self.department:
             data["department"] = self.department.to_dict()
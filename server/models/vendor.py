@@ -30,6 +30,6 @@ class Vendor(db.Model):
             "name": self.name,
             "contact_info": self.contact_info,
             "is_active": self.is_active,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
         }
@@ -6,6 +6,7 @@ from controllers.admin_controller import (
     get_units, get_unit, get_unit_types, create_unit, update_unit, delete_unit,
     get_approvers, get_approver, create_approver, update_approver, delete_approver,
     get_technicians, get_technician, create_technician, update_technician, delete_technician,
+    get_pool_stats,
 )
 from lib.authenticate import require_admin
 
@@ -208,3 +209,11 @@ def update_technician_route(technician_id, current_user):
 @require_admin
 def delete_technician_route(technician_id, current_user):
     return delete_technician(technician_id, current_user)
+
+
+# ============== DATABASE ==============
+
+@admin_bp.route("/pool-stats", methods=["GET"])
+@require_admin
+def get_pool_stats_route(current_user):
+    return get_pool_stats()
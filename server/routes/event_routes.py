@@ -0,0 +1,11 @@
+from flask import Blueprint
+from controllers.event_controller import stream_events
+from lib.authenticate import authenticate
+
+event_bp = Blueprint("event", __name__)
+
+
+@event_bp.route("/", methods=["GET"])
+@authenticate
+def stream_events_route(current_user):
+    return stream_events(current_user)
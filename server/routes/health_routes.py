@@ -0,0 +1,14 @@
+from flask import Blueprint
+from controllers.health_controller import liveness, readiness
+
+health_bp = Blueprint("health", __name__)
+
+
+@health_bp.route("/live", methods=["GET"])
+def liveness_route():
+    return liveness()
+
+
+@health_bp.route("/ready", methods=["GET"])
+def readiness_route():
+    return readiness()
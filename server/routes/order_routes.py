@@ -4,6 +4,7 @@ from controllers.order_controller import (
     get_all_orders,
     get_order,
     create_order,
+    create_orders_bulk,
     update_order,
     delete_order,
     submit_order,
@@ -14,6 +15,8 @@ from controllers.order_controller import (
     mark_order_paid,
 )
 from lib.authenticate import authenticate
+from lib.idempotency import idempotent
+from lib.single_flight import single_flight
 
 order_bp = Blueprint("order", __name__)
 
@@ -26,6 +29,7 @@ def get_orders_route(current_user):
 
 @order_bp.route("/all", methods=["GET"])
 @authenticate
+@single_flight
 def get_all_orders_route(current_user):
     return get_all_orders(current_user)
 
@@ -38,10 +42,18 @@ def get_order_route(order_id, current_user):
 
 @order_bp.route("/", methods=["POST"])
 @authenticate
+@idempotent
 def create_order_route(current_user):
     return create_order(current_user)
 
 
+@order_bp.route("/bulk", methods=["POST"])
+@authenticate
+@idempotent
+def create_orders_bulk_route(current_user):
+    return create_orders_bulk(current_user)
+
+
 @order_bp.route("/<order_id>", methods=["PUT"])
 @authenticate
 def update_order_route(order_id, current_user):
@@ -56,6 +68,7 @@ def delete_order_route(order_id, current_user):
 
 @order_bp.route("/<order_id>/submit", methods=["POST"])
 @authenticate
+@idempotent
 def submit_order_route(order_id, current_user):
     return submit_order(order_id, current_user)
 
@@ -10,6 +10,7 @@ from controllers.po_group_controller import (
     get_available_orders_for_po_group,
 )
 from lib.authenticate import authenticate
+from lib.single_flight import single_flight
 
 po_group_bp = Blueprint("po_group", __name__)
 
@@ -22,6 +23,7 @@ def get_po_groups_route(current_user):
 
 @po_group_bp.route("/available-orders", methods=["GET"])
 @authenticate
+@single_flight
 def get_available_orders_route(current_user):
     return get_available_orders_for_po_group(current_user)
 
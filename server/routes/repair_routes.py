@@ -13,6 +13,7 @@ from controllers.repair_controller import (
     complete_repair,
 )
 from lib.authenticate import authenticate
+from lib.idempotency import idempotent
 
 repair_bp = Blueprint("repair", __name__)
 
@@ -37,6 +38,7 @@ def get_repair_route(repair_id, current_user):
 
 @repair_bp.route("/", methods=["POST"])
 @authenticate
+@idempotent
 def create_repair_route(current_user):
     return create_repair(current_user)
 
@@ -55,6 +57,7 @@ def delete_repair_route(repair_id, current_user):
 
 @repair_bp.route("/<repair_id>/submit", methods=["POST"])
 @authenticate
+@idempotent
 def submit_repair_route(repair_id, current_user):
     return submit_repair(repair_id, current_user)
 
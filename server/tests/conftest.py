@@ -0,0 +1,89 @@
+"""
+Test setup: the app on a throwaway SQLite database.
+
+The schema is created from the models for each test and dropped afterwards.
+Postgres-only behaviour (SKIP LOCKED, NOTIFY, statement timeouts) is not
+exercised here; see benchmarks/ for runs against Postgres.
+"""
+
+import os
+import tempfile
+
+import pytest
+
+_db_dir = tempfile.mkdtemp(prefix="po-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ["LOG_FILE"] = ""
+
+from app import app as flask_app  # noqa: E402
+from db import db as _db  # noqa: E402
+from lib.authenticate import generate_token  # noqa: E402
+from models.approver import Approver  # noqa: E402
+from models.department import Department  # noqa: E402
+from models.user import User  # noqa: E402
+from models.vendor import Vendor  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        _db.create_all()
+        yield flask_app
+        _db.session.remove()
+        _db.drop_all()
+
+
+@pytest.fixture
+def db(app):
+    return _db
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(db):
+    """Create a user: make_user("name", is_admin=False, approver=False, department=None)."""
+    def make(name, is_admin=False, approver=False, department=None):
+        # Tests sign in with a token, so the slow bcrypt hash is skipped
+        user = User(
+            email=f"{name}@example.com", password_hash="-", first_name=name, last_name="Test",
+            is_admin=is_admin, department_id=department.id if department else None,
+        )
+        db.session.add(user)
+        db.session.flush()
+        if approver:
+            db.session.add(Approver(user_id=user.id, is_active=True))
+        db.session.commit()
+        return user
+
+    return make
+
+
+@pytest.fixture
+def department(db):
+    department = Department(name="Operations")
+    db.session.add(department)
+    db.session.commit()
+    return department
+
+
+@pytest.fixture
+def vendor(db):
+    vendor = Vendor(name="Parts Co")
+    db.session.add(vendor)
+    db.session.commit()
+    return vendor
+
+
+@pytest.fixture
+def login(app):
+    """Return a test client signed in as the given user."""
+    def make(user):
+        client = app.test_client()
+        client.set_cookie("token", generate_token(user.id))
+        return client
+
+    return make
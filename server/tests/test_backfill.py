@@ -0,0 +1,93 @@
+import pytest
+from sqlalchemy import update
+
+from lib import backfill as backfill_lib
+from lib.backfill import register, run_backfill
+from models.backfill_checkpoint import BackfillStatus
+from models.department import Department
+
+NAME = "test_department_descriptions"
+
+
+@pytest.fixture
+def departments(db):
+    for i in range(5):
+        db.session.add(Department(name=f"Department {i}"))
+    db.session.commit()
+    return sorted(d.id for d in Department.query.all())
+
+
+@pytest.fixture
+def seen_batches(db):
+    batches = []
+
+    def fill_descriptions(ids):
+        batches.append(list(ids))
+        result = db.session.execute(
+            update(Department).where(Department.id.in_(ids)).values(description="filled")
+        )
+        return result.rowcount
+
+    # No filter: only the checkpoint keeps a resumed run from revisiting rows
+    register(NAME, Department, fill_descriptions, batch_size=2)
+    yield batches
+    backfill_lib._registry.pop(NAME, None)
+
+
+def _run(**kwargs):
+    return run_backfill(NAME, sleep_seconds=0, report=lambda line: None, **kwargs)
+
+
+def test_walks_the_table_in_key_order(departments, seen_batches):
+    checkpoint = _run()
+
+    assert seen_batches == [departments[0:2], departments[2:4], departments[4:5]]
+    assert checkpoint.status == BackfillStatus.COMPLETED
+    assert checkpoint.rows_processed == 5
+    assert Department.query.filter(Department.description.is_(None)).count() == 0
+
+
+def test_resumes_after_the_last_committed_batch(db, departments, seen_batches):
+    checkpoint = _run(max_batches=2)
+
+    assert checkpoint.status == BackfillStatus.RUNNING
+    assert checkpoint.batches == 2
+    assert checkpoint.last_key == departments[3]
+    assert Department.query.filter(Department.description.is_(None)).count() == 1
+
+    seen_batches.clear()
+    db.session.expire_all()
+    checkpoint = _run()
+
+    assert seen_batches == [departments[4:5]]
+    assert checkpoint.status == BackfillStatus.COMPLETED
+    assert checkpoint.batches == 3
+    assert checkpoint.rows_processed == 5
+
+
+def test_restart_starts_from_the_first_row(departments, seen_batches):
+    _run()
+    seen_batches.clear()
+
+    checkpoint = _run(restart=True)
+
+    assert seen_batches == [departments[0:2], departments[2:4], departments[4:5]]
+    assert checkpoint.batches == 3
+
+
+def test_failed_batch_keeps_the_checkpoint(db, departments, seen_batches):
+    _run(max_batches=1)
+    backfill = backfill_lib._registry[NAME]
+    process = backfill.process
+
+    def fail(ids):
+        raise RuntimeError("boom")
+
+    backfill.process = fail
+    with pytest.raises(RuntimeError):
+        _run()
+    backfill.process = process
+
+    checkpoint = _run()
+    assert checkpoint.status == BackfillStatus.COMPLETED
+    assert seen_batches == [departments[0:2], departments[2:4], departments[4:5]]
@@ -0,0 +1,97 @@
+import gzip
+
+import brotli
+import pytest
+from flask import Flask, jsonify
+
+from lib.compression import CompressedBodyCache, choose_encoding, init_compression
+
+PAYLOAD = {"orders": [{"id": i, "description": "Brake pads"} for i in range(200)]}
+
+
+@pytest.fixture
+def compressed_app():
+    app = Flask(__name__)
+    init_compression(app)
+
+    @app.route("/private")
+    def private():
+        return jsonify(PAYLOAD)
+
+    @app.route("/shared")
+    def shared():
+        response = jsonify(PAYLOAD)
+        response.set_etag("v1")
+        return response
+
+    @app.route("/small")
+    def small():
+        return jsonify({"ok": True})
+
+    return app
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br", "br"),
+    ("gzip", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("identity", None),
+    ("", None),
+    ("*", "br"),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header) == expected
+
+
+def test_response_is_compressed_for_the_accepted_encoding(compressed_app):
+    client = compressed_app.test_client()
+
+    br = client.get("/private", headers={"Accept-Encoding": "br"})
+    gz = client.get("/private", headers={"Accept-Encoding": "gzip"})
+
+    assert br.headers["Content-Encoding"] == "br"
+    assert brotli.decompress(br.data) == client.get("/private").data
+    assert gz.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(gz.data) == client.get("/private").data
+    assert br.headers["Vary"] == "Accept-Encoding"
+
+
+def test_small_and_unaccepted_responses_are_sent_as_is(compressed_app):
+    client = compressed_app.test_client()
+
+    assert "Content-Encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "Content-Encoding" not in client.get("/private").headers
+
+
+def test_compressed_etag_names_the_encoding(compressed_app):
+    response = compressed_app.test_client().get("/shared", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["ETag"] == '"v1-gzip"'
+
+
+def test_only_shareable_responses_are_cached(compressed_app):
+    client = compressed_app.test_client()
+    cache = compressed_app.extensions["compression_cache"]
+
+    client.get("/private", headers={"Accept-Encoding": "gzip"})
+    assert cache.size == 0
+
+    client.get("/shared", headers={"Accept-Encoding": "gzip"})
+    assert cache.size > 0
+
+
+def test_cache_is_bounded_in_bytes():
+    cache = CompressedBodyCache(max_bytes=100)
+
+    for i in range(5):
+        cache.set(i, b"x" * 20)
+    cache.get(1)
+    cache.set(5, b"x" * 20)
+
+    assert cache.size == 100
+    # Least recently used first: 0 was evicted, 1 was kept by the read
+    assert cache.get(0) is None
+    assert cache.get(1) is not None
+    # Bodies over a quarter of the budget are not cached at all
+    cache.set("big", b"x" * 30)
+    assert cache.get("big") is None
@@ -0,0 +1,47 @@
+import pytest
+
+from lib import sms_service
+from lib.delivery_tracking import reconcile_receipts
+
+
+@pytest.fixture
+def provider(monkeypatch):
+    """Receipt pages served to reconcile_receipts, and the date_before values marked read."""
+    state = {"pages": [], "marked": []}
+
+    def fetch(page=1, limit=100):
+        return {"receipts": state["pages"][page - 1], "last_page": len(state["pages"])}
+
+    monkeypatch.setattr(sms_service, "fetch_delivery_receipts", fetch)
+    monkeypatch.setattr(sms_service, "mark_receipts_read", state["marked"].append)
+    return state
+
+
+def _page(*timestamps):
+    return [{"message_id": f"m{ts}", "status_code": "201", "timestamp": str(ts)} for ts in timestamps]
+
+
+def test_all_pages_fetched_marks_everything_read(app, provider):
+    provider["pages"] = [_page(100, 101), _page(102)]
+
+    assert reconcile_receipts(max_pages=5) == 3
+
+    assert len(provider["marked"]) == 1
+    assert provider["marked"][0] > 102
+
+
+def test_stopping_early_marks_only_older_receipts_read(app, provider):
+    provider["pages"] = [_page(100, 101), _page(102, 103), _page(104)]
+
+    assert reconcile_receipts(max_pages=2) == 4
+
+    assert provider["marked"] == [102]
+
+
+def test_stopping_early_out_of_order_marks_nothing(app, provider):
+    # Newest first: the unfetched page holds the oldest receipts
+    provider["pages"] = [_page(104, 103), _page(102, 101), _page(100)]
+
+    assert reconcile_receipts(max_pages=2) == 4
+
+    assert provider["marked"] == []
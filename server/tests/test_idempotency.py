@@ -0,0 +1,91 @@
+import pytest
+
+from models.idempotency_key import IdempotencyKey
+from models.order import Order
+from models.repair import Repair, RepairStatus
+from models.unit import Unit
+
+
+@pytest.fixture
+def client(login, make_user, department):
+    return login(make_user("clerk", department=department))
+
+
+def _order_payload(vendor):
+    return {"vendor_id": vendor.id, "description": "Brake pads", "items": [{"description": "Pad", "quantity": 2}]}
+
+
+def test_retry_replays_the_first_response(client, vendor):
+    headers = {"Idempotency-Key": "create-1"}
+
+    first = client.post("/api/order/", json=_order_payload(vendor), headers=headers)
+    retry = client.post("/api/order/", json=_order_payload(vendor), headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.get_json() == first.get_json()
+    assert Order.query.count() == 1
+
+
+def test_key_reused_with_a_different_body_is_rejected(client, vendor):
+    headers = {"Idempotency-Key": "create-1"}
+    client.post("/api/order/", json=_order_payload(vendor), headers=headers)
+
+    response = client.post("/api/order/", json={**_order_payload(vendor), "notes": "x"}, headers=headers)
+
+    assert response.status_code == 422
+    assert Order.query.count() == 1
+
+
+def test_key_reused_with_a_different_query_string_is_rejected(client, vendor):
+    headers = {"Idempotency-Key": "create-1"}
+    client.post("/api/order/", json=_order_payload(vendor), headers=headers)
+
+    response = client.post("/api/order/?format=normalized", json=_order_payload(vendor), headers=headers)
+
+    assert response.status_code == 422
+    assert Order.query.count() == 1
+
+
+def test_keys_are_scoped_to_the_user(client, login, make_user, vendor):
+    headers = {"Idempotency-Key": "create-1"}
+    client.post("/api/order/", json=_order_payload(vendor), headers=headers)
+
+    other = login(make_user("other"))
+    response = other.post("/api/order/", json=_order_payload(vendor), headers=headers)
+
+    assert response.status_code == 201
+    assert "Idempotent-Replayed" not in response.headers
+    assert Order.query.count() == 2
+
+
+def test_client_errors_are_replayed_too(client, vendor):
+    headers = {"Idempotency-Key": "create-1"}
+    payload = {**_order_payload(vendor), "vendor_id": "missing"}
+
+    assert client.post("/api/order/", json=payload, headers=headers).status_code == 404
+    retry = client.post("/api/order/", json=payload, headers=headers)
+    assert retry.status_code == 404
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert IdempotencyKey.query.count() == 1
+
+
+def test_repair_submit_is_idempotent(db, client, make_user):
+    make_user("approver", approver=True)
+    unit = Unit(unit_number="T-1")
+    db.session.add(unit)
+    db.session.commit()
+    created = client.post("/api/repair/", json={
+        "unit_id": unit.id, "description": "Flat tyre", "items": [{"description": "Tyre"}],
+    })
+    repair_id = created.get_json()["id"]
+    headers = {"Idempotency-Key": "submit-1"}
+
+    first = client.post(f"/api/repair/{repair_id}/submit", headers=headers)
+    retry = client.post(f"/api/repair/{repair_id}/submit", headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.get_json() == first.get_json()
+    db.session.expire_all()
+    assert db.session.get(Repair, repair_id).status == RepairStatus.PENDING
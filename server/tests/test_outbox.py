@@ -0,0 +1,179 @@
+from datetime import datetime, timedelta, timezone
+
+from lib import outbox
+from lib.outbox import claim_batch, enqueue_notifications, record_results
+from models.notification_outbox import NotificationOutbox, OutboxStatus
+
+
+def _utcnow():
+    # Naive UTC, as the columns come back from the database
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _enqueue(db, event_type="order_paid", to="+61400000001"):
+    enqueue_notifications(event_type, None, [{"to": to, "message": "hello"}])
+    db.session.commit()
+
+
+def _row(db, row_id):
+    db.session.expire_all()
+    return db.session.get(NotificationOutbox, row_id)
+
+
+def _make_due(db, row_id):
+    row = _row(db, row_id)
+    row.next_attempt_at = _utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+
+def test_claim_marks_rows_sending_with_a_lease(db):
+    _enqueue(db)
+
+    claimed = claim_batch(10)
+
+    assert len(claimed) == 1
+    row = _row(db, claimed[0]["id"])
+    assert row.status == OutboxStatus.SENDING
+    assert row.attempts == 1
+    assert row.locked_until is not None
+    # A leased row is not handed to a second dispatcher
+    assert claim_batch(10) == []
+
+
+def test_success_is_terminal(db):
+    _enqueue(db)
+    claimed = claim_batch(10)
+
+    record_results(claimed, [{"reference": claimed[0]["id"], "success": True}])
+
+    row = _row(db, claimed[0]["id"])
+    assert row.status == OutboxStatus.SENT
+    assert row.sent_at is not None
+    assert row.locked_until is None
+    assert claim_batch(10) == []
+
+
+def test_failure_is_retried_after_backoff(db):
+    _enqueue(db)
+    claimed = claim_batch(10)
+
+    record_results(claimed, [{"reference": claimed[0]["id"], "success": False, "error": "HTTP 500"}])
+
+    row = _row(db, claimed[0]["id"])
+    assert row.status == OutboxStatus.PENDING
+    assert row.last_error == "HTTP 500"
+    assert row.next_attempt_at > _utcnow()
+    # Not due until the backoff has passed
+    assert claim_batch(10) == []
+
+    _make_due(db, row.id)
+    retried = claim_batch(10)
+    assert [c["id"] for c in retried] == [row.id]
+    assert _row(db, row.id).attempts == 2
+
+
+def test_missing_result_counts_as_failure(db):
+    _enqueue(db)
+    claimed = claim_batch(10)
+
+    record_results(claimed, [])
+
+    row = _row(db, claimed[0]["id"])
+    assert row.status == OutboxStatus.PENDING
+    assert row.last_error == "No result from provider"
+
+
+def test_row_fails_after_max_attempts(db):
+    _enqueue(db)
+    for attempt in range(1, outbox.MAX_ATTEMPTS + 1):
+        claimed = claim_batch(10)
+        assert len(claimed) == 1
+        record_results(claimed, [{"reference": claimed[0]["id"], "success": False, "error": "down"}])
+        row_id = claimed[0]["id"]
+        if attempt < outbox.MAX_ATTEMPTS:
+            assert _row(db, row_id).status == OutboxStatus.PENDING
+            _make_due(db, row_id)
+
+    row = _row(db, row_id)
+    assert row.status == OutboxStatus.FAILED
+    assert row.attempts == outbox.MAX_ATTEMPTS
+    assert claim_batch(10) == []
+
+
+def test_deferred_row_does_not_spend_an_attempt(db):
+    _enqueue(db)
+    claimed = claim_batch(10)
+
+    record_results(claimed, [{
+        "reference": claimed[0]["id"], "success": False, "deferred": True,
+        "error": "circuit open", "retry_after": 30,
+    }])
+
+    row = _row(db, claimed[0]["id"])
+    assert row.status == OutboxStatus.PENDING
+    assert row.attempts == 0
+    assert row.next_attempt_at > _utcnow() + timedelta(seconds=20)
+
+
+def test_expired_lease_is_claimed_again(db):
+    _enqueue(db)
+    claimed = claim_batch(10)
+    row_id = claimed[0]["id"]
+
+    # The dispatcher died mid-send: nothing recorded, lease still running
+    assert claim_batch(10) == []
+    row = _row(db, row_id)
+    row.locked_until = _utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+    reclaimed = claim_batch(10)
+    assert [c["id"] for c in reclaimed] == [row_id]
+    row = _row(db, row_id)
+    assert row.status == OutboxStatus.SENDING
+    assert row.attempts == 2
+    assert row.locked_until > _utcnow()
+
+
+def test_batch_size_is_respected(db):
+    for i in range(5):
+        _enqueue(db, to=f"+6140000000{i}")
+
+    assert len(claim_batch(3)) == 3
+    assert len(claim_batch(3)) == 2
+
+
+def test_new_event_joins_a_fresh_digest(db):
+    _enqueue(db, event_type="order_pending")
+    _enqueue(db, event_type="order_pending")
+
+    rows = NotificationOutbox.query.all()
+    assert len(rows) == 2
+    assert rows[0].next_attempt_at == rows[1].next_attempt_at
+    assert rows[0].next_attempt_at > _utcnow() + timedelta(seconds=60)
+
+
+def test_new_event_does_not_join_a_digest_waiting_to_retry(db):
+    _enqueue(db, event_type="order_pending")
+    first = NotificationOutbox.query.one()
+    _make_due(db, first.id)
+    claimed = claim_batch(10)
+    record_results(claimed, [{"reference": first.id, "success": False, "error": "HTTP 500"}])
+    retry_at = _row(db, first.id).next_attempt_at
+
+    _enqueue(db, event_type="order_pending")
+
+    second = NotificationOutbox.query.filter(NotificationOutbox.id != first.id).one()
+    assert second.attempts == 0
+    assert second.next_attempt_at != retry_at
+
+
+def test_digest_is_not_split_across_batches(db):
+    for _ in range(3):
+        _enqueue(db, event_type="order_pending", to="+61400000001")
+    for row in NotificationOutbox.query.all():
+        _make_due(db, row.id)
+
+    claimed = claim_batch(2)
+
+    assert len(claimed) == 3
+    assert claim_batch(2) == []
@@ -0,0 +1,46 @@
+import pytest
+
+from lib import request_timing
+
+
+@pytest.fixture
+def audience(monkeypatch):
+    def set_audience(value):
+        monkeypatch.setattr(request_timing, "HEADER_AUDIENCE", value)
+
+    return set_audience
+
+
+def test_admins_get_the_header(login, make_user, audience):
+    audience("admin")
+    response = login(make_user("admin", is_admin=True)).get("/api/order/")
+
+    assert response.status_code == 200
+    assert "db;dur=" in response.headers["Server-Timing"]
+    assert "total;dur=" in response.headers["Server-Timing"]
+
+
+def test_other_users_do_not(client, login, make_user, audience):
+    audience("admin")
+
+    assert "Server-Timing" not in login(make_user("clerk")).get("/api/order/").headers
+    assert "Server-Timing" not in client.get("/api/order/").headers
+
+
+def test_audience_can_be_everyone_or_no_one(login, make_user, audience):
+    client = login(make_user("clerk"))
+
+    audience("all")
+    assert "Server-Timing" in client.get("/api/order/").headers
+    audience("none")
+    assert "Server-Timing" not in login(make_user("admin", is_admin=True)).get("/api/order/").headers
+
+
+def test_detail_serialization_is_its_own_phase(login, make_user, vendor, audience):
+    audience("all")
+    client = login(make_user("admin", is_admin=True))
+    created = client.post("/api/order/", json={"vendor_id": vendor.id, "description": "Brake pads"})
+
+    assert "serialize;dur=" in created.headers["Server-Timing"]
+    detail = client.get(f"/api/order/{created.get_json()['id']}")
+    assert "serialize;dur=" in detail.headers["Server-Timing"]
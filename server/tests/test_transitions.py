@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+from models.order import Order, OrderStatus
+
+
+@pytest.fixture
+def pending_order(db, make_user, department, vendor):
+    submitter = make_user("submitter", department=department)
+    order = Order(
+        order_number="ORD-TEST-0001", vendor_id=vendor.id, description="Brake pads",
+        status=OrderStatus.PENDING, ordered_by_id=submitter.id,
+    )
+    db.session.add(order)
+    db.session.commit()
+    return order.id
+
+
+@pytest.fixture
+def approver(make_user):
+    return make_user("approver", approver=True)
+
+
+def _status(db, order_id):
+    db.session.expire_all()
+    return db.session.get(Order, order_id).status
+
+
+def test_approve_moves_a_pending_order(db, login, approver, pending_order):
+    response = login(approver).post(f"/api/order/{pending_order}/approve")
+
+    assert response.status_code == 200
+    assert response.get_json()["order"]["status"] == OrderStatus.APPROVED
+    assert _status(db, pending_order) == OrderStatus.APPROVED
+
+
+def test_transition_from_the_wrong_status_is_a_conflict(db, login, approver, pending_order):
+    client = login(approver)
+    assert client.post(f"/api/order/{pending_order}/approve").status_code == 200
+
+    response = client.post(f"/api/order/{pending_order}/reject", json={"comment": "late"})
+
+    assert response.status_code == 409
+    assert response.get_json() == {
+        "error": "Only pending orders can be rejected",
+        "status": OrderStatus.APPROVED,
+    }
+    assert _status(db, pending_order) == OrderStatus.APPROVED
+
+
+def test_unknown_order_is_not_found(login, approver):
+    response = login(approver).post("/api/order/does-not-exist/approve")
+
+    assert response.status_code == 404
+
+
+def test_non_approver_is_refused_before_the_order_is_looked_up(login, make_user, pending_order):
+    response = login(make_user("clerk")).post("/api/order/does-not-exist/approve")
+
+    assert response.status_code == 403
+
+
+def test_concurrent_approvals_change_the_order_once(app, db, login, make_user, pending_order):
+    clients = [login(make_user(f"approver{i}", approver=True)) for i in range(2)]
+    barrier = threading.Barrier(len(clients))
+    statuses = []
+
+    def approve(client):
+        barrier.wait()
+        statuses.append(client.post(f"/api/order/{pending_order}/approve").status_code)
+
+    threads = [threading.Thread(target=approve, args=(client,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(statuses) == [200, 409]
+    assert _status(db, pending_order) == OrderStatus.APPROVED